@@ -0,0 +1,138 @@
+# Course: CS261 - Data Structures
+# Description: Counting Bloom filter used as a membership pre-filter in front of
+# the hash maps. Each key sets k one-byte counters picked by double hashing of
+# two 64-bit halves of its blake2b digest; a key whose counters are not all
+# non-zero is certainly absent, so most misses are answered without touching
+# the map's buckets. Counters (rather than bits) let keys be removed again.
+
+import math
+import sys
+
+from hash_functions import hash_128
+
+# counters stop here and are never decremented again, which keeps them safe
+_SATURATED = 255
+
+
+def _counters_for(expected_items: int, false_positive_rate: float) -> int:
+    """
+    Returns the number of counters for expected_items keys at the target rate
+    """
+    return max(8, int(-max(1, int(expected_items)) * math.log(false_positive_rate) /
+                      math.log(2) ** 2))
+
+
+def filter_bytes(expected_items: int, false_positive_rate: float) -> int:
+    """
+    Returns bytes memory_bytes() reports for a filter built with these
+    arguments, without building it
+    """
+    return sys.getsizeof(bytearray()) + _counters_for(expected_items, false_positive_rate) + 1
+
+
+class CountingBloomFilter:
+    """
+    Counting Bloom filter sized for an expected number of keys and a target
+    false positive rate
+    Supported methods are: add, remove, might_contain, clear, get_stats
+    """
+
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.01) -> None:
+        """Initialize an empty filter."""
+        expected_items = max(1, int(expected_items))
+        self._target_rate = false_positive_rate
+        self._counters_count = _counters_for(expected_items, false_positive_rate)
+        self._hash_count = max(1, round(self._counters_count / expected_items * math.log(2)))
+        self._counters = bytearray(self._counters_count)
+        self._items = 0
+        self._checks = 0
+        self._rejected = 0
+
+    def _indices(self, key: str) -> list:
+        """Return the counter indices of key."""
+        hash_1, hash_2 = hash_128(key)
+        hash_2 |= 1
+        return [(hash_1 + i * hash_2) % self._counters_count for i in range(self._hash_count)]
+
+    def add(self, key: str) -> None:
+        """Count one more occurrence of key."""
+        counters = self._counters
+        for index in self._indices(key):
+            if counters[index] < _SATURATED:
+                counters[index] += 1
+        self._items += 1
+
+    def remove(self, key: str) -> None:
+        """Forget one occurrence of a key that was added."""
+        counters = self._counters
+        for index in self._indices(key):
+            if 0 < counters[index] < _SATURATED:
+                counters[index] -= 1
+        self._items -= 1
+
+    def might_contain(self, key: str) -> bool:
+        """Return False if key was certainly never added, True if it may have been."""
+        self._checks += 1
+        counters = self._counters
+        for index in self._indices(key):
+            if counters[index] == 0:
+                self._rejected += 1
+                return False
+        return True
+
+    def clear(self) -> None:
+        """Remove every key."""
+        self._counters = bytearray(self._counters_count)
+        self._items = 0
+
+    def memory_bytes(self) -> int:
+        """Return bytes used by the counters."""
+        return sys.getsizeof(self._counters)
+
+    def false_positive_rate(self) -> float:
+        """Return the expected false positive rate for the keys now in the filter."""
+        fill = 1 - math.exp(-self._hash_count * self._items / self._counters_count)
+        return fill ** self._hash_count
+
+    def get_stats(self) -> dict:
+        """
+        Return a dict describing the filter: counters, hashes, items, bytes,
+        target and current expected false positive rate, and how many checks
+        were made and rejected since the filter was created.
+        """
+        return {'counters': self._counters_count,
+                'hashes': self._hash_count,
+                'items': self._items,
+                'bytes': self.memory_bytes(),
+                'target_false_positive_rate': self._target_rate,
+                'false_positive_rate': self.false_positive_rate(),
+                'checks': self._checks,
+                'rejected': self._rejected}
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nadd / might_contain / remove example")
+    print("------------------------------------")
+    bloom = CountingBloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add('str' + str(i))
+    print(all(bloom.might_contain('str' + str(i)) for i in range(1000)))
+    false_positives = sum(bloom.might_contain('miss' + str(i)) for i in range(10_000))
+    print(false_positives < 300, round(bloom.false_positive_rate(), 4))
+    for i in range(500):
+        bloom.remove('str' + str(i))
+    print(all(bloom.might_contain('str' + str(i)) for i in range(500, 1000)))
+    stats = bloom.get_stats()
+    print(stats['counters'], stats['hashes'], stats['items'])
+
+    print("\nfalse positive rate at scale example")
+    print("------------------------------------")
+    for keys in (1000, 20_000, 200_000):
+        bloom = CountingBloomFilter(keys, 0.01)
+        for i in range(keys):
+            bloom.add('user' + str(i))
+        measured = sum(bloom.might_contain('miss' + str(i)) for i in range(100_000)) / 100_000
+        print(keys, measured, measured < 0.015, round(bloom.false_positive_rate(), 4))
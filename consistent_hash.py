@@ -0,0 +1,368 @@
+# Course: CS261 - Data Structures
+# Description: Consistent hashing over a ring of kv_server nodes, each holding a
+# shard of the keyspace in its own HashMap. Every node is placed on the ring at
+# several virtual points and a key belongs to the first point at or after its
+# hash, so adding or removing one of N nodes moves only about 1/N of the keys.
+# Like the maps, the ring takes a pluggable hash function. ClusterClient routes
+# single-key commands to the owner node, splits batch commands by owner and
+# sends the parts in parallel, and rebalances by moving only the keys whose
+# owner changed. start_local_nodes() runs a ring of servers as local processes.
+
+import asyncio
+import bisect
+import multiprocessing
+import socket
+
+from hash_functions import hash_64, mix_64
+from kv_client import KVClient
+import kv_server
+
+# keys asked for per SCAN page, and copied per MGET / MSET or deleted per DEL round,
+# during a rebalance
+REBALANCE_BATCH = 500
+
+
+class HashRing:
+    """
+    Ring of nodes with vnodes virtual points each
+    Supported methods are: add_node, remove_node, get_node, get_nodes, copy, successors
+    """
+
+    def __init__(self, nodes=(), vnodes: int = 100, function: callable = hash_64) -> None:
+        """Initialize a ring holding the given node names."""
+        self._vnodes = vnodes
+        self._hash_function = function
+        self._points = []
+        self._owners = []
+        for node in nodes:
+            self.add_node(node)
+
+    def _hash(self, key: str) -> int:
+        """Return the ring position of a key or virtual node name."""
+        return mix_64(self._hash_function(key))
+
+    def add_node(self, node: str) -> None:
+        """Place node on the ring at its virtual points."""
+        if node in self._owners:
+            raise ValueError(f"{node} is already on the ring")
+        for replica in range(self._vnodes):
+            point = self._hash(f"{node}#{replica}")
+            index = bisect.bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove_node(self, node: str) -> None:
+        """Take node and all of its virtual points off the ring."""
+        if node not in self._owners:
+            raise ValueError(f"{node} is not on the ring")
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def get_node(self, key: str) -> str:
+        """Return the node that owns key."""
+        if not self._points:
+            raise ValueError("the ring has no nodes")
+        index = bisect.bisect_left(self._points, self._hash(key))
+        if index == len(self._points):
+            index = 0
+        return self._owners[index]
+
+    def get_nodes(self) -> list:
+        """Return the names of the nodes on the ring."""
+        return sorted(set(self._owners))
+
+    def copy(self) -> "HashRing":
+        """Return a ring with the same nodes and points."""
+        ring = HashRing(vnodes=self._vnodes, function=self._hash_function)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+    def successors(self, node: str) -> set:
+        """
+        Return the nodes that own the ring arcs node's points fall on, i.e.
+        the nodes that give keys to node when it is added
+        """
+        if node in self._owners:
+            raise ValueError(f"{node} is already on the ring")
+        owners = set()
+        for replica in range(self._vnodes):
+            index = bisect.bisect_left(self._points, self._hash(f"{node}#{replica}"))
+            owners.add(self._owners[index % len(self._owners)])
+        return owners
+
+
+def _address(node: str) -> tuple[str, int]:
+    """
+    Returns (host, port) of a 'host:port' node name
+    """
+    host, port = node.rsplit(':', 1)
+    return host, int(port)
+
+
+class ClusterClient:
+    def __init__(self, nodes: list, vnodes: int = 100, function: callable = hash_64,
+                 pool_size: int = 4) -> None:
+        """
+        Client for a ring of kv_server nodes named 'host:port'
+        """
+        self._ring = HashRing(nodes, vnodes, function)
+        self._pool_size = pool_size
+        self._clients = {node: KVClient(*_address(node), pool_size) for node in nodes}
+
+    def get_nodes(self) -> list:
+        """
+        Returns the names of the nodes on the ring
+        """
+        return self._ring.get_nodes()
+
+    def _group(self, keys) -> dict:
+        """
+        Returns {node: [(position, key), ...]} for keys
+        """
+        groups = {}
+        for position, key in enumerate(keys):
+            groups.setdefault(self._ring.get_node(key), []).append((position, key))
+        return groups
+
+    async def get(self, key: str) -> bytes:
+        """Returns the value of key, or None."""
+        return await self._clients[self._ring.get_node(key)].get(key)
+
+    async def put(self, key: str, value) -> None:
+        """Stores value under key on its owner node."""
+        await self._clients[self._ring.get_node(key)].put(key, value)
+
+    async def remove(self, key: str) -> int:
+        """Removes key; returns 1 if it existed, 0 otherwise."""
+        return await self._clients[self._ring.get_node(key)].remove(key)
+
+    async def mget(self, keys: list) -> list:
+        """
+        Returns the values of keys, None for missing ones. Keys are split by
+        owner node and the parts are fetched in parallel.
+        """
+        groups = self._group(keys)
+        nodes = list(groups)
+        replies = await asyncio.gather(*(self._clients[node].mget([key for _, key in groups[node]])
+                                         for node in nodes))
+        values = [None] * len(keys)
+        for node, reply in zip(nodes, replies):
+            for (position, _), value in zip(groups[node], reply):
+                values[position] = value
+        return values
+
+    async def mset(self, pairs: list) -> None:
+        """
+        Stores every (key, value) pair, one MSET per owner node, in parallel
+        """
+        groups = self._group(key for key, _ in pairs)
+        await asyncio.gather(*(self._clients[node].mset([pairs[position] for position, _ in members])
+                               for node, members in groups.items()))
+
+    async def get_size(self) -> int:
+        """Returns the number of keys over all nodes."""
+        sizes = await asyncio.gather(*(client.execute('DBSIZE') for client in self._clients.values()))
+        return sum(sizes)
+
+    async def node_sizes(self) -> dict:
+        """Returns {node: number of keys on it}."""
+        nodes = list(self._clients)
+        sizes = await asyncio.gather(*(self._clients[node].execute('DBSIZE') for node in nodes))
+        return dict(zip(nodes, sizes))
+
+    # -------------------------- rebalance ----------------------------- #
+
+    async def add_node(self, node: str) -> int:
+        """
+        Adds a node to the ring and moves to it the keys it now owns. Only the
+        nodes whose arcs the new node splits are scanned. Returns the number
+        of keys moved. Reads are served by the old owners until every key is
+        copied and by the new ones afterwards, so none misses a moved key.
+        """
+        sources = self._ring.successors(node) if self._clients else set()
+        new_ring = self._ring.copy()
+        new_ring.add_node(node)
+        self._clients[node] = KVClient(*_address(node), self._pool_size)
+        moved = 0
+        for source in sources:
+            moved += await self._copy_keys(source, new_ring)
+        self._ring = new_ring
+        for source in sources:
+            await self._drop_moved_keys(source, new_ring)
+        return moved
+
+    async def remove_node(self, node: str) -> int:
+        """
+        Moves every key of a node to its new owners and takes the node off the
+        ring. Returns the number of keys moved. As in add_node(), the node
+        serves reads until its keys are copied and the ring has switched.
+        """
+        new_ring = self._ring.copy()
+        new_ring.remove_node(node)
+        moved = await self._copy_keys(node, new_ring)
+        self._ring = new_ring
+        await self._drop_moved_keys(node, new_ring)
+        await self._clients.pop(node).close()
+        return moved
+
+    async def _copy_keys(self, source: str, new_ring: HashRing) -> int:
+        """
+        Streams the keys of source whose owner differs in new_ring to their
+        new owners, one SCAN page at a time: as each page arrives its keys are
+        read from source and written to their owner. source keeps its copies
+        until _drop_moved_keys(), after the ring has switched, so it still
+        answers reads for them. Writes to the moved keys while a rebalance
+        runs are not coordinated: one made after its key was copied stays on
+        source and is dropped.
+        """
+        client = self._clients[source]
+        moved = 0
+        cursor = 0
+        while True:
+            cursor, keys = await client.execute('SCAN', cursor, 'COUNT', REBALANCE_BATCH)
+            cursor = int(cursor)
+            batch = [key.decode() for key in keys if new_ring.get_node(key.decode()) != source]
+            if batch:
+                values = await client.mget(batch)
+                targets = {}
+                for key, value in zip(batch, values):
+                    if value is not None:
+                        targets.setdefault(new_ring.get_node(key), []).append((key, value))
+                        moved += 1
+                await asyncio.gather(*(self._clients[target].mset(pairs)
+                                       for target, pairs in targets.items()))
+            if cursor == 0:
+                return moved
+
+    async def _drop_moved_keys(self, source: str, new_ring: HashRing) -> None:
+        """
+        Deletes from source, one SCAN page at a time, the keys new_ring gives
+        to other nodes
+        """
+        client = self._clients[source]
+        cursor = 0
+        while True:
+            cursor, keys = await client.execute('SCAN', cursor, 'COUNT', REBALANCE_BATCH)
+            cursor = int(cursor)
+            batch = [key.decode() for key in keys if new_ring.get_node(key.decode()) != source]
+            if batch:
+                await client.remove(*batch)
+            if cursor == 0:
+                return
+
+    async def close(self) -> None:
+        """Closes the connections to every node."""
+        for client in self._clients.values():
+            await client.close()
+
+
+# ------------------------- local nodes -------------------------------- #
+
+def start_local_nodes(count: int, engine: str = 'sc', host: str = '127.0.0.1') -> tuple[list, list]:
+    """
+    Starts count kv_server processes on free local ports. Returns (node names,
+    processes); terminate the processes when done.
+    """
+    nodes = []
+    processes = []
+    for _ in range(count):
+        with socket.socket() as probe:
+            probe.bind((host, 0))
+            port = probe.getsockname()[1]
+        process = multiprocessing.Process(target=kv_server.run, args=(host, port, engine),
+                                          daemon=True)
+        process.start()
+        nodes.append(f"{host}:{port}")
+        processes.append(process)
+    return nodes, processes
+
+
+async def wait_for_nodes(nodes: list, timeout: float = 10.0) -> None:
+    """
+    Waits until every node accepts connections
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    for node in nodes:
+        while True:
+            try:
+                _, writer = await asyncio.open_connection(*_address(node))
+                writer.close()
+                await writer.wait_closed()
+                break
+            except OSError:
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nring example")
+    print("------------")
+    ring = HashRing(['a', 'b', 'c'], vnodes=100)
+    counts = {}
+    for i in range(30_000):
+        node = ring.get_node('key' + str(i))
+        counts[node] = counts.get(node, 0) + 1
+    print(sorted(counts.items()))
+    before = {('key' + str(i)): ring.get_node('key' + str(i)) for i in range(30_000)}
+    ring.add_node('d')
+    moved = sum(ring.get_node(key) != node for key, node in before.items())
+    print(f"adding a 4th node moves {moved / 30_000:.1%} of keys")
+
+    nodes, processes = start_local_nodes(4)
+
+    async def main():
+        await wait_for_nodes(nodes)
+        cluster = ClusterClient(nodes[:3])
+
+        print("\ncluster example")
+        print("---------------")
+        pairs = [('key' + str(i), i) for i in range(10_000)]
+        await cluster.mset(pairs)
+        print(await cluster.get_size(), sorted((await cluster.node_sizes()).values()))
+        print(await cluster.get('key42'), await cluster.mget(['key1', 'missing', 'key9999']))
+
+        print("\nrebalance example")
+        print("-----------------")
+        rebalancing = True
+        misses = 0
+
+        async def read_while_rebalancing():
+            nonlocal misses
+            i = 0
+            while rebalancing:
+                misses += await cluster.get('key' + str(i % len(pairs))) is None
+                i += 7
+
+        async def rebalance(change):
+            nonlocal rebalancing
+            rebalancing = True
+            try:
+                return await change
+            finally:
+                rebalancing = False
+
+        moved, _ = await asyncio.gather(rebalance(cluster.add_node(nodes[3])),
+                                        read_while_rebalancing())
+        values = await cluster.mget([key for key, _ in pairs])
+        print(f"add: moved {moved / len(pairs):.1%},", await cluster.get_size(),
+              all(value == str(i).encode() for i, value in enumerate(values)))
+        moved, _ = await asyncio.gather(rebalance(cluster.remove_node(nodes[0])),
+                                        read_while_rebalancing())
+        values = await cluster.mget([key for key, _ in pairs])
+        print(f"remove: moved {moved / len(pairs):.1%},", await cluster.get_size(),
+              all(value == str(i).encode() for i, value in enumerate(values)),
+              len(cluster.get_nodes()))
+        print("reads that missed a key during the rebalances:", misses)
+        await cluster.close()
+
+    asyncio.run(main())
+    for process in processes:
+        process.terminate()
+        process.join()
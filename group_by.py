@@ -0,0 +1,281 @@
+# Course: CS261 - Data Structures
+# Description: Streaming group-by aggregation built on the separate chaining
+# HashMap. Each group keeps one accumulator in the map, found or created with a
+# single setdefault() probe per record. Supported aggregates are count, sum,
+# min, max, mean and distinct (distinct-count). When max_groups is set and the
+# map grows past it, partial aggregates are spilled to temporary partition files
+# and merged one partition at a time once the input is exhausted. A partition
+# that still holds more than max_groups groups is spilled again with a
+# differently seeded hash.
+
+import functools
+import pickle
+import tempfile
+
+from a6_include import hash_function_1, hash_function_2
+from hash_functions import hash_64
+from hash_map_memory import MemoryBudgetError
+from hash_map_sc import HashMap
+from hash_set import HashSet
+
+AGGREGATES = ('count', 'sum', 'min', 'max', 'mean', 'distinct')
+
+# times a spill partition is split again before group_by gives up on max_groups
+MAX_DEPTH = 4
+
+
+def _new_state(op: str) -> object:
+    """
+    Returns the empty accumulator state for one aggregate
+    """
+    if op == 'count' or op == 'sum':
+        return 0
+    if op == 'mean':
+        return [0, 0]
+    if op == 'distinct':
+        return HashSet()
+    return None
+
+
+def _update(op: str, state: object, value: object) -> object:
+    """
+    Folds one value into an accumulator state and returns the new state
+    """
+    if op == 'count':
+        return state + 1
+    if op == 'sum':
+        return state + value
+    if op == 'min':
+        return value if state is None or value < state else state
+    if op == 'max':
+        return value if state is None or value > state else state
+    if op == 'mean':
+        state[0] += value
+        state[1] += 1
+        return state
+    # distinct
+    state.add(value)
+    return state
+
+
+def _merge(op: str, state: object, other: object) -> object:
+    """
+    Combines two partial states of the same aggregate
+    """
+    if op == 'count' or op == 'sum':
+        return state + other
+    if op == 'min':
+        return other if state is None or (other is not None and other < state) else state
+    if op == 'max':
+        return other if state is None or (other is not None and other > state) else state
+    if op == 'mean':
+        return [state[0] + other[0], state[1] + other[1]]
+    # distinct: spilled sets are stored as DynamicArrays of keys
+    for index in range(other.length()):
+        state.add(other[index])
+    return state
+
+
+def _result(op: str, state: object) -> object:
+    """
+    Returns the final value of an accumulator state
+    """
+    if op == 'mean':
+        return state[0] / state[1] if state[1] else None
+    if op == 'distinct':
+        return state.get_size()
+    return state
+
+
+def _spillable(op: str, state: object) -> object:
+    """
+    Returns a state in the form written to spill files
+    """
+    if op == 'distinct':
+        return state.get_keys()
+    return state
+
+
+def group_by(records, key: callable, aggregates: dict,
+             max_groups: int = None, partitions: int = 16,
+             function: callable = hash_function_1):
+    """
+    parameters:
+        records: iterable of records, read once
+        key: callable returning the (string) group key of a record
+        aggregates: output name -> (op, field) where op is one of AGGREGATES and
+            field is a callable returning the value to aggregate (ignored for
+            count). distinct values must be strings.
+        max_groups: groups held in memory before partial aggregates are spilled.
+            Oversized spill partitions are split again up to MAX_DEPTH times;
+            MemoryBudgetError is raised if one still does not fit.
+        partitions: number of spill partition files
+    yields: (group key, {output name: aggregate value}) for every group
+    """
+    names = list(aggregates)
+    ops = [aggregates[name][0] for name in names]
+    fields = [aggregates[name][1] for name in names]
+    for op in ops:
+        if op not in AGGREGATES:
+            raise ValueError(f"unknown aggregate {op!r}, expected one of {AGGREGATES}")
+
+    groups = HashMap(function=function)
+    spill_files = None
+
+    # accumulator handed to setdefault; replaced whenever it starts a new group
+    fresh = [_new_state(op) for op in ops]
+
+    for record in records:
+        group = groups.setdefault(key(record), fresh)
+        if group is fresh:
+            fresh = [_new_state(op) for op in ops]
+
+        for index in range(len(ops)):
+            value = None if ops[index] == 'count' else fields[index](record)
+            group[index] = _update(ops[index], group[index], value)
+
+        if max_groups is not None and groups.get_size() >= max_groups:
+            if spill_files is None:
+                spill_files = [tempfile.TemporaryFile() for _ in range(partitions)]
+            _spill(groups, ops, spill_files, hash_function_2)
+            groups = HashMap(function=function)
+
+    if spill_files is None:
+        yield from _emit(groups, names, ops)
+        return
+
+    # spill what is left, then merge each partition on its own
+    _spill(groups, ops, spill_files, hash_function_2)
+    groups = None
+    yield from _merge_spills(spill_files, names, ops, max_groups, partitions, function, 0)
+
+
+def _merge_spills(spill_files: list, names: list, ops: list, max_groups: int,
+                  partitions: int, function: callable, depth: int):
+    """
+    Merges the partial groups of each spill partition in turn and yields the
+    results. A partition with more than max_groups groups is spilled again to
+    new partitions by a hash seeded with the next depth, unrelated to the hash
+    that put its keys together, and merged the same way.
+    """
+    try:
+        for spill_file in spill_files:
+            spill_file.seek(0)
+            merged = HashMap(function=function)
+            split_files = None
+
+            # accumulator handed to setdefault; replaced whenever it starts a new group
+            fresh = [_new_state(op) for op in ops]
+
+            for group_key, states in _read_groups(spill_file):
+                group = merged.setdefault(group_key, fresh)
+                if group is fresh:
+                    fresh = [_new_state(op) for op in ops]
+                for index in range(len(ops)):
+                    group[index] = _merge(ops[index], group[index], states[index])
+
+                if merged.get_size() > max_groups:
+                    if depth == MAX_DEPTH:
+                        raise MemoryBudgetError(
+                            f"a spill partition still has over {max_groups} groups after "
+                            f"{MAX_DEPTH} splits; raise max_groups or partitions")
+                    if split_files is None:
+                        split_files = [tempfile.TemporaryFile() for _ in range(partitions)]
+                    _spill(merged, ops, split_files, functools.partial(hash_64, seed=depth + 1))
+                    merged = HashMap(function=function)
+
+            if split_files is None:
+                yield from _emit(merged, names, ops)
+                continue
+
+            _spill(merged, ops, split_files, functools.partial(hash_64, seed=depth + 1))
+            merged = None
+            yield from _merge_spills(split_files, names, ops, max_groups, partitions,
+                                     function, depth + 1)
+    finally:
+        for spill_file in spill_files:
+            spill_file.close()
+
+
+def _spill(groups: HashMap, ops: list, spill_files: list, partition_function: callable) -> None:
+    """
+    Appends every partial group to the partition file picked by partition_function
+    """
+    key_value_pairs = groups.get_keys_and_values()
+    for index in range(key_value_pairs.length()):
+        group_key, group = key_value_pairs[index]
+        states = [_spillable(ops[i], group[i]) for i in range(len(ops))]
+        partition = partition_function(group_key) % len(spill_files)
+        pickle.dump((group_key, states), spill_files[partition], pickle.HIGHEST_PROTOCOL)
+
+
+def _read_groups(spill_file):
+    """
+    Yields the (key, states) pairs written to a partition file
+    """
+    while True:
+        try:
+            yield pickle.load(spill_file)
+        except EOFError:
+            return
+
+
+def _emit(groups: HashMap, names: list, ops: list):
+    """
+    Yields the final (key, results) pair of every group in the map
+    """
+    key_value_pairs = groups.get_keys_and_values()
+    for index in range(key_value_pairs.length()):
+        group_key, group = key_value_pairs[index]
+        yield group_key, {names[i]: _result(ops[i], group[i]) for i in range(len(ops))}
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    sales = [('apple', 'ann', 3), ('grape', 'bob', 5), ('apple', 'bob', 7),
+             ('melon', 'ann', 1), ('apple', 'ann', 2), ('grape', 'cat', 4)]
+    aggregates = {
+        'orders': ('count', None),
+        'total': ('sum', lambda r: r[2]),
+        'smallest': ('min', lambda r: r[2]),
+        'largest': ('max', lambda r: r[2]),
+        'average': ('mean', lambda r: r[2]),
+        'buyers': ('distinct', lambda r: r[1]),
+    }
+
+    print("\nin-memory example")
+    print("-----------------")
+    for group_key, result in sorted(group_by(sales, lambda r: r[0], aggregates)):
+        print(group_key, result)
+
+    print("\nspill example")
+    print("-------------")
+    for group_key, result in sorted(group_by(sales, lambda r: r[0], aggregates, max_groups=2, partitions=3)):
+        print(group_key, result)
+
+    print("\nlarge stream example")
+    print("--------------------")
+    stream = (('key' + str(i % 5000), i) for i in range(100_000))
+    results = group_by(stream, lambda r: r[0], {'n': ('count', None), 'sum': ('sum', lambda r: r[1])},
+                       max_groups=1000)
+    count = 0
+    result = True
+    for group_key, values in results:
+        count += 1
+        result &= values['n'] == 20
+    print(count, result)
+
+    print("\nre-spilled merge example")
+    print("------------------------")
+    # 4 partitions of ~1250 groups each are split twice to fit 100 groups
+    stream = (('key' + str(i % 5000), 'buyer' + str(i % 7)) for i in range(50_000))
+    results = dict(group_by(stream, lambda r: r[0], {'n': ('count', None), 'buyers': ('distinct', lambda r: r[1])},
+                            max_groups=100, partitions=4))
+    print(len(results), all(values == {'n': 10, 'buyers': 7} for values in results.values()))
+    try:
+        stream = (('key' + str(i), i) for i in range(1000))
+        list(group_by(stream, lambda r: r[0], {'n': ('count', None)}, max_groups=1, partitions=2))
+    except MemoryBudgetError as error:
+        print(error)
@@ -0,0 +1,94 @@
+# Course: CS261 - Data Structures
+# Description: Hash functions and prime helpers shared by the hash maps,
+# filters, sketches and the hash ring. The sample hash_function_1 (a sum of
+# ordinals) and hash_function_2 give only a few hundred distinct values over
+# typical keys, so a table, filter or sketch larger than that piles its keys
+# onto the same few positions. hash_64() and hash_128() derive well-mixed hashes
+# from a blake2b digest instead, with an optional seed for structures that must
+# rehash independently; mix_64() scrambles the output of any other hash function
+# passed in, so small or clustered values still spread over 64 bits.
+
+import hashlib
+
+_MASK_64 = (1 << 64) - 1
+
+
+def mix_64(hash: int) -> int:
+    """
+    Returns a 64-bit scramble (splitmix64 finalizer) of hash
+    """
+    hash = (hash + 0x9E3779B97F4A7C15) & _MASK_64
+    hash = ((hash ^ (hash >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    hash = ((hash ^ (hash >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return hash ^ (hash >> 31)
+
+
+def hash_64(key: str, seed: int = 0) -> int:
+    """
+    Returns a 64-bit hash of key: 8 bytes of blake2b, salted with seed
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8, salt=seed.to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def hash_128(key: str, seed: int = 0) -> tuple[int, int]:
+    """
+    Returns two independent 64-bit hashes of key: the halves of one 16-byte
+    blake2b digest, salted with seed
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=16, salt=seed.to_bytes(8, 'little')).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+def next_prime(capacity: int) -> int:
+    """
+    Increment from given number to find the closest prime number
+    """
+    if capacity % 2 == 0:
+        capacity += 1
+
+    while not is_prime(capacity):
+        capacity += 2
+
+    return capacity
+
+
+def is_prime(capacity: int) -> bool:
+    """
+    Determine if given integer is a prime number and return boolean
+    """
+    if capacity == 2 or capacity == 3:
+        return True
+
+    if capacity == 1 or capacity % 2 == 0:
+        return False
+
+    factor = 3
+    while factor ** 2 <= capacity:
+        if capacity % factor == 0:
+            return False
+        factor += 2
+
+    return True
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from a6_include import hash_function_1, hash_function_2
+
+    print("\ndistinct hash values example")
+    print("----------------------------")
+    keys = ['user:' + str(i) for i in range(200_000)]
+    for function in (hash_function_1, hash_function_2, hash_64):
+        print(function.__name__, len({function(key) for key in keys}))
+    print('mix_64(hash_function_1)', len({mix_64(hash_function_1(key)) % 1024 for key in keys}))
+
+    print("\nseeded hash example")
+    print("-------------------")
+    print(hash_64('key') == hash_64('key', 0), hash_64('key', 1) != hash_64('key', 2),
+          hash_128('key')[0] != hash_128('key')[1])
+
+    print("\nnext_prime example")
+    print("------------------")
+    print([next_prime(n) for n in (0, 1, 2, 8, 11, 100, 1000)], is_prime(1), is_prime(97))
@@ -0,0 +1,224 @@
+# Course: CS261 - Data Structures
+# Description: Hash join of two record streams built on the separate chaining
+# HashMap. The build input (the smaller side) is loaded into a HashMap of
+# key -> list of rows in batches, then the probe input is streamed against it.
+# If the build side grows past max_build_rows, the join turns into a grace hash
+# join: both inputs are partitioned to temporary files by hash and each
+# partition pair is joined in memory in turn. A partition whose build rows
+# still exceed max_build_rows is partitioned again with a differently seeded
+# hash. Inner, left and semi joins are supported.
+
+import functools
+import itertools
+import pickle
+import tempfile
+
+from a6_include import hash_function_1, hash_function_2
+from hash_functions import hash_64
+from hash_map_memory import MemoryBudgetError
+from hash_map_sc import HashMap
+
+JOIN_TYPES = ('inner', 'left', 'semi')
+
+# times a partition is split again before the join gives up on max_build_rows
+MAX_DEPTH = 4
+
+
+def hash_join(build, probe, build_key: callable, probe_key: callable,
+              how: str = 'inner', max_build_rows: int = None,
+              partitions: int = 16, batch_size: int = 1024,
+              function: callable = hash_function_1,
+              partition_function: callable = hash_function_2):
+    """
+    parameters:
+        build: iterable of rows loaded into the hash table; pass the smaller input
+        probe: iterable of rows streamed against the table
+        build_key, probe_key: callables returning the (string) join key of a row
+        how: 'inner' yields (probe row, build row) for every match, 'left' also
+            yields (probe row, None) for probe rows without a match, and 'semi'
+            yields each probe row with at least one match once
+        max_build_rows: build rows held in memory before switching to a grace
+            hash join over partitions temporary files. Oversized partitions
+            are split again up to MAX_DEPTH times; MemoryBudgetError is raised
+            if one still does not fit, e.g. when a single join key has more
+            than max_build_rows build rows.
+        batch_size: build rows read and inserted per batch
+        function: hash function of the in-memory table
+        partition_function: hash function that assigns rows to partitions; it
+            should differ from function so partitions do not share bucket patterns
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"unknown join type {how!r}, expected one of {JOIN_TYPES}")
+
+    build = iter(build)
+    table, rows = _build_table(build, build_key, max_build_rows, batch_size, function)
+
+    if max_build_rows is None or rows <= max_build_rows:
+        yield from _probe_table(table, probe, probe_key, how)
+        return
+
+    # over budget: spill the partial table and the rest of both inputs
+    build = itertools.chain(_table_rows(table), build)
+    table = None
+    yield from _grace_join(build, probe, build_key, probe_key, how, max_build_rows,
+                           partitions, batch_size, function, partition_function, 0)
+
+
+def _grace_join(build, probe, build_key: callable, probe_key: callable, how: str,
+                max_build_rows: int, partitions: int, batch_size: int,
+                function: callable, partition_function: callable, depth: int):
+    """
+    Partitions both inputs to temporary files by partition_function and joins
+    the partition pairs in turn. A partition with more than max_build_rows
+    build rows is joined the same way, partitioned by a hash seeded with the
+    next depth, unrelated to the hash that put its keys together.
+    """
+    build_files = [tempfile.TemporaryFile() for _ in range(partitions)]
+    probe_files = [tempfile.TemporaryFile() for _ in range(partitions)]
+    try:
+        _partition(build, build_key, build_files, partition_function)
+        _partition(probe, probe_key, probe_files, partition_function)
+        build = probe = None
+
+        for build_file, probe_file in zip(build_files, probe_files):
+            build_file.seek(0)
+            probe_file.seek(0)
+            build_rows = _read_rows(build_file)
+            table, rows = _build_table(build_rows, build_key, max_build_rows, batch_size, function)
+            if rows <= max_build_rows:
+                yield from _probe_table(table, _read_rows(probe_file), probe_key, how)
+                continue
+
+            if depth == MAX_DEPTH:
+                raise MemoryBudgetError(
+                    f"a partition still has over {max_build_rows} build rows after "
+                    f"{MAX_DEPTH} splits; does one join key have that many rows?")
+            build_rows = itertools.chain(_table_rows(table), build_rows)
+            table = None
+            yield from _grace_join(build_rows, _read_rows(probe_file), build_key, probe_key, how,
+                                   max_build_rows, partitions, batch_size, function,
+                                   functools.partial(hash_64, seed=depth + 1), depth + 1)
+    finally:
+        for spill_file in build_files + probe_files:
+            spill_file.close()
+
+
+def _table_rows(table: HashMap):
+    """
+    Yields the build rows held in a table
+    """
+    key_value_pairs = table.get_keys_and_values()
+    for index in range(key_value_pairs.length()):
+        yield from key_value_pairs[index][1]
+
+
+def _build_table(build, build_key: callable, max_build_rows: int,
+                 batch_size: int, function: callable) -> tuple[HashMap, int]:
+    """
+    Loads build rows into a HashMap of key -> list of rows, a batch at a time.
+    Stops after the batch that crosses max_build_rows and returns (table, rows read).
+    """
+    table = HashMap(function=function)
+    rows = 0
+
+    # list handed to setdefault; replaced whenever it starts a new key
+    fresh = []
+
+    while max_build_rows is None or rows <= max_build_rows:
+        batch = list(itertools.islice(build, batch_size))
+        if not batch:
+            break
+
+        # grow once per batch instead of doubling part way through it
+        if table.get_size() + len(batch) > table.get_capacity():
+            table.resize_table(2 * (table.get_size() + len(batch)))
+
+        for row in batch:
+            matches = table.setdefault(build_key(row), fresh)
+            if matches is fresh:
+                fresh = []
+            matches.append(row)
+        rows += len(batch)
+
+    return table, rows
+
+
+def _probe_table(table: HashMap, probe, probe_key: callable, how: str):
+    """
+    Streams probe rows against the table and yields the join output
+    """
+    for row in probe:
+        matches = table.get(probe_key(row))
+        if matches is None:
+            if how == 'left':
+                yield row, None
+        elif how == 'semi':
+            yield row
+        else:
+            for match in matches:
+                yield row, match
+
+
+def _partition(rows, row_key: callable, files: list, partition_function: callable) -> None:
+    """
+    Appends every row to the partition file picked by its key's hash
+    """
+    for row in rows:
+        pickle.dump(row, files[partition_function(row_key(row)) % len(files)],
+                    pickle.HIGHEST_PROTOCOL)
+
+
+def _read_rows(spill_file):
+    """
+    Yields the rows written to a partition file
+    """
+    while True:
+        try:
+            yield pickle.load(spill_file)
+        except EOFError:
+            return
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    users = [('u1', 'ann'), ('u2', 'bob'), ('u3', 'cat')]
+    orders = [('o1', 'u1', 30), ('o2', 'u2', 10), ('o3', 'u1', 5), ('o4', 'u9', 7)]
+
+    for how in JOIN_TYPES:
+        print(f"\n{how} join example")
+        print("-" * (len(how) + 13))
+        for pair in hash_join(users, orders, lambda u: u[0], lambda o: o[1], how=how):
+            print(pair)
+
+    print("\ngrace join example")
+    print("------------------")
+    build = (('k' + str(i), i) for i in range(20_000))
+    probe = (('k' + str(i % 25_000), -i) for i in range(50_000))
+    matched = 0
+    unmatched = 0
+    for probe_row, build_row in hash_join(build, probe, lambda r: r[0], lambda r: r[0],
+                                          how='left', max_build_rows=3000, partitions=8):
+        if build_row is None:
+            unmatched += 1
+        else:
+            matched += probe_row[0] == build_row[0]
+    print(matched, unmatched)
+
+    print("\nskewed grace join example")
+    print("-------------------------")
+    # 100 keys with the same hash_function_2 all land in one partition
+    target = hash_function_2('afgga')
+    words = (''.join(letters) for letters in itertools.product('abcdefgh', repeat=5))
+    colliding = [key for key in words if hash_function_2(key) == target][:100]
+    build = ((key, i) for i in range(50) for key in colliding)
+    probe = ((key, 'p') for key in colliding + ['missing'])
+    rows = list(hash_join(build, probe, lambda r: r[0], lambda r: r[0], how='left',
+                          max_build_rows=1000, partitions=8))
+    print(len(colliding), len(rows), sum(build_row is None for _, build_row in rows))
+    try:
+        hot = (('hot', i) for i in range(5000))
+        list(hash_join(hot, [('hot', 'p')], lambda r: r[0], lambda r: r[0], max_build_rows=1000))
+    except MemoryBudgetError as error:
+        print(error)
@@ -0,0 +1,637 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of HashMap using Open Addressing with Quadratic
+# Probing where keys are not kept as str objects. Every key is encoded to UTF-8
+# once and appended to a KeyArena, one growable bytearray indexed by parallel
+# start / length arrays. Entries are stored densely (key span, hash, value) and
+# the probe table only holds entry numbers, so a map of millions of short keys
+# pays a few bytes per key instead of a str object, a HashEntry and its dict.
+# Declaring value_type='int64' or 'float64' keeps values unboxed in an array
+# column, which enables increment(), sum_values(), max_value() and the
+# zero-copy values_array(); the sums and maxima run inside NumPy, without
+# boxing a value, when it is installed. Methods include put(), get(), remove(),
+# contains_key(), clear(), empty_buckets(), resize_table(), table_load(),
+# get_keys_and_values(), freeze(), memory_usage(), __iter__(), __next__()
+
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from hash_functions import hash_64, next_prime
+from hash_map_memory import dynamic_array_bytes, empty_report
+
+# probe table markers; other slots hold an entry number
+EMPTY = -1
+DELETED = -2
+
+# array typecodes of the supported value types
+VALUE_TYPES = {'int64': 'q', 'float64': 'd'}
+
+
+def column_sum(values: array, live: bytearray = None):
+    """
+    Returns the sum of a typed value column, counting only the positions whose
+    live flag is set if live is given. With NumPy the column is reduced in
+    place, without creating an object per value; without it every value is
+    boxed once. An int64 total that could overflow is summed exactly instead.
+    """
+    if np is None or len(values) == 0:
+        if live is None:
+            return sum(values)
+        return sum(value for value, flag in zip(values, live) if flag)
+
+    column = np.frombuffer(values, dtype=values.typecode)
+    if live is not None:
+        column = column[np.frombuffer(live, dtype=np.bool_)]
+        if len(column) == 0:
+            return 0 if values.typecode == 'q' else 0.0
+    if values.typecode == 'q':
+        bound = max(abs(int(column.min())), abs(int(column.max())))
+        if bound * len(column) >= 1 << 63:
+            return sum(column.tolist())
+    return column.sum().item()
+
+
+def column_max(values: array, live: bytearray = None):
+    """
+    Returns the largest value of a typed value column, counting only live
+    positions if live is given, or None if there are none. Uses NumPy like
+    column_sum() when it is installed.
+    """
+    if np is None:
+        if live is not None:
+            values = [value for value, flag in zip(values, live) if flag]
+        return max(values) if len(values) != 0 else None
+
+    column = np.frombuffer(values, dtype=values.typecode)
+    if live is not None:
+        column = column[np.frombuffer(live, dtype=np.bool_)]
+    return column.max().item() if len(column) != 0 else None
+
+
+class KeyArena:
+    """
+    Packed storage for string keys: UTF-8 bytes in one bytearray, addressed by
+    key number through parallel start and length arrays
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty arena."""
+        self._data = bytearray()
+        self._starts = array('Q')
+        self._lengths = array('L')
+        self._dead = 0
+
+    def length(self) -> int:
+        """Return the number of keys in the arena."""
+        return len(self._starts)
+
+    def append(self, encoded: bytes) -> int:
+        """Add an encoded key at the end and return its key number."""
+        self._starts.append(len(self._data))
+        self._lengths.append(len(encoded))
+        self._data += encoded
+        return len(self._starts) - 1
+
+    def equals(self, index: int, encoded: bytes) -> bool:
+        """Return True if key number index holds exactly the given bytes."""
+        length = self._lengths[index]
+        if length != len(encoded):
+            return False
+        start = self._starts[index]
+        return self._data[start:start + length] == encoded
+
+    def get(self, index: int) -> str:
+        """Return key number index decoded back to a str."""
+        start = self._starts[index]
+        return self._data[start:start + self._lengths[index]].decode()
+
+    def remove(self, index: int) -> None:
+        """
+        Drop key number index; the last key number takes its place and the
+        removed bytes stay until compact()
+        """
+        self._dead += self._lengths[index]
+        last = len(self._starts) - 1
+        if index != last:
+            self._starts[index] = self._starts[last]
+            self._lengths[index] = self._lengths[last]
+        self._starts.pop()
+        self._lengths.pop()
+
+    def data_bytes(self) -> int:
+        """Return bytes in the arena, removed keys included."""
+        return len(self._data)
+
+    def dead_bytes(self) -> int:
+        """Return bytes held by removed keys."""
+        return self._dead
+
+    def compact(self) -> None:
+        """Rewrite the bytearray so it only holds live keys."""
+        data = bytearray()
+        for index in range(len(self._starts)):
+            start = self._starts[index]
+            self._starts[index] = len(data)
+            data += self._data[start:start + self._lengths[index]]
+        self._data = data
+        self._dead = 0
+
+    def clear(self) -> None:
+        """Remove every key."""
+        self.__init__()
+
+    def buffers(self) -> tuple[bytearray, array, array]:
+        """Return the (data, starts, lengths) buffers backing the arena."""
+        return self._data, self._starts, self._lengths
+
+    @staticmethod
+    def from_buffers(data: bytearray, starts: array, lengths: array) -> "KeyArena":
+        """Return an arena over existing buffers, e.g. ones read from a file."""
+        arena = KeyArena()
+        arena._data = data
+        arena._starts = starts
+        arena._lengths = lengths
+        return arena
+
+    def nbytes(self) -> int:
+        """Return bytes used by the arena's buffers."""
+        return (sys.getsizeof(self._data) + sys.getsizeof(self._starts) +
+                sys.getsizeof(self._lengths))
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_64,
+                 load_factor: float = 0.5,
+                 growth_factor: float = 2,
+                 value_type: str = None) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision
+        resolution and a KeyArena for key storage. value_type None stores any
+        object; 'int64' or 'float64' stores values unboxed in an array column.
+        The default hash_64 keeps puts O(1) at millions of keys; the sample
+        hash functions suit small maps only.
+        """
+        if value_type is not None and value_type not in VALUE_TYPES:
+            raise ValueError(f"value_type must be None or one of {list(VALUE_TYPES)}")
+        self._value_type = value_type
+
+        if not 0 < load_factor <= 0.5:
+            raise ValueError("load_factor must be between 0 and 0.5")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        self._load_factor = load_factor
+        self._growth_factor = growth_factor
+
+        # capacity must be a prime number
+        self._capacity = next_prime(capacity)
+        self._slots = array('l', [EMPTY]) * self._capacity
+        self._deleted = 0
+
+        # dense entry columns, entry i is key number i of the arena
+        self._keys = KeyArena()
+        self._hashes = array('Q')
+        self._values = self._new_values()
+
+        self._hash_function = function
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            entry = self._slots[i]
+            if entry >= 0:
+                out += str(i) + ': ' + self._keys.get(entry) + ' -> ' + str(self._values[entry]) + '\n'
+            else:
+                out += str(i) + ': ' + ('None' if entry == EMPTY else 'DELETED') + '\n'
+        return out
+
+    def _new_values(self):
+        """
+        Returns an empty value column for the map's value type
+        """
+        if self._value_type is None:
+            return DynamicArray()
+        return array(VALUE_TYPES[self._value_type])
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._keys.length()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _find(self, encoded: bytes, hash: int) -> int:
+        """
+        Returns the slot index pointing at the entry for the key, or -1
+        """
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+
+        while self._slots[index] != EMPTY and j < self._capacity:
+            entry = self._slots[index]
+            if entry >= 0 and self._hashes[entry] == hash and self._keys.equals(entry, encoded):
+                return index
+            j += 1
+            index = (initial_index + j ** 2) % self._capacity
+
+        return -1
+
+    def _free_slot(self, hash: int) -> int:
+        """
+        Returns the first EMPTY or DELETED slot on the probe sequence of hash
+        """
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+
+        while self._slots[index] >= 0:
+            j += 1
+            index = (initial_index + j ** 2) % self._capacity
+
+        return index
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates key/value pair in hash map. If the given key already exists in
+        the hash map, it's associated value is replaced with a new value. Table
+        grows by the growth factor when used slots, deleted ones included,
+        reach the max load factor. A value the typed column rejects raises
+        (TypeError, or BufferError while a values_array() view is alive) and
+        leaves the map unchanged.
+        """
+        encoded = key.encode()
+        hash = self._hash_function(key)
+
+        slot = self._find(encoded, hash)
+        if slot != -1:
+            self._values[self._slots[slot]] = value
+            return
+
+        if (self.get_size() + self._deleted + 1) / self._capacity > self._load_factor:
+            self.resize_table(max(self._capacity + 1, int(self._capacity * self._growth_factor)))
+
+        # the value goes in first: if the column rejects it nothing has changed
+        self._values.append(value)
+
+        slot = self._free_slot(hash)
+        if self._slots[slot] == DELETED:
+            self._deleted -= 1
+
+        self._slots[slot] = self._keys.append(encoded)
+        self._hashes.append(hash)
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor
+        """
+        return self.get_size() / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        returns number of empty buckets in hash table
+        """
+        return self._capacity - self.get_size()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Change the capacity of the internal hash table. Entries keep their place
+        in the dense columns; only the probe table is rebuilt, from the stored
+        hashes, so no key is hashed or compared again.
+        """
+        if new_capacity < self.get_size():
+            return
+
+        self._capacity = next_prime(new_capacity)
+        while self.get_size() > self._capacity * self._load_factor:
+            self._capacity = next_prime(2 * self._capacity)
+
+        self._slots = array('l', [EMPTY]) * self._capacity
+        self._deleted = 0
+        for entry in range(self.get_size()):
+            self._slots[self._free_slot(self._hashes[entry])] = entry
+
+        # reclaim arena bytes of removed keys once they outweigh live ones
+        if self._keys.dead_bytes() > self._keys.data_bytes() // 2:
+            self._keys.compact()
+
+    def get(self, key: str) -> object:
+        """
+        returns value associated with a given key. If the key is not in the Hashmap
+        returns None.
+        """
+        slot = self._find(key.encode(), self._hash_function(key))
+        if slot == -1:
+            return None
+        return self._values[self._slots[slot]]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if given key is in the hash map. Otherwise, returns False.
+        """
+        if self.get_size() == 0:
+            return False
+        return self._find(key.encode(), self._hash_function(key)) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        removes given key and its associated value from the hash map. If the
+        key is not in the hash map, does nothing. The last entry is moved into
+        the hole so the entry columns stay dense.
+        """
+        slot = self._find(key.encode(), self._hash_function(key))
+        if slot == -1:
+            return
+
+        # the value column shrinks first: while a values_array() view is
+        # alive it raises BufferError before anything has changed
+        last_value = self._values.pop()
+
+        entry = self._slots[slot]
+        self._slots[slot] = DELETED
+        self._deleted += 1
+
+        last = self.get_size() - 1
+        if entry != last:
+            # repoint the slot of the last entry at the hole, then fill it
+            index = self._slot_of(last)
+            self._slots[index] = entry
+            self._hashes[entry] = self._hashes[last]
+            self._values[entry] = last_value
+
+        self._keys.remove(entry)
+        self._hashes.pop()
+
+    def _slot_of(self, entry: int) -> int:
+        """
+        Returns the slot index pointing at entry
+        """
+        initial_index = self._hashes[entry] % self._capacity
+        index = initial_index
+        j = 0
+
+        while self._slots[index] != entry:
+            j += 1
+            index = (initial_index + j ** 2) % self._capacity
+
+        return index
+
+    def clear(self) -> None:
+        """
+        Clears contents of a hash map without changing underlying hash table capacity
+        """
+        self._slots = array('l', [EMPTY]) * self._capacity
+        self._deleted = 0
+        self._keys.clear()
+        self._hashes = array('Q')
+        self._values = self._new_values()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        returns a dynamic array where each index contains a tuple key/value pair
+        stored in the hash map.
+        """
+        keys_and_values = DynamicArray()
+
+        for entry in range(self.get_size()):
+            keys_and_values.append((self._keys.get(entry), self._values[entry]))
+
+        return keys_and_values
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        slots a successful lookup of it examines (its probe sequence length)
+        """
+        lengths = DynamicArray()
+        for index in range(self._capacity):
+            entry = self._slots[index]
+            if entry < 0:
+                continue
+            initial_index = self._hashes[entry] % self._capacity
+            j = 0
+            while (initial_index + j ** 2) % self._capacity != index:
+                j += 1
+            lengths.append(j + 1)
+        return lengths
+
+    def freeze(self) -> "FrozenHashMap":
+        """
+        Returns an immutable FrozenHashMap with the current contents, built on a
+        minimal perfect hash so every lookup costs one slot and one key check
+        """
+        # imported here: hash_map_frozen builds on this module's KeyArena
+        from hash_map_frozen import FrozenHashMap
+
+        return FrozenHashMap(self.get_keys_and_values())
+
+    def memory_usage(self, deep: bool = True) -> dict:
+        """
+        Returns a dict of bytes used by the map, in the categories used by the
+        other maps: table (probe table), entries (hash and key span columns plus
+        the value array), empty and tombstones (unused / deleted probe slots),
+        keys (the arena bytes) and, when deep is True, values. 'total' adds
+        them all up.
+        """
+        report = empty_report()
+        slot_bytes = self._slots.itemsize
+
+        report['empty'] = (self._capacity - self.get_size() - self._deleted) * slot_bytes
+        report['tombstones'] = self._deleted * slot_bytes
+        report['table'] = sys.getsizeof(self._slots) - report['empty'] - report['tombstones']
+        report['keys'] = self._keys.nbytes()
+        if self._value_type is not None:
+            # unboxed values live inside the column itself
+            report['entries'] = sys.getsizeof(self._hashes)
+            report['values'] = sys.getsizeof(self._values)
+        else:
+            report['entries'] = sys.getsizeof(self._hashes) + dynamic_array_bytes(self._values)
+        if deep and self._value_type is None:
+            for entry in range(self.get_size()):
+                report['values'] += sys.getsizeof(self._values[entry])
+
+        report['total'] = sum(report.values())
+        return report
+
+    # --------------------- typed value columns ------------------------ #
+
+    def _typed_values(self):
+        """
+        Returns the value array, or raises if the map has no value type
+        """
+        if self._value_type is None:
+            raise TypeError("map was created without a value_type")
+        return self._values
+
+    def increment(self, key: str, delta=1):
+        """
+        Adds delta to the value of key, starting from 0 if the key is not in
+        the map, and returns the new value. Needs a value_type.
+        """
+        values = self._typed_values()
+        slot = self._find(key.encode(), self._hash_function(key))
+        if slot == -1:
+            self.put(key, delta)
+            return delta
+
+        entry = self._slots[slot]
+        values[entry] += delta
+        return values[entry]
+
+    def sum_values(self):
+        """
+        Returns the sum of all values, see column_sum(). Needs a value_type.
+        """
+        return column_sum(self._typed_values())
+
+    def max_value(self):
+        """
+        Returns the largest value, or None for an empty map, see column_max().
+        Needs a value_type.
+        """
+        return column_max(self._typed_values())
+
+    def values_array(self) -> memoryview:
+        """
+        Returns a zero-copy memoryview of the value column, in the same order
+        as the keys of get_keys_and_values(); numpy.frombuffer() can wrap it
+        without copying. Release the view before the next put or remove: the
+        column cannot grow or shrink while a view of it exists, so they raise
+        BufferError and leave the map unchanged. Needs a value_type.
+        """
+        return memoryview(self._typed_values())
+
+    def __iter__(self):
+        """
+        Create iterator for loop
+        """
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next value and advance iterator
+        """
+        if self._index < self.get_size():
+            entry = self._index
+            self._index += 1
+            return HashEntry(self._keys.get(entry), self._values[entry])
+
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    import hash_map_oa
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nget / contains_key / remove example")
+    print("-----------------------------------")
+    m = HashMap(11, hash_function_2)
+    keys = [str(i) + 'é' for i in range(1, 2000, 7)]
+    for key in keys:
+        m.put(key, key)
+    for key in keys[::2]:
+        m.remove(key)
+    m.resize_table(10)
+    result = all(m.contains_key(key) != (index % 2 == 0) for index, key in enumerate(keys))
+    result &= all(m.get(key) == key for key in keys[1::2])
+    print(result, m.get_size(), m.get_capacity(), m.get_keys_and_values().length())
+    m = HashMap()
+    for key in ('abcd', 'efgh', 'ijkl'):
+        m.put(key, key)
+    m.remove('abcd')
+    m.remove('ijkl')
+    print(m._keys.dead_bytes(), m._keys.data_bytes(), m.get('efgh'))
+
+    print("\nmemory example")
+    print("--------------")
+    arena_map = HashMap(11, hash_function_2)
+    entry_map = hash_map_oa.HashMap(11, hash_function_2)
+    for i in range(20_000):
+        arena_map.put('str' + str(i), i)
+        entry_map.put('str' + str(i), i)
+    arena_report = arena_map.memory_usage(deep=False)
+    entry_report = entry_map.memory_usage(deep=False)
+    print(arena_report['keys'] + arena_report['entries'] < entry_report['entries'],
+          round(arena_report['total'] / entry_report['total'], 2))
+
+    print("\nscaling example")
+    print("---------------")
+    for size in (50_000, 200_000):
+        m = HashMap()
+        start = time.perf_counter()
+        for i in range(size):
+            m.put('user:' + str(i), i)
+        elapsed = time.perf_counter() - start
+        print(size, m.get('user:' + str(size - 1)), f"{elapsed / size * 1e6:.1f} us per put")
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    m = HashMap(10, hash_function_1)
+    for i in range(5):
+        m.put(str(i), str(i * 10))
+    m.remove('1')
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\ntyped value column example")
+    print("--------------------------")
+    counts = HashMap(11, hash_function_2, value_type='int64')
+    for word in ['apple', 'grape', 'apple', 'melon', 'apple', 'grape']:
+        counts.increment(word)
+    counts.remove('melon')
+    print(counts.get('apple'), counts.sum_values(), counts.max_value())
+    with counts.values_array() as view:
+        print(view.format, view.tolist())
+    scores = HashMap(value_type='float64')
+    scores.put('a', 1.5)
+    scores.put('b', -2.25)
+    print(scores.sum_values(), scores.max_value(), scores.memory_usage()['values'] > 0)
+
+    print("\nrejected value example")
+    print("----------------------")
+    counts = HashMap(11, hash_function_2, value_type='int64')
+    counts.put('a', 1)
+    for attempt in (lambda: counts.put('b', 'x'), lambda: counts.increment('c', 0.5),
+                    lambda: counts.increment('a', 0.5)):
+        try:
+            attempt()
+        except TypeError as error:
+            print('TypeError:', error)
+    with counts.values_array() as view:
+        for attempt in (lambda: counts.put('d', 4), lambda: counts.remove('a')):
+            try:
+                attempt()
+            except BufferError as error:
+                print('BufferError:', error)
+    counts.put('e', 5)
+    counts.remove('a')
+    print(counts.get_size(), counts.get('b'), counts.get('e'), counts.get_keys_and_values())
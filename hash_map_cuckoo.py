@@ -0,0 +1,476 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of HashMap using bucketized Cuckoo Hashing for
+# collision resolution. Every key has exactly two candidate buckets, picked by
+# two independent seeded hashes, and each bucket holds up to four entries. On
+# collision, resident entries are kicked to their alternate bucket. Lookups
+# touch at most two buckets plus an overflow stash of at most STASH_SIZE
+# entries, so get() is worst-case O(1). When an insert finds the stash full the
+# table is rebuilt under a new seed, and grows only if reseeding keeps failing.
+# Methods include put(), get(), remove(), contains_key(), clear(),
+# empty_buckets(), resize_table(), table_load(), get_keys_and_values(),
+# __iter__(), __next__()
+
+import random
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from hash_functions import hash_128, mix_64, next_prime
+
+# number of entries that fit in one bucket
+SLOTS_PER_BUCKET = 4
+
+# relocations tried before an insert is considered a cycle
+MAX_KICKS = 64
+
+# entries allowed in the overflow stash before the table is rebuilt
+STASH_SIZE = 4
+
+# new seeds tried at one capacity before the table grows
+REHASH_ATTEMPTS = 4
+
+# doublings tried for one failed insert before it is refused
+MAX_GROWTHS = 2
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = None,
+                 function_2: callable = hash_function_2) -> None:
+        """
+        Initialize new HashMap that uses cuckoo hashing for collision resolution.
+        capacity is the number of buckets; each bucket holds SLOTS_PER_BUCKET
+        entries. By default the two candidate buckets come from hash_128() of
+        the key under the table's seed, so each seed places keys independently.
+        If function is given, function and function_2 pick them instead, mixed
+        with the seed. Keys that collide under both of those functions collide
+        under every seed, so only the default hashes can always be reseeded.
+        """
+        self._capacity = next_prime(capacity)
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity * SLOTS_PER_BUCKET):
+            self._buckets.append(None)
+
+        # entries that could not be placed after MAX_KICKS relocations
+        self._stash = DynamicArray()
+
+        self._hash_function = function
+        self._hash_function_2 = function_2
+        self._seed = 0
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for bucket in range(self._capacity):
+            start = bucket * SLOTS_PER_BUCKET
+            slots = [str(self._buckets[start + slot]) for slot in range(SLOTS_PER_BUCKET)]
+            out += str(bucket) + ': ' + ', '.join(slots) + '\n'
+        if self._stash.length() > 0:
+            out += 'stash: ' + str(self._stash.length()) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map (number of buckets)
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _bucket_indices(self, key: str) -> tuple[int, int]:
+        """
+        Returns the two candidate buckets for key
+        """
+        if self._hash_function is None:
+            hash_1, hash_2 = hash_128(key, self._seed)
+        else:
+            hash_1 = mix_64(self._hash_function(key) ^ self._seed)
+            hash_2 = mix_64(self._hash_function_2(key) ^ self._seed)
+        return hash_1 % self._capacity, hash_2 % self._capacity
+
+    def _find_slot(self, key: str, bucket_1: int, bucket_2: int) -> int:
+        """
+        Returns the slot index holding key in either candidate bucket, or -1
+        """
+        for bucket in (bucket_1, bucket_2):
+            start = bucket * SLOTS_PER_BUCKET
+            for slot in range(start, start + SLOTS_PER_BUCKET):
+                entry = self._buckets[slot]
+                if entry is not None and entry.key == key:
+                    return slot
+        return -1
+
+    def _find_stash(self, key: str) -> int:
+        """
+        Returns the stash index holding key, or -1
+        """
+        for index in range(self._stash.length()):
+            if self._stash[index].key == key:
+                return index
+        return -1
+
+    def _free_slot(self, bucket: int) -> int:
+        """
+        Returns the first free slot index in bucket, or -1 if the bucket is full
+        """
+        start = bucket * SLOTS_PER_BUCKET
+        for slot in range(start, start + SLOTS_PER_BUCKET):
+            if self._buckets[slot] is None:
+                return slot
+        return -1
+
+    def _place(self, entry: HashEntry, moves: list = None) -> HashEntry:
+        """
+        Inserts entry by relocating residents between their two candidate buckets.
+        Returns None on success, or the entry left homeless when a cycle is found.
+        If moves is given, (slot, previous entry) is appended to it for every slot
+        written, so the insert can be undone.
+        """
+        bucket_1, bucket_2 = self._bucket_indices(entry.key)
+        bucket = bucket_1
+
+        for _ in range(MAX_KICKS):
+            for candidate in (bucket_1, bucket_2):
+                slot = self._free_slot(candidate)
+                if slot != -1:
+                    if moves is not None:
+                        moves.append((slot, None))
+                    self._buckets[slot] = entry
+                    return None
+
+            # both buckets are full: evict a random resident from the current one
+            slot = bucket * SLOTS_PER_BUCKET + random.randrange(SLOTS_PER_BUCKET)
+            if moves is not None:
+                moves.append((slot, self._buckets[slot]))
+            entry, self._buckets[slot] = self._buckets[slot], entry
+
+            # the evicted entry moves to the bucket that is not the one it was in
+            bucket_1, bucket_2 = self._bucket_indices(entry.key)
+            bucket = bucket_2 if bucket_1 == bucket else bucket_1
+
+        return entry
+
+    def _entries(self) -> list:
+        """
+        Returns every entry in the table and the stash
+        """
+        entries = [self._buckets[slot] for slot in range(self._buckets.length())
+                   if self._buckets[slot] is not None]
+        entries.extend(self._stash[index] for index in range(self._stash.length()))
+        return entries
+
+    def _build(self, capacity: int, entries: list) -> bool:
+        """
+        Places entries in a new, empty table of capacity buckets under the current
+        seed. Returns False as soon as an entry finds the stash full.
+        """
+        self._capacity = capacity
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity * SLOTS_PER_BUCKET):
+            self._buckets.append(None)
+        self._stash = DynamicArray()
+
+        for entry in entries:
+            homeless = self._place(entry)
+            if homeless is not None:
+                if self._stash.length() == STASH_SIZE:
+                    return False
+                self._stash.append(homeless)
+        return True
+
+    def _rebuild(self, capacity: int, entries: list) -> bool:
+        """
+        Rebuilds the table with entries, first under the current seed, then under
+        REHASH_ATTEMPTS new seeds per capacity, doubling the capacity at most
+        MAX_GROWTHS times. Returns False, with the table half built, if all fail.
+        """
+        if self._build(capacity, entries):
+            return True
+
+        for growth in range(MAX_GROWTHS + 1):
+            if growth > 0:
+                capacity = next_prime(2 * capacity)
+            for _ in range(REHASH_ATTEMPTS):
+                self._seed = random.getrandbits(64)
+                if self._build(capacity, entries):
+                    return True
+        return False
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates key/value pair in hash map. If the given key already exists in
+        the hash map, it's associated value is replaced with a new value. Table
+        is resized to double its current capacity when the load factor is greater
+        than or equal to 0.9. When a relocation cycle finds the stash full, the
+        table is rebuilt under new seeds and, failing that, grown; if that fails
+        too, the map is left unchanged and ValueError is raised.
+        """
+        bucket_1, bucket_2 = self._bucket_indices(key)
+
+        # if key is already in one of its buckets or the stash, replace value
+        slot = self._find_slot(key, bucket_1, bucket_2)
+        if slot != -1:
+            self._buckets[slot].value = value
+            return
+        index = self._find_stash(key)
+        if index != -1:
+            self._stash[index].value = value
+            return
+
+        if self.table_load() >= 0.9:
+            self.resize_table(2 * self._capacity)
+
+        moves = []
+        homeless = self._place(HashEntry(key, value), moves)
+        if homeless is not None:
+            if self._stash.length() < STASH_SIZE:
+                # relocation cycle: park the entry in the stash
+                self._stash.append(homeless)
+            else:
+                # stash full: reseed or grow, or undo the relocations and give up
+                saved = self._capacity, self._buckets, self._stash, self._seed
+                if not self._rebuild(self._capacity, self._entries() + [homeless]):
+                    self._capacity, self._buckets, self._stash, self._seed = saved
+                    for slot, previous in reversed(moves):
+                        self._buckets[slot] = previous
+                    raise ValueError(f"could not place {key!r}: too many keys share both of its buckets")
+        self._size += 1
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor (entries per slot)
+        """
+        return self._size / (self._capacity * SLOTS_PER_BUCKET)
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of buckets with no entries in hash table
+        """
+        count = 0
+        for bucket in range(self._capacity):
+            start = bucket * SLOTS_PER_BUCKET
+            if all(self._buckets[slot] is None
+                   for slot in range(start, start + SLOTS_PER_BUCKET)):
+                count += 1
+        return count
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Change the number of buckets in the internal hash table. All existing
+        key/value pairs remain in the new hash map and are rehashed, under new
+        seeds or into a larger table if they do not fit; if nothing fits, the
+        map is left unchanged and ValueError is raised.
+        """
+        # if the new table cannot hold every entry, do nothing
+        if new_capacity * SLOTS_PER_BUCKET < self._size:
+            return
+
+        saved = self._capacity, self._buckets, self._stash, self._seed
+        if not self._rebuild(next_prime(new_capacity), self._entries()):
+            self._capacity, self._buckets, self._stash, self._seed = saved
+            raise ValueError("could not rehash the table: too many keys share both of their buckets")
+
+    def get(self, key: str) -> object:
+        """
+        returns value associated with a given key. If the key is not in the Hashmap
+        returns None.
+        """
+        bucket_1, bucket_2 = self._bucket_indices(key)
+        slot = self._find_slot(key, bucket_1, bucket_2)
+        if slot != -1:
+            return self._buckets[slot].value
+
+        if self._stash.length() > 0:
+            index = self._find_stash(key)
+            if index != -1:
+                return self._stash[index].value
+
+        return None
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if given key is in the hash map. Otherwise, returns False.
+        """
+        if self._size == 0:
+            return False
+
+        bucket_1, bucket_2 = self._bucket_indices(key)
+        if self._find_slot(key, bucket_1, bucket_2) != -1:
+            return True
+
+        return self._stash.length() > 0 and self._find_stash(key) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        removes given key and its associated value from the hash map. If the
+        key is not in the hash map, does nothing.
+        """
+        bucket_1, bucket_2 = self._bucket_indices(key)
+        slot = self._find_slot(key, bucket_1, bucket_2)
+        if slot != -1:
+            # cuckoo slots never need tombstones: lookups do not probe past them
+            self._buckets[slot] = None
+            self._size -= 1
+            return
+
+        index = self._find_stash(key)
+        if index != -1:
+            # move last stash entry into the removed position
+            last = self._stash.pop()
+            if index < self._stash.length():
+                self._stash[index] = last
+            self._size -= 1
+
+    def clear(self) -> None:
+        """
+        Clears contents of a hash map without changing underlying hash table capacity
+        """
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity * SLOTS_PER_BUCKET):
+            self._buckets.append(None)
+        self._stash = DynamicArray()
+        self._size = 0
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        returns a dynamic array where each index contains a tuple key/value pair
+        stored in the hash map.
+        """
+        keys_and_values = DynamicArray()
+
+        for index in range(self._buckets.length()):
+            if self._buckets[index] is not None:
+                keys_and_values.append((self._buckets[index].key, self._buckets[index].value))
+
+        for index in range(self._stash.length()):
+            keys_and_values.append((self._stash[index].key, self._stash[index].value))
+
+        return keys_and_values
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        slots a successful lookup of it examines: the first candidate bucket,
+        then the second, then the stash
+        """
+        lengths = DynamicArray()
+        for slot in range(self._buckets.length()):
+            entry = self._buckets[slot]
+            if entry is not None:
+                bucket_1, _ = self._bucket_indices(entry.key)
+                position = slot % SLOTS_PER_BUCKET + 1
+                lengths.append(position if slot // SLOTS_PER_BUCKET == bucket_1
+                               else SLOTS_PER_BUCKET + position)
+        for index in range(self._stash.length()):
+            lengths.append(2 * SLOTS_PER_BUCKET + index + 1)
+        return lengths
+
+    def __iter__(self):
+        """
+        Create iterator for loop
+        """
+        # tracks all slots, then the stash
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next value and advance iterator
+        """
+        slots = self._buckets.length()
+        while self._index < slots:
+            entry = self._buckets[self._index]
+            self._index += 1
+            if entry is not None:
+                return entry
+
+        if self._index - slots < self._stash.length():
+            entry = self._stash[self._index - slots]
+            self._index += 1
+            return entry
+
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import itertools
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nput example 2")
+    print("-------------")
+    m = HashMap(41, hash_function_2, hash_function_1)
+    for i in range(50):
+        m.put('str' + str(i // 3), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nget / contains_key / remove example")
+    print("-----------------------------------")
+    m = HashMap(11)
+    keys = [str(i) for i in range(1, 2000, 7)]
+    for key in keys:
+        m.put(key, int(key) * 42)
+    result = True
+    for key in keys:
+        result &= m.get(key) == int(key) * 42
+        result &= not m.contains_key(key + 'x')
+    print(result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+    for key in keys[::2]:
+        m.remove(key)
+    result = all(m.contains_key(key) != (index % 2 == 0) for index, key in enumerate(keys))
+    print(result, m.get_size())
+
+    print("\nresize / get_keys_and_values example")
+    print("------------------------------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.resize_table(2)
+    m.put('20', '200')
+    m.remove('1')
+    print(m.get_keys_and_values())
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    m = HashMap(3, hash_function_1)
+    for i in range(5):
+        m.put(str(i), str(i * 10))
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\ncolliding keys example")
+    print("----------------------")
+    # 30 keys with the same hash_function_1 and hash_function_2 as 'afgga'
+    target = hash_function_1('afgga'), hash_function_2('afgga')
+    words = (''.join(letters) for letters in itertools.product('abcdefgh', repeat=5))
+    colliding = [key for key in words if (hash_function_1(key), hash_function_2(key)) == target][:30]
+    print(len({(hash_function_1(key), hash_function_2(key)) for key in colliding}))
+    m = HashMap(11)
+    for key in colliding:
+        m.put(key, key.upper())
+    print(m.get_size(), m.get_capacity(), all(m.get(key) == key.upper() for key in colliding))
+    m = HashMap(11, hash_function_1, hash_function_2)
+    try:
+        for key in colliding:
+            m.put(key, key.upper())
+    except ValueError as error:
+        print(error)
+    print(m.get_size(), m.get_capacity(), m.get(colliding[0]), m.contains_key(colliding[-1]))
@@ -0,0 +1,474 @@
+# Course: CS261 - Data Structures
+# Description: Durable wrapper around the separate chaining HashMap. Every put()
+# and remove() is appended to a binary write-ahead log (WAL) before it is
+# applied, and log writes are made durable in groups: one fsync covers every
+# write since the last one, after sync_every writes and/or every sync_interval
+# seconds. On open, the map is rebuilt from the latest snapshot file plus the
+# log written after it, presized for the number of keys found. Once the log
+# grows past compact_bytes, a background thread writes a new snapshot from an
+# O(1) HashMap.snapshot() and deletes the log segments it covers, so recovery
+# only replays the tail. A failed background compaction is reported as a
+# CompactionError by the next compact() or close(), never by put() or remove().
+
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+from a6_include import DynamicArray, hash_function_1
+from hash_map_sc import HashMap
+
+# record operations
+PUT = 1
+REMOVE = 2
+
+# crc32, operation, key length, value length, then key and value bytes
+_RECORD = struct.Struct('<IBII')
+
+# magic, first log segment not covered by the snapshot, number of pairs
+_SNAPSHOT_MAGIC = b'DHM1'
+_SNAPSHOT_HEADER = struct.Struct('<4sQQ')
+
+_SNAPSHOT_FILE = 'snapshot.dat'
+_SEGMENT_FILE = 'wal-{:08d}.log'
+
+
+class CompactionError(Exception):
+    pass
+
+
+def _record(operation: int, key: str, value: bytes = b'') -> bytes:
+    """
+    Returns one log record; the checksum covers everything after it
+    """
+    encoded = key.encode()
+    body = _RECORD.pack(0, operation, len(encoded), len(value))[4:] + encoded + value
+    return struct.pack('<I', zlib.crc32(body)) + body
+
+
+def _read_records(data: bytes, offset: int = 0) -> tuple[list, int]:
+    """
+    Returns ([(operation, key, value bytes), ...], end offset) for the records
+    in data starting at offset. Reading stops at the first torn or corrupt
+    record, which is where the last crash interrupted a write.
+    """
+    records = []
+    while offset + _RECORD.size <= len(data):
+        crc, operation, key_length, value_length = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + key_length + value_length
+        if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+            break
+        key_start = offset + _RECORD.size
+        records.append((operation, data[key_start:key_start + key_length].decode(),
+                        data[key_start + key_length:end]))
+        offset = end
+    return records, offset
+
+
+def _fsync_directory(directory: str) -> None:
+    """
+    Makes file creations, renames and deletions in directory durable
+    """
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class DurableHashMap:
+    def __init__(self, directory: str, function: callable = hash_function_1,
+                 load_factor: float = 1.0, sync_every: int = 1,
+                 sync_interval: float = None, compact_bytes: int = 4 << 20) -> None:
+        """
+        Open (or create) the durable map stored in directory.
+        sync_every: fsync after this many writes; 1 makes every write durable
+            before it returns, None leaves syncing to sync_interval and sync()
+        sync_interval: if set, a background thread fsyncs pending writes at
+            least this often (seconds), bounding what a crash can lose
+        compact_bytes: log size that starts a background compaction; None
+            compacts only when compact() is called
+        """
+        if sync_every is not None and sync_every < 1:
+            raise ValueError("sync_every must be at least 1")
+
+        self._directory = directory
+        self._sync_every = sync_every
+        self._compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._syncs = 0
+        self._compaction = None
+        self._compaction_error = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._map, self._segment, self._log_bytes = self._recover(function, load_factor)
+        self._file = open(self._segment_path(self._segment), 'ab')
+        _fsync_directory(directory)
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if sync_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_periodically,
+                                             args=(sync_interval,), daemon=True)
+            self._flusher.start()
+
+    def _segment_path(self, segment: int) -> str:
+        """
+        Returns path of a log segment
+        """
+        return os.path.join(self._directory, _SEGMENT_FILE.format(segment))
+
+    def _segments(self) -> list:
+        """
+        Returns numbers of the log segments in the directory, oldest first
+        """
+        segments = []
+        for name in os.listdir(self._directory):
+            if name.startswith('wal-') and name.endswith('.log'):
+                segments.append(int(name[4:-4]))
+        return sorted(segments)
+
+    # ------------------------------------------------------------------ #
+
+    def _recover(self, function: callable, load_factor: float) -> tuple[HashMap, int, int]:
+        """
+        Rebuilds the map from the snapshot and the log segments written after
+        it. Returns (map, segment to append to, bytes in that segment).
+        """
+        first_segment = 0
+        snapshot_records = []
+        path = os.path.join(self._directory, _SNAPSHOT_FILE)
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                data = file.read()
+            magic, first_segment, count = _SNAPSHOT_HEADER.unpack_from(data)
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a DurableHashMap snapshot")
+            snapshot_records, _ = _read_records(data, _SNAPSHOT_HEADER.size)
+            if len(snapshot_records) != count:
+                raise ValueError(f"{path} is truncated")
+
+        # segments older than the snapshot are left over from a compaction
+        # that crashed before deleting them
+        segments = []
+        for segment in self._segments():
+            if segment < first_segment:
+                os.remove(self._segment_path(segment))
+            else:
+                segments.append(segment)
+
+        log_records = []
+        log_bytes = 0
+        for segment in segments:
+            with open(self._segment_path(segment), 'rb') as file:
+                data = file.read()
+            records, log_bytes = _read_records(data)
+            log_records.extend(records)
+            if log_bytes < len(data):
+                # drop the torn tail, and anything after it, left by a crash
+                with open(self._segment_path(segment), 'r+b') as file:
+                    file.truncate(log_bytes)
+                for later in segments[segments.index(segment) + 1:]:
+                    os.remove(self._segment_path(later))
+                segments = segments[:segments.index(segment) + 1]
+                break
+
+        # presize for every key that may be live, so replay never resizes
+        puts = sum(1 for record in log_records if record[0] == PUT)
+        expected = len(snapshot_records) + puts
+        hash_map = HashMap(max(11, int(expected / load_factor) + 1), function,
+                           load_factor=load_factor)
+        for records in (snapshot_records, log_records):
+            for operation, key, value in records:
+                if operation == PUT:
+                    hash_map.put(key, pickle.loads(value))
+                else:
+                    hash_map.remove(key)
+
+        if not segments:
+            return hash_map, first_segment, 0
+        return hash_map, segments[-1], log_bytes
+
+    def _append(self, record: bytes) -> None:
+        """
+        Writes a record to the log and syncs once a group is complete. Caller
+        holds the lock.
+        """
+        self._file.write(record)
+        self._log_bytes += len(record)
+        self._pending += 1
+        if self._sync_every is not None and self._pending >= self._sync_every:
+            self._sync()
+
+    def _sync(self) -> None:
+        """
+        Makes every pending record durable with one fsync. Caller holds the lock.
+        """
+        if self._pending == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._syncs += 1
+
+    def _flush_periodically(self, interval: float) -> None:
+        """
+        Background group commit: syncs pending records every interval seconds
+        """
+        while not self._closed.wait(interval):
+            with self._lock:
+                if not self._file.closed:
+                    self._sync()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Logs and applies a put. The write is durable once the group it belongs
+        to is synced (right away with sync_every=1).
+        """
+        record = _record(PUT, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._append(record)
+            self._map.put(key, value)
+            self._maybe_compact()
+
+    def remove(self, key: str) -> None:
+        """
+        Logs and applies removal of a key. Removing a missing key is not logged.
+        """
+        with self._lock:
+            if not self._map.contains_key(key):
+                return
+            self._append(_record(REMOVE, key))
+            self._map.remove(key)
+            self._maybe_compact()
+
+    def get(self, key: str):
+        """
+        returns the value associated with a given key.
+        If key is not in the map returns None
+        """
+        return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the map. Otherwise, returns False
+        """
+        return self._map.contains_key(key)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value
+        pair stored in the map.
+        """
+        return self._map.get_keys_and_values()
+
+    def sync(self) -> None:
+        """
+        Makes every write so far durable
+        """
+        with self._lock:
+            self._sync()
+
+    def get_stats(self) -> dict:
+        """
+        Returns a dict with the current log segment, its size in bytes, writes
+        not yet synced and the number of fsyncs done since open
+        """
+        with self._lock:
+            return {'segment': self._segment, 'log_bytes': self._log_bytes,
+                    'pending': self._pending, 'syncs': self._syncs}
+
+    # ------------------------- compaction ----------------------------- #
+
+    def _maybe_compact(self) -> None:
+        """
+        Starts a background compaction once the log is large enough. After a
+        failed compaction none is started until compact() or close() reports
+        the error. Caller holds the lock.
+        """
+        if self._compact_bytes is not None and self._log_bytes >= self._compact_bytes \
+                and self._compaction is None and self._compaction_error is None:
+            self._start_compaction()
+
+    def _raise_compaction_error(self) -> None:
+        """
+        Raises CompactionError for a failed background compaction, once
+        """
+        if self._compaction_error is not None:
+            error, self._compaction_error = self._compaction_error, None
+            raise CompactionError("background compaction failed; the log was kept "
+                                  "and replays on open") from error
+
+    def _start_compaction(self) -> None:
+        """
+        Takes a snapshot of the map, switches writes to a new log segment and
+        writes the snapshot in a background thread. Caller holds the lock.
+        """
+        self._sync()
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        _fsync_directory(self._directory)
+        self._log_bytes = 0
+
+        snapshot = self._map.snapshot()
+        self._compaction = threading.Thread(target=self._write_snapshot,
+                                            args=(snapshot, self._segment), daemon=True)
+        self._compaction.start()
+
+    def _write_snapshot(self, snapshot, first_segment: int) -> None:
+        """
+        Writes the snapshot file, then deletes the log segments it covers
+        """
+        try:
+            path = os.path.join(self._directory, _SNAPSHOT_FILE)
+            temp_path = path + '.tmp'
+            key_value_pairs = snapshot.get_keys_and_values()
+            with open(temp_path, 'wb') as file:
+                file.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, first_segment,
+                                                 key_value_pairs.length()))
+                for index in range(key_value_pairs.length()):
+                    key, value = key_value_pairs[index]
+                    file.write(_record(PUT, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+            _fsync_directory(self._directory)
+
+            for segment in self._segments():
+                if segment < first_segment:
+                    os.remove(self._segment_path(segment))
+        except Exception as error:
+            # reported by the next compact() or close()
+            self._compaction_error = error
+        finally:
+            self._compaction = None
+
+    def compact(self, wait: bool = True) -> None:
+        """
+        Compacts the log into a new snapshot. Does nothing if a compaction is
+        already running, apart from waiting for it if wait is True. Raises
+        CompactionError if an earlier background compaction failed, or if this
+        one fails while waited for.
+        """
+        with self._lock:
+            self._raise_compaction_error()
+            if self._compaction is None:
+                self._start_compaction()
+            compaction = self._compaction
+        if wait and compaction is not None:
+            compaction.join()
+            self._raise_compaction_error()
+
+    def close(self) -> None:
+        """
+        Syncs pending writes, waits for a running compaction and closes the log.
+        Raises CompactionError if a background compaction failed.
+        """
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        with self._lock:
+            self._sync()
+            self._file.close()
+        self._raise_compaction_error()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import time
+
+    print("\nput / remove / reopen example")
+    print("-----------------------------")
+    directory = tempfile.mkdtemp()
+    m = DurableHashMap(directory, sync_every=None)
+    for i in range(1000):
+        m.put('key' + str(i), i)
+    for i in range(0, 1000, 2):
+        m.remove('key' + str(i))
+    m.close()
+    m = DurableHashMap(directory)
+    print(m.get_size(), m.get('key1'), m.get('key2'), m.get_stats()['log_bytes'] > 0)
+    m.close()
+
+    print("\ntorn write example")
+    print("------------------")
+    segment = os.path.join(directory, _SEGMENT_FILE.format(0))
+    with open(segment, 'ab') as file:
+        file.write(_record(PUT, 'key0', pickle.dumps(0))[:-3])
+    m = DurableHashMap(directory)
+    m.put('key0', 'after crash')
+    m.close()
+    m = DurableHashMap(directory)
+    print(m.get_size(), m.get('key0'))
+    m.close()
+
+    print("\ncompaction example")
+    print("------------------")
+    m = DurableHashMap(directory, sync_every=None, compact_bytes=20_000)
+    for i in range(5000):
+        m.put('key' + str(i % 500), i)
+    m.compact()
+    m.put('tail', 1)
+    m.close()
+    print(sorted(os.listdir(directory)))
+    m = DurableHashMap(directory)
+    print(m.get_size(), m.get('key499'), m.get('tail'))
+    m.close()
+
+    print("\nfailed compaction example")
+    print("-------------------------")
+    # a directory in the way of the temporary snapshot file makes writing it fail
+    os.mkdir(os.path.join(directory, _SNAPSHOT_FILE + '.tmp'))
+    m = DurableHashMap(directory, sync_every=None, compact_bytes=2_000)
+    for i in range(500):
+        m.put('key' + str(i), i)
+    try:
+        m.compact()
+    except CompactionError as error:
+        print(type(error).__name__, type(error.__cause__).__name__)
+    m.put('after', 1)
+    os.rmdir(os.path.join(directory, _SNAPSHOT_FILE + '.tmp'))
+    m.compact()
+    m.close()
+    m = DurableHashMap(directory)
+    print(m.get_size(), m.get('key499'), m.get('after'), sorted(os.listdir(directory)))
+    m.close()
+    shutil.rmtree(directory)
+
+    print("\ngroup commit throughput example")
+    print("-------------------------------")
+    plain = HashMap()
+    start = time.perf_counter()
+    for i in range(20_000):
+        plain.put('key' + str(i), i)
+    memory_rate = 20_000 / (time.perf_counter() - start)
+    for sync_every, sync_interval, writes in ((1, None, 200), (100, None, 20_000),
+                                              (None, 0.05, 20_000)):
+        directory = tempfile.mkdtemp()
+        m = DurableHashMap(directory, sync_every=sync_every, sync_interval=sync_interval)
+        start = time.perf_counter()
+        for i in range(writes):
+            m.put('key' + str(i), i)
+        rate = writes / (time.perf_counter() - start)
+        m.close()
+        print(f"sync_every={sync_every}, sync_interval={sync_interval}: "
+              f"{rate / memory_rate:.2f}x in-memory speed")
+        shutil.rmtree(directory)
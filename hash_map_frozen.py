@@ -0,0 +1,370 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of an immutable FrozenHashMap for read-only lookup
+# tables, built with a CHD (compress, hash, displace) minimal perfect hash. Keys
+# are split into small buckets and every bucket gets a displacement that sends
+# all its keys to distinct positions of a table a little larger than the key
+# count, which keeps the displacement search short. A rank array then numbers
+# the used positions, so n keys fill exactly n slots and a lookup is one hash,
+# one rank and one key check; there are no tombstones or probe sequences. Keys
+# are packed in a KeyArena in slot order, and the whole table saves to and
+# loads from a compact binary file of little-endian columns, each stored at the
+# narrowest integer width its largest value needs, so a file reads the same on
+# any platform. Methods include get(), contains_key(), get_keys_and_values(),
+# save(), load(), __iter__(), __next__()
+
+import hashlib
+import pickle
+import struct
+import sys
+from array import array
+
+from a6_include import DynamicArray, HashEntry
+from hash_functions import next_prime
+from hash_map_arena import KeyArena
+
+# average number of keys per CHD bucket
+BUCKET_SIZE = 5
+
+# fraction of the table positions filled while displacements are searched
+LOAD_FACTOR = 0.81
+
+# displacements tried for one bucket before the seed is given up
+MAX_DISPLACEMENTS = 1 << 16
+
+# seeds tried before giving up on building the table
+MAX_SEEDS = 32
+
+_MAGIC = b'FHM3'
+# magic, size, buckets, table size, seed, key bytes, value bytes, then the item
+# size of the displacement, rank, key start and key length columns
+_HEADER = struct.Struct('<4sQQQQQQBBBB')
+
+# array typecode of each unsigned item size a column can be stored at
+_TYPECODES = {array(code).itemsize: code for code in 'QLIHB'}
+
+
+def _width(maximum: int) -> int:
+    """
+    Returns the smallest item size, 1, 2, 4 or 8 bytes, that holds maximum
+    """
+    for width in (1, 2, 4):
+        if maximum < 1 << (8 * width):
+            return width
+    return 8
+
+
+def _write_column(file, values: array, width: int) -> None:
+    """
+    Writes values to file as little-endian unsigned integers of width bytes
+    """
+    column = array(_TYPECODES[width], values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    column.tofile(file)
+
+
+def _read_column(file, width: int, count: int) -> array:
+    """
+    Reads count little-endian unsigned integers of width bytes from file
+    """
+    column = array(_TYPECODES[width])
+    column.fromfile(file, count)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+class FrozenHashMap:
+    def __init__(self, keys_and_values: DynamicArray) -> None:
+        """
+        Build a frozen map from a DynamicArray of (key, value) tuples, as
+        returned by get_keys_and_values() of the other maps. Keys must be unique.
+        """
+        pairs = [keys_and_values[index] for index in range(keys_and_values.length())]
+        self._size = len(pairs)
+        self._buckets = max(1, -(-self._size // BUCKET_SIZE))
+        self._table_size = next_prime(int(self._size / LOAD_FACTOR) + 2)
+
+        encoded_keys = [pair[0].encode() for pair in pairs]
+        for seed in range(MAX_SEEDS):
+            self._seed = seed
+            displacements = self._build(encoded_keys)
+            if displacements is not None:
+                break
+        else:
+            raise ValueError("could not build a perfect hash; are the keys unique?")
+        self._displacements = displacements
+
+        # number the used table positions in order, one slot per key
+        positions = [self._table_position(encoded) for encoded in encoded_keys]
+        self._ranks = array(_TYPECODES[_width(self._size)], [0]) * self._table_size
+        for rank, position in enumerate(sorted(positions)):
+            self._ranks[position] = rank
+
+        # place keys and values at their slots
+        slots = [None] * self._size
+        for pair, position in zip(pairs, positions):
+            slots[self._ranks[position]] = pair
+
+        self._keys = KeyArena()
+        self._values = DynamicArray()
+        for key, value in slots:
+            self._keys.append(key.encode())
+            self._values.append(value)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._size):
+            out += str(i) + ': ' + self._keys.get(i) + ' -> ' + str(self._values[i]) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map; a minimal perfect hash uses one slot per key
+        """
+        return self._size
+
+    # ------------------------------------------------------------------ #
+
+    def _hash(self, encoded: bytes) -> tuple[int, int, int]:
+        """
+        Returns (bucket, f1, f2) for an encoded key under the current seed. f2 is
+        never a multiple of the prime table size, so the displacements move a
+        key through every table position.
+        """
+        digest = hashlib.blake2b(encoded, digest_size=12,
+                                 salt=self._seed.to_bytes(8, 'little')).digest()
+        return (int.from_bytes(digest[0:4], 'little') % self._buckets,
+                int.from_bytes(digest[4:8], 'little'),
+                int.from_bytes(digest[8:12], 'little') % (self._table_size - 1) + 1)
+
+    def _position(self, f1: int, f2: int, displacement: int) -> int:
+        """
+        Returns the table position of a key with hash parts f1, f2 under a
+        displacement. Every displacement moves the keys of a bucket by a
+        different multiple of f2, so keys that collide under one rarely collide
+        under the next.
+        """
+        return (f1 + displacement * f2) % self._table_size
+
+    def _build(self, encoded_keys: list) -> array:
+        """
+        Finds a displacement for every bucket, largest buckets first, trying at
+        most MAX_DISPLACEMENTS (and at most one per table position) per bucket,
+        so every displacement fits in 16 bits. Returns the displacement array,
+        or None if some bucket can't be placed with the current seed.
+        """
+        buckets = [[] for _ in range(self._buckets)]
+        for encoded in encoded_keys:
+            bucket, f1, f2 = self._hash(encoded)
+            buckets[bucket].append((f1, f2))
+
+        displacements = array('H', [0]) * self._buckets
+        taken = bytearray(self._table_size)
+        order = sorted(range(self._buckets), key=lambda index: len(buckets[index]), reverse=True)
+
+        for bucket in order:
+            members = buckets[bucket]
+            if not members:
+                break
+
+            for displacement in range(min(self._table_size, MAX_DISPLACEMENTS)):
+                positions = [self._position(f1, f2, displacement) for f1, f2 in members]
+                if len(set(positions)) == len(positions) and \
+                        not any(taken[position] for position in positions):
+                    break
+            else:
+                return None
+
+            displacements[bucket] = displacement
+            for position in positions:
+                taken[position] = 1
+
+        return displacements
+
+    def _table_position(self, encoded: bytes) -> int:
+        """
+        Returns the table position of the key
+        """
+        bucket, f1, f2 = self._hash(encoded)
+        return self._position(f1, f2, self._displacements[bucket])
+
+    def _slot(self, encoded: bytes) -> int:
+        """
+        Returns the only slot the key can be in
+        """
+        return self._ranks[self._table_position(encoded)]
+
+    def get(self, key: str) -> object:
+        """
+        returns value associated with a given key. If the key is not in the map
+        returns None.
+        """
+        if self._size == 0:
+            return None
+        encoded = key.encode()
+        slot = self._slot(encoded)
+        if not self._keys.equals(slot, encoded):
+            return None
+        return self._values[slot]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if given key is in the map. Otherwise, returns False.
+        """
+        if self._size == 0:
+            return False
+        encoded = key.encode()
+        return self._keys.equals(self._slot(encoded), encoded)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        returns a dynamic array where each index contains a tuple key/value pair
+        stored in the map.
+        """
+        keys_and_values = DynamicArray()
+        for slot in range(self._size):
+            keys_and_values.append((self._keys.get(slot), self._values[slot]))
+        return keys_and_values
+
+    # ------------------------- file format ---------------------------- #
+
+    def save(self, path: str) -> None:
+        """
+        Writes the map to path: a fixed header, then the displacement, rank, key
+        start and key length columns, the packed key bytes and the pickled
+        values. Columns are little-endian, each at the item size recorded in the
+        header: the narrowest that holds its largest value.
+        """
+        data, starts, lengths = self._keys.buffers()
+        values = pickle.dumps([self._values[slot] for slot in range(self._size)],
+                              pickle.HIGHEST_PROTOCOL)
+        columns = (self._displacements, self._ranks, starts, lengths)
+        widths = [_width(max(column, default=0)) for column in columns]
+
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, self._size, self._buckets, self._table_size,
+                                    self._seed, len(data), len(values), *widths))
+            for column, width in zip(columns, widths):
+                _write_column(file, column, width)
+            file.write(data)
+            file.write(values)
+
+    @staticmethod
+    def load(path: str) -> "FrozenHashMap":
+        """
+        Reads a map written by save(). Columns are read straight into arrays of
+        their stored item size, so loading does no hashing and no per-key work
+        besides unpickling values.
+        """
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[:4] != _MAGIC:
+                raise ValueError(f"{path} is not a FrozenHashMap file")
+            (_, size, buckets, table_size, seed, data_length, values_length,
+             displacement_width, rank_width, start_width, length_width) = _HEADER.unpack(header)
+            if any(width not in _TYPECODES for width in
+                   (displacement_width, rank_width, start_width, length_width)):
+                raise ValueError(f"{path} has an unsupported column item size")
+
+            displacements = _read_column(file, displacement_width, buckets)
+            ranks = _read_column(file, rank_width, table_size)
+            starts = _read_column(file, start_width, size)
+            lengths = _read_column(file, length_width, size)
+            data = bytearray(file.read(data_length))
+            values = pickle.loads(file.read(values_length))
+
+        frozen = FrozenHashMap.__new__(FrozenHashMap)
+        frozen._size = size
+        frozen._buckets = buckets
+        frozen._table_size = table_size
+        frozen._seed = seed
+        frozen._displacements = displacements
+        frozen._ranks = ranks
+        frozen._keys = KeyArena.from_buffers(data, starts, lengths)
+        frozen._values = DynamicArray(values)
+        return frozen
+
+    def __iter__(self):
+        """
+        Create iterator for loop
+        """
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next value and advance iterator
+        """
+        if self._index < self._size:
+            slot = self._index
+            self._index += 1
+            return HashEntry(self._keys.get(slot), self._values[slot])
+
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\nfreeze example")
+    print("--------------")
+    m = hash_map_oa.HashMap(53, hash_map_oa.hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+    start = time.perf_counter()
+    frozen = m.freeze()
+    print(frozen.get_size(), frozen.get_capacity(), f"built in {time.perf_counter() - start:.2f}s")
+    result = all(frozen.get('str' + str(i)) == i * 100 for i in range(150))
+    result &= not any(frozen.contains_key('str' + str(i)) for i in range(150, 300))
+    print(result)
+
+    print("\nbuild time example")
+    print("------------------")
+    for size in (10_000, 50_000):
+        pairs = DynamicArray([('key' + str(i), i) for i in range(size)])
+        start = time.perf_counter()
+        frozen = FrozenHashMap(pairs)
+        elapsed = time.perf_counter() - start
+        print(size, frozen.get_capacity(), frozen.get('key' + str(size - 1)),
+              f"{elapsed / size * 1e6:.0f} us per key")
+
+    print("\nsave / load example")
+    print("-------------------")
+    m = hash_map_sc.HashMap()
+    for i in range(10_000):
+        m.put('key' + str(i), i)
+    frozen = m.freeze()
+    path = os.path.join(tempfile.mkdtemp(), 'table.fhm')
+    frozen.save(path)
+    start = time.perf_counter()
+    loaded = FrozenHashMap.load(path)
+    elapsed = time.perf_counter() - start
+    print(loaded.get_size(), all(loaded.get('key' + str(i)) == i for i in range(10_000)),
+          loaded.get('missing'), os.path.getsize(path), f"loaded in {elapsed:.3f}s")
+    with open(path, 'rb') as file:
+        print(_HEADER.unpack(file.read(_HEADER.size))[-4:])
+    os.remove(path)
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    frozen = FrozenHashMap(DynamicArray([(str(i), str(i * 10)) for i in range(5)]))
+    for item in frozen:
+        print('K:', item.key, 'V:', item.value)
+    print(FrozenHashMap(DynamicArray()).get('x'))
@@ -0,0 +1,317 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of an open addressing HashMap specialized for
+# 64-bit integer keys and float values. Keys, values and slot states are kept in
+# NumPy int64 / float64 / uint8 arrays. Batch methods get_many() and put_many()
+# probe every requested key at once in vectorized rounds, one probe step per
+# round, until all keys are resolved, so no Python-level loop runs per key.
+# Methods include put(), get(), remove(), contains_key(), clear(),
+# resize_table(), table_load(), get_keys_and_values(), get_many(), put_many(),
+# remove_many(), contains_many()
+
+import numpy as np
+
+# slot states
+EMPTY = 0
+FULL = 1
+DELETED = 2
+
+
+class HashMap:
+    def __init__(self, capacity: int = 16, load_factor: float = 0.5) -> None:
+        """
+        Initialize new HashMap. Capacity is rounded up to a power of two so
+        slots can be found with a bit mask; the table doubles when used plus
+        deleted slots reach load_factor.
+        """
+        self._load_factor = load_factor
+        self._size = 0
+        self._allocate(capacity)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        keys, values = self.get_keys_and_values()
+        return '{' + ', '.join(f'{k}: {v}' for k, v in zip(keys.tolist(), values.tolist())) + '}'
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replace the slot arrays with empty ones of at least the given capacity
+        """
+        new_capacity = 8
+        while new_capacity < capacity:
+            new_capacity *= 2
+
+        self._capacity = new_capacity
+        self._mask = np.uint64(new_capacity - 1)
+        self._keys = np.zeros(new_capacity, dtype=np.int64)
+        self._values = np.zeros(new_capacity, dtype=np.float64)
+        self._state = np.zeros(new_capacity, dtype=np.uint8)
+        self._deleted = 0
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _hash(keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the 64-bit finalizer mix (MurmurHash3 fmix64) of each key
+        """
+        hash = keys.astype(np.uint64)
+        with np.errstate(over='ignore'):
+            hash ^= hash >> np.uint64(33)
+            hash *= np.uint64(0xFF51AFD7ED558CCD)
+            hash ^= hash >> np.uint64(33)
+            hash *= np.uint64(0xC4CEB9FE1A85EC53)
+            hash ^= hash >> np.uint64(33)
+        return hash
+
+    def _probe(self, hash: np.ndarray, step: int) -> np.ndarray:
+        """
+        Returns the slot of each hash at the given probe step. Triangular steps
+        visit every slot of a power-of-two table.
+        """
+        with np.errstate(over='ignore'):
+            return ((hash + np.uint64(step * (step + 1) // 2)) & self._mask).astype(np.intp)
+
+    def _lookup(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the slot holding each key, or -1 for keys not in the map
+        """
+        slots = np.full(keys.shape[0], -1, dtype=np.intp)
+        pending = np.arange(keys.shape[0])
+        hash = self._hash(keys)
+        step = 0
+
+        while pending.shape[0] > 0 and step < self._capacity:
+            pos = self._probe(hash, step)
+            state = self._state[pos]
+            hit = (state == FULL) & (self._keys[pos] == keys[pending])
+            slots[pending[hit]] = pos[hit]
+
+            # a key is resolved when found or when its probe reaches an EMPTY slot
+            unresolved = ~(hit | (state == EMPTY))
+            pending = pending[unresolved]
+            hash = hash[unresolved]
+            step += 1
+
+        return slots
+
+    def _insert_absent(self, keys: np.ndarray, values: np.ndarray) -> None:
+        """
+        Inserts distinct keys known not to be in the map. Keys that race for the
+        same free slot in a round are settled by letting the first one win; the
+        rest retry that slot next round and then move on.
+        """
+        pending = np.arange(keys.shape[0])
+        hash = self._hash(keys)
+        steps = np.zeros(keys.shape[0], dtype=np.int64)
+
+        while pending.shape[0] > 0:
+            with np.errstate(over='ignore'):
+                offsets = (steps * (steps + 1) // 2).astype(np.uint64)
+                pos = ((hash + offsets) & self._mask).astype(np.intp)
+            free = self._state[pos] != FULL
+
+            # among keys that landed on a free slot, the first claimant wins it
+            candidates = np.nonzero(free)[0]
+            _, first = np.unique(pos[candidates], return_index=True)
+            winners = candidates[first]
+
+            slots = pos[winners]
+            self._deleted -= int(np.count_nonzero(self._state[slots] == DELETED))
+            self._state[slots] = FULL
+            self._keys[slots] = keys[pending[winners]]
+            self._values[slots] = values[pending[winners]]
+
+            placed = np.zeros(pending.shape[0], dtype=bool)
+            placed[winners] = True
+            # losers of a race re-read the same slot; everyone else advances
+            advance = ~free
+            steps[advance] += 1
+
+            keep = ~placed
+            pending = pending[keep]
+            hash = hash[keep]
+            steps = steps[keep]
+
+        self._size += keys.shape[0]
+
+    def put_many(self, keys, values) -> None:
+        """
+        Inserts or updates every key/value pair. When a key repeats in the batch
+        the last value wins.
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), keys.shape)
+        if keys.shape[0] == 0:
+            return
+
+        # keep only the last occurrence of each key
+        reversed_keys = keys[::-1]
+        keys, first = np.unique(reversed_keys, return_index=True)
+        values = values[::-1][first]
+
+        slots = self._lookup(keys)
+        found = slots >= 0
+        self._values[slots[found]] = values[found]
+
+        missing = ~found
+        count = int(np.count_nonzero(missing))
+        if count == 0:
+            return
+
+        if self._size + self._deleted + count > self._capacity * self._load_factor:
+            needed = self._size + count
+            new_capacity = self._capacity
+            while needed > new_capacity * self._load_factor:
+                new_capacity *= 2
+            self.resize_table(new_capacity)
+
+        self._insert_absent(keys[missing], values[missing])
+
+    def get_many(self, keys, default: float = np.nan) -> np.ndarray:
+        """
+        Returns a float64 array with the value of each key, or default for keys
+        not in the map
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        slots = self._lookup(keys)
+        result = np.full(keys.shape[0], default, dtype=np.float64)
+        found = slots >= 0
+        result[found] = self._values[slots[found]]
+        return result
+
+    def contains_many(self, keys) -> np.ndarray:
+        """
+        Returns a boolean array telling whether each key is in the map
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        return self._lookup(keys) >= 0
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every given key that is in the map
+        """
+        keys = np.unique(np.asarray(keys, dtype=np.int64).ravel())
+        slots = self._lookup(keys)
+        slots = slots[slots >= 0]
+        self._state[slots] = DELETED
+        self._size -= slots.shape[0]
+        self._deleted += slots.shape[0]
+
+    def put(self, key: int, value: float) -> None:
+        """
+        Updates key/value pair in hash map
+        """
+        self.put_many(np.array([key], dtype=np.int64), np.array([value], dtype=np.float64))
+
+    def get(self, key: int) -> object:
+        """
+        returns value associated with a given key. If the key is not in the map
+        returns None.
+        """
+        slot = self._lookup(np.array([key], dtype=np.int64))[0]
+        if slot < 0:
+            return None
+        return float(self._values[slot])
+
+    def contains_key(self, key: int) -> bool:
+        """
+        Returns True if given key is in the hash map. Otherwise, returns False.
+        """
+        if self._size == 0:
+            return False
+        return bool(self._lookup(np.array([key], dtype=np.int64))[0] >= 0)
+
+    def remove(self, key: int) -> None:
+        """
+        removes given key and its associated value from the hash map
+        """
+        self.remove_many(np.array([key], dtype=np.int64))
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Change the capacity of the internal hash table. All existing key/value
+        pairs remain in the new hash map and are rehashed in one batch.
+        """
+        if new_capacity < self._size:
+            return
+
+        live = self._state == FULL
+        keys = self._keys[live]
+        values = self._values[live]
+
+        self._allocate(new_capacity)
+        self._size = 0
+        self._insert_absent(keys, values)
+
+    def clear(self) -> None:
+        """
+        Clears contents of a hash map without changing underlying hash table capacity
+        """
+        self._state[:] = EMPTY
+        self._size = 0
+        self._deleted = 0
+
+    def get_keys_and_values(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        returns (keys, values) arrays holding every pair stored in the map
+        """
+        live = self._state == FULL
+        return self._keys[live], self._values[live]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    print("\nput / get example")
+    print("-----------------")
+    m = HashMap()
+    for i in range(150):
+        m.put(i * 1_000_003, i * 100)
+        if i % 25 == 24:
+            print(round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    print(m.get(3_000_009), m.get(1), m.contains_key(0), m.contains_key(7))
+
+    print("\nput_many / get_many example")
+    print("---------------------------")
+    m = HashMap()
+    m.put_many([5, 7, 5, 9], [1.0, 2.0, 3.0, 4.0])
+    print(m.get_size(), m.get_many([5, 7, 9, 11]))
+    m.remove(7)
+    print(m.get_size(), m.contains_many([5, 7, 9]))
+
+    print("\nbatch throughput example")
+    print("------------------------")
+    rng = np.random.default_rng(261)
+    keys = rng.integers(-2 ** 62, 2 ** 62, size=1_000_000, dtype=np.int64)
+    m = HashMap()
+    start = time.perf_counter()
+    m.put_many(keys, keys.astype(np.float64))
+    middle = time.perf_counter()
+    values = m.get_many(keys)
+    end = time.perf_counter()
+    print(m.get_size(), bool(np.array_equal(values, keys.astype(np.float64))),
+          f"put {len(keys) / (middle - start):,.0f}/s get {len(keys) / (end - middle):,.0f}/s")
+    misses = m.get_many(keys + 1)
+    print(int(np.count_nonzero(~np.isnan(misses))))
@@ -0,0 +1,284 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of HashMap using separate chaining with linear
+# hashing (Litwin) instead of doubling. Buckets are addressed with two moduli,
+# base * 2^level and base * 2^(level + 1): buckets before the split pointer have
+# already been split and use the larger one. Each time the load factor is
+# reached exactly one bucket, the one at the split pointer, is split in two and
+# the table grows by a single bucket, so no operation rehashes the whole table
+# and there is never a second bucket list in memory. Removes merge the last
+# bucket back once the load drops under shrink_threshold. Methods include put(),
+# get(), remove(), contains_key(), clear(), empty_buckets(), resize_table(),
+# table_load(), get_keys_and_values()
+
+from a6_include import (DynamicArray, LinkedList, hash_function_1, hash_function_2)
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 load_factor: float = 1.0,
+                 shrink_threshold: float = 0.0) -> None:
+        """
+        Initialize new HashMap that uses linear hashing. capacity is the
+        initial (and minimum) number of buckets; it need not be prime since
+        buckets are split one at a time.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if load_factor <= 0:
+            raise ValueError("load_factor must be greater than 0")
+        if not 0 <= shrink_threshold < load_factor / 2:
+            raise ValueError("shrink_threshold must be below load_factor / 2")
+        self._load_factor = load_factor
+        self._shrink_threshold = shrink_threshold
+
+        self._buckets = DynamicArray()
+        self._base = capacity
+        for _ in range(capacity):
+            self._buckets.append(LinkedList())
+
+        # buckets [0, split) have been split in the current round, which
+        # doubles the address space from base * 2^level to base * 2^(level + 1)
+        self._level = 0
+        self._split = 0
+
+        self._hash_function = function
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._buckets.length()):
+            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._buckets.length()
+
+    # ------------------------------------------------------------------ #
+
+    def _index(self, hash: int) -> int:
+        """
+        Returns the bucket of a hash. Buckets before the split pointer were
+        split this round and are addressed with the next round's modulus.
+        """
+        modulus = self._base << self._level
+        index = hash % modulus
+        if index < self._split:
+            index = hash % (modulus << 1)
+        return index
+
+    def _split_bucket(self) -> None:
+        """
+        Grows the table by one bucket: the chain at the split pointer is
+        divided between itself and the new bucket at the end of the table
+        """
+        modulus = (self._base << self._level) << 1
+        old = self._buckets[self._split]
+        stay = LinkedList()
+        move = LinkedList()
+        for node in old:
+            if self._hash_function(node.key) % modulus == self._split:
+                stay.insert(node.key, node.value)
+            else:
+                move.insert(node.key, node.value)
+        self._buckets[self._split] = stay
+        self._buckets.append(move)
+
+        # once every bucket of the round is split, start the next round
+        self._split += 1
+        if self._split == self._base << self._level:
+            self._level += 1
+            self._split = 0
+
+    def _merge_bucket(self) -> None:
+        """
+        Shrinks the table by one bucket: the last bucket is merged back into
+        the bucket it was split from
+        """
+        if self._split == 0:
+            self._level -= 1
+            self._split = self._base << self._level
+        self._split -= 1
+
+        last = self._buckets.pop()
+        bucket = self._buckets[self._split]
+        for node in last:
+            bucket.insert(node.key, node.value)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map. If the given key already exists
+        in the hash map, it's associated value is replaced with the new value.
+        If the given key is not in the hash map, a new key/value pair is added.
+        One bucket is split when the load factor is greater than or equal to
+        the max load factor (1.0 by default).
+        """
+        if self.table_load() >= self._load_factor:
+            self._split_bucket()
+
+        bucket = self._buckets[self._index(self._hash_function(key))]
+
+        # if key is already in bucket, replace value:
+        node = bucket.contains(key)
+        if node is not None:
+            node.value = value
+        else:
+            bucket.insert(key, value)
+            self._size += 1
+
+    def get(self, key: str):
+        """
+        returns the value associated with a given key.
+        If key is not in the hash map returns None
+        """
+        node = self._buckets[self._index(self._hash_function(key))].contains(key)
+        if node is None:
+            return None
+        return node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map. Otherwise, returns False
+        """
+        if self._size == 0:
+            return False
+        return self._buckets[self._index(self._hash_function(key))].contains(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a given key and its associated value from the hash map. One
+        bucket is merged back when the load factor drops under shrink_threshold.
+        """
+        bucket = self._buckets[self._index(self._hash_function(key))]
+        if bucket.remove(key):
+            self._size -= 1
+            if self.table_load() < self._shrink_threshold and \
+                    self._buckets.length() > self._base:
+                self._merge_bucket()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        count = 0
+        for index in range(self._buckets.length()):
+            if self._buckets[index].length() == 0:
+                count += 1
+        return count
+
+    def table_load(self) -> float:
+        """
+        Returns the current hash table load factor
+        """
+        return self._size / self._buckets.length()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of Hash map without changing its capacity; the
+        split pointer stays where it is, so keys go to the same buckets as before
+        """
+        for index in range(self._buckets.length()):
+            self._buckets[index] = LinkedList()
+        self._size = 0
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Splits or merges buckets one at a time until the table has
+        new_capacity buckets (never fewer than the initial capacity)
+        """
+        new_capacity = max(new_capacity, self._base)
+        while self._buckets.length() < new_capacity:
+            self._split_bucket()
+        while self._buckets.length() > new_capacity:
+            self._merge_bucket()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value
+        pair stored in the hash map.
+        """
+        keys_and_values = DynamicArray()
+        for index in range(self._buckets.length()):
+            for node in self._buckets[index]:
+                keys_and_values.append((node.key, node.value))
+        return keys_and_values
+
+    def get_bucket_keys(self, index: int) -> DynamicArray:
+        """
+        Returns a dynamic array of the keys in the bucket at index
+        """
+        keys = DynamicArray()
+        for node in self._buckets[index]:
+            keys.append(node.key)
+        return keys
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        chain nodes a successful lookup of it examines
+        """
+        lengths = DynamicArray()
+        for index in range(self._buckets.length()):
+            for position in range(1, self._buckets[index].length() + 1):
+                lengths.append(position)
+        return lengths
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    import hash_map_sc
+
+    print("\nput / split example")
+    print("-------------------")
+    m = HashMap(4, hash_function_1)
+    for i in range(10):
+        m.put('str' + str(i), i * 100)
+        print(m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+    print(m)
+
+    print("\nget / contains_key / remove example")
+    print("-----------------------------------")
+    m = HashMap(11, hash_function_2, shrink_threshold=0.25)
+    for i in range(1000):
+        m.put('key' + str(i), i)
+    print(m.get_size(), m.get_capacity(), all(m.get('key' + str(i)) == i for i in range(1000)))
+    for i in range(900):
+        m.remove('key' + str(i))
+    print(m.get_size(), m.get_capacity(), m.contains_key('key950'), m.contains_key('key5'),
+          all(m.get('key' + str(i)) == i for i in range(900, 1000)))
+    m.resize_table(500)
+    print(m.get_capacity(), m.get('key999'))
+    m.clear()
+    print(m.get_size(), m.get_capacity(), m.empty_buckets())
+
+    print("\nworst single put vs doubling example")
+    print("------------------------------------")
+    for engine in (hash_map_sc.HashMap, HashMap):
+        m = engine(11, hash_function_1)
+        worst = 0
+        tracemalloc.start()
+        for i in range(50_000):
+            start = time.perf_counter()
+            m.put('key' + str(i), i)
+            worst = max(worst, time.perf_counter() - start)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(engine.__module__, m.get_capacity(), f"worst put {worst * 1000:.1f} ms",
+              f"peak {peak // 1024} KiB")
@@ -0,0 +1,78 @@
+# Course: CS261 - Data Structures
+# Description: Helpers for measuring how much memory the hash maps use and for
+# enforcing a memory budget. Sizes come from sys.getsizeof(), so they count the
+# objects the maps own (arrays, nodes, entries) plus the key and value objects
+# they reference, without following references inside keys or values.
+
+import sys
+
+from a6_include import DynamicArray, HashEntry, LinkedList, SLNode
+
+# bytes of one pointer slot in a list
+POINTER_BYTES = 8
+
+
+class MemoryBudgetError(Exception):
+    pass
+
+
+def _attribute_bytes(cls: type, *args) -> int:
+    """
+    Return size of the attribute dictionary of an instance of cls, measured on
+    a throwaway instance made after many others: a class's first instances
+    keep their attributes in dicts twice the size of the key-shared ones the
+    maps hold once they are warm
+    """
+    for _ in range(64):
+        instance = cls(*args)
+    return sys.getsizeof(instance.__dict__)
+
+
+# attribute storage of one instance of each class the maps are built from;
+# object_bytes() uses it instead of reading __dict__, which would create a
+# dict for every object it looks at and keep it alive
+_ATTRIBUTE_BYTES = {HashEntry: _attribute_bytes(HashEntry, '', None),
+                    SLNode: _attribute_bytes(SLNode, '', None),
+                    LinkedList: _attribute_bytes(LinkedList),
+                    DynamicArray: _attribute_bytes(DynamicArray)}
+
+
+def object_bytes(obj: object) -> int:
+    """
+    Return size of an object plus its attribute dictionary
+    """
+    size = sys.getsizeof(obj)
+    if type(obj) in _ATTRIBUTE_BYTES:
+        size += _ATTRIBUTE_BYTES[type(obj)]
+    elif hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def dynamic_array_bytes(da: DynamicArray) -> int:
+    """
+    Return size of a DynamicArray including its backing list
+    """
+    return object_bytes(da) + sys.getsizeof(da._data)
+
+
+def payload_bytes(key: object, value: object) -> tuple[int, int]:
+    """
+    Return (key bytes, value bytes) of one stored pair
+    """
+    return sys.getsizeof(key), sys.getsizeof(value)
+
+
+def empty_report() -> dict:
+    """
+    Return a memory report with every category set to zero. Categories are:
+    table: bucket arrays and per-bucket containers that hold entries
+    entries: per-entry objects (HashEntry or SLNode) of live pairs
+    empty: table space spent on empty buckets
+    tombstones: entries kept only as tombstones, with their payload
+    keys, values: payload of live pairs (deep reports only)
+    prefilter: membership pre-filter in front of the map, if any
+    index: ordered index of the keys, if any
+    """
+    return {'table': 0, 'entries': 0, 'empty': 0, 'tombstones': 0,
+            'keys': 0, 'values': 0, 'prefilter': 0, 'index': 0, 'total': 0}
@@ -4,29 +4,87 @@
 # Description: Implementation of HashMap using Open Addressing with Quadratic Probing for
 # collision resolution. Key/Value pairs stored in an array. Methods include put(), get()
 # remove(), contains_key(), clear(), empty_buckets(), resize_table(), table_load(),
-# get_keys(), __iter__(), __next__()
+# get_keys(), __iter__(), __next__(), freeze(), memory_usage(), set_memory_budget(),
+# set_prefilter(), prefilter_stats(), start_trace(), stop_trace(), set_ordered_index(),
+# range(), prefix(), min_key(), max_key(), increment(), sum_values(), max_value().
+# Declaring value_type='int64' or 'float64' keeps values unboxed in an array
+# column parallel to the slots instead of in the HashEntry objects.
+
+from array import array
 
 from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
                         hash_function_1, hash_function_2)
+from bloom_filter import CountingBloomFilter, filter_bytes
+from hash_map_arena import VALUE_TYPES, column_max, column_sum
+from hash_map_frozen import FrozenHashMap
+from hash_map_memory import (POINTER_BYTES, MemoryBudgetError, dynamic_array_bytes,
+                             empty_report, object_bytes, payload_bytes)
+from hash_map_trace import GET, PUT, REMOVE, TraceRecorder
+from ordered_index import MAX_NODE_BYTES, OrderedIndex
+
+# clear() bumps the epoch; the table is rebuilt once it reaches this value
+_MAX_EPOCH = 0xFFFF
+
+# estimated size of one HashEntry object, used to price a put against the budget
+_ENTRY_BYTES = object_bytes(HashEntry('', None))
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    def __init__(self, capacity: int, function,
+                 load_factor: float = 0.5,
+                 growth_factor: float = 2,
+                 shrink_threshold: float = 0.0,
+                 expected_size: int = None,
+                 value_type: str = None) -> None:
         """
         Initialize new HashMap that uses
-        quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        quadratic probing for collision resolution.
+        The table grows by growth_factor once the load factor reaches
+        load_factor, and shrinks by the same factor (never below the initial
+        capacity) when a remove drops it under shrink_threshold.
+        expected_size presizes the table so that many keys fit without a
+        resize, e.g. hyperloglog.HyperLogLog.upper_bound() of the keys to load.
+        value_type None stores any object; 'int64' or 'float64' stores values
+        unboxed in an array column next to the slots.
         """
-        self._buckets = DynamicArray()
+        if value_type is not None and value_type not in VALUE_TYPES:
+            raise ValueError(f"value_type must be None or one of {list(VALUE_TYPES)}")
+        self._value_type = value_type
+        if not 0 < load_factor < 1:
+            raise ValueError("load_factor must be between 0 and 1")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        if not 0 <= shrink_threshold < load_factor / growth_factor:
+            raise ValueError("shrink_threshold must be below load_factor / growth_factor")
+        self._load_factor = load_factor
+        self._growth_factor = growth_factor
+        self._shrink_threshold = shrink_threshold
 
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        self._min_capacity = self._next_prime(capacity)
+        self._capacity = self._min_capacity
+        if expected_size is not None:
+            self._capacity = self._next_prime(max(capacity, int(expected_size / load_factor) + 1))
+        self._reset_table()
 
         self._hash_function = function
         self._size = 0
 
+        # optional memory budget, see set_memory_budget()
+        self._memory_budget = None
+        self._on_exceed = None
+        self._memory_used = 0
+
+        # optional membership pre-filter, see set_prefilter()
+        self._prefilter = None
+        self._prefilter_rate = None
+
+        # optional operation trace, see start_trace()
+        self._trace = None
+
+        # optional ordered index of the keys, see set_ordered_index()
+        self._ordered_index = None
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
@@ -90,40 +148,151 @@ class HashMap:
         """
         Updates key/value pair in hash map. If the given key already exists in
         the hash map, it's associated value is replaced with a new value. Table
-        is resized to double its current capacity when laod factor is greater than
-        or equal to 0.5.
+        is resized by the growth factor (double by default) when laod factor is
+        greater than or equal to the max load factor (0.5 by default). Raises
+        MemoryBudgetError if a memory budget is set and a new key would exceed it,
+        and TypeError (OverflowError for an int64 out of range) if the value
+        column rejects the value; either leaves the map unchanged.
         """
-        # resize when load factor is greater than or equal to 0.5
-        if self.table_load() >= 0.5:
-            self.resize_table(2 * self._capacity)
+        if self._values is not None:
+            # a value the column rejects raises here, before anything changes
+            array(self._values.typecode, (value,))
+
+        if self._memory_budget is not None:
+            self._charge_memory(key, value)
+
+        # resize when load factor is greater than or equal to the max load factor
+        if self.table_load() >= self._load_factor:
+            self.resize_table(self._grown_capacity())
 
         # compute an initial index for element
         hash = self._hash_function(key)
         initial_index = hash % self._capacity
         index = initial_index
 
-        # if hashmap is full at index
-        if self._buckets[index] is not None:
-            j = 0
-            while self._buckets[index] is not None:
-                if self._buckets[index].key == key and self._buckets[index].is_tombstone is False:
-                    # new value replaces old for existing key, size does not change
-                    self._buckets[index].value = value
-                    return
-                if self._buckets[index].is_tombstone:
-                    # key/value replaces tombstone
-                    self._buckets[index] = HashEntry(key, value)
-                    # update size
-                    self._size += 1
-                    return
+        # probe up to an empty spot: the key may sit past a tombstone, so the
+        # first tombstone is only remembered, to be reused for a new key
+        tombstone = -1
+        j = 0
+        entry = self._entry(index)
+        while entry is not None:
+            if entry.is_tombstone:
+                if tombstone == -1:
+                    tombstone = index
+            elif entry.key == key:
+                # new value replaces old for existing key, size does not change
+                if self._values is None:
+                    entry.value = value
                 else:
-                    j += 1
-                    index = (initial_index + j**2) % self.get_capacity()
-
-        # if index with empty spot is identified in bucket list, insert new HashEntry object
-        self._buckets[index] = HashEntry(key, value)
+                    self._values[index] = value
+                if self._trace is not None:
+                    self._trace.record(PUT, key)
+                return
+            j += 1
+            if j == self._capacity:
+                if tombstone != -1:
+                    break
+                # above 0.5 load a probe sequence can run out of free slots
+                self.resize_table(self._grown_capacity())
+                initial_index = hash % self._capacity
+                j = 0
+            index = (initial_index + j**2) % self.get_capacity()
+            entry = self._entry(index)
+
+        if tombstone != -1:
+            # key/value replaces tombstone
+            index = tombstone
+            if self._memory_budget is not None:
+                # the tombstone's entry and key go away with it
+                entry = self._entry(index)
+                self._memory_used -= object_bytes(entry) + sum(self._payload_bytes(entry))
+
+        # insert new HashEntry object at the tombstone or empty spot
+        self._store(index, key, value)
         # update size
         self._size += 1
+        if self._prefilter is not None:
+            self._prefilter.add(key)
+        if self._ordered_index is not None:
+            self._index_key(key)
+
+        # recorded once the write has happened: a rejected put is not replayed
+        if self._trace is not None:
+            self._trace.record(PUT, key)
+
+    def _grown_capacity(self) -> int:
+        """
+        Returns the capacity to grow to, per the growth factor
+        """
+        return max(self._capacity + 1, int(self._capacity * self._growth_factor))
+
+    def _reset_table(self) -> None:
+        """
+        Builds an empty bucket list for the current capacity, with all epoch
+        stamps back at zero
+        """
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity):
+            self._buckets.append(None)
+        self._epochs = array('H', bytes(2 * self._capacity))
+        self._epoch = 0
+
+        # typed maps keep values in a column parallel to the slots, with a flag
+        # per slot telling which ones hold a live entry
+        self._values = None
+        self._live = None
+        if self._value_type is not None:
+            typecode = VALUE_TYPES[self._value_type]
+            self._values = array(typecode, bytes(array(typecode).itemsize * self._capacity))
+            self._live = bytearray(self._capacity)
+
+    def _entry(self, index: int) -> HashEntry:
+        """
+        Returns the entry at index, or None if the slot is empty or was written
+        before the last clear()
+        """
+        if self._epochs[index] != self._epoch:
+            return None
+        return self._buckets[index]
+
+    def _store(self, index: int, key: str, value: object) -> None:
+        """
+        Writes a new entry at index, stamped with the current epoch. A typed
+        value goes to the value column instead of the entry.
+        """
+        if self._values is None:
+            self._buckets[index] = HashEntry(key, value)
+        else:
+            self._buckets[index] = HashEntry(key, None)
+            self._values[index] = value
+            self._live[index] = 1
+        self._epochs[index] = self._epoch
+
+    def _value(self, index: int) -> object:
+        """
+        Returns the value of the live entry at index
+        """
+        if self._values is None:
+            return self._buckets[index].value
+        return self._values[index]
+
+    def _payload_bytes(self, entry: HashEntry) -> tuple[int, int]:
+        """
+        Returns (key bytes, value bytes) of an entry; typed values live in the
+        value column, which is counted as a whole
+        """
+        if self._values is None:
+            return payload_bytes(entry.key, entry.value)
+        return payload_bytes(entry.key, None)[0], 0
+
+    @staticmethod
+    def _column_bytes(values: array, live: bytearray) -> int:
+        """
+        Returns bytes of a value column and its live flags, 0 for untyped maps
+        """
+        if values is None:
+            return 0
+        return object_bytes(values) + object_bytes(live)
 
     def table_load(self) -> float:
         """
@@ -146,47 +315,85 @@ class HashMap:
         if new_capacity < self._size:
             return
 
+        if self._trace is not None:
+            self._trace.record_resize(new_capacity)
+
         # Set new capacity to the next prime number if it isn't already prime
         if self._is_prime(new_capacity) is True:
             self._capacity = new_capacity
         else:
             self._capacity = self._next_prime(new_capacity)
 
-        # store current data so you can rehash
-        temp = self._buckets
+        # store current data so you can rehash; slots written before the last
+        # clear() are skipped
+        temp, temp_epochs, temp_epoch = self._buckets, self._epochs, self._epoch
+        temp_values, temp_live = self._values, self._live
 
         # reset bucket list so info can be updated during rehash
-        self._buckets = DynamicArray()
+        self._reset_table()
         self._size = 0
 
-        # fill new, resized bucket list with None
-        for index in range(self._capacity):
-            self._buckets.append(None)
-
-        # rehash key/value pairs into new bucket list
+        # the pre-filter is resized with the table and refilled by the puts below
+        temp_prefilter = self._prefilter
+        if self._prefilter is not None:
+            self._prefilter = self._new_prefilter()
+
+        # rehash key/value pairs into new bucket list, outside of the budget,
+        # the trace and the ordered index (its keys don't change)
+        budget, self._memory_budget = self._memory_budget, None
+        trace, self._trace = self._trace, None
+        ordered_index, self._ordered_index = self._ordered_index, None
+        dropped = 0
         for index in range(temp.length()):
+            if temp_epochs[index] != temp_epoch:
+                continue
             if temp[index] is not None and temp[index].is_tombstone is False:
-                self.put(temp[index].key, temp[index].value)
+                self.put(temp[index].key,
+                         temp[index].value if temp_values is None else temp_values[index])
+            elif temp[index] is not None and budget is not None:
+                dropped += object_bytes(temp[index]) + sum(self._payload_bytes(temp[index]))
+        self._memory_budget = budget
+        self._trace = trace
+        self._ordered_index = ordered_index
+
+        # the new table, epoch stamps, value column and pre-filter replace the
+        # old ones and tombstones are gone
+        if budget is not None:
+            self._memory_used += (dynamic_array_bytes(self._buckets) + object_bytes(self._epochs) -
+                                  dynamic_array_bytes(temp) - object_bytes(temp_epochs) - dropped)
+            self._memory_used += (self._column_bytes(self._values, self._live) -
+                                  self._column_bytes(temp_values, temp_live))
+            if temp_prefilter is not None:
+                self._memory_used += self._prefilter.memory_bytes() - temp_prefilter.memory_bytes()
 
     def get(self, key: str) -> object:
         """
         returns value associated with a given key. If the key is not in the Hashmap
         returns None.
         """
+        if self._trace is not None:
+            self._trace.record(GET, key)
+
+        # a key ruled out by the pre-filter is not in the map
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
+            return None
+
         # find index for key
         hash = self._hash_function(key)
         initial_index = hash % self._capacity
 
         j = 0
         index = initial_index
+        entry = self._entry(index)
 
-        while self._buckets[index] is not None:
+        while entry is not None and j < self._capacity:
             # if you found the key in an active/non tombstone entry
-            if self._buckets[index].key == key and self._buckets[index].is_tombstone is False:
-                return self._buckets[index].value
+            if entry.key == key and entry.is_tombstone is False:
+                return self._value(index)
             # if key is not found use quadratic probing to find next possible index
             j += 1
             index = (initial_index + j ** 2) % self.get_capacity()
+            entry = self._entry(index)
 
         # if you reach an empty spot in the HashMap at or after the index
         return None
@@ -200,16 +407,34 @@ class HashMap:
         if self._size == 0:
             return False
 
-        if self.get(key) is None:
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
             return False
 
-        return True
+        # probe for the key itself: get() can't tell a missing key from a None value
+        hash = self._hash_function(key)
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+
+        entry = self._entry(index)
+        while entry is not None and j < self._capacity:
+            if entry.key == key and entry.is_tombstone is False:
+                return True
+            j += 1
+            index = (initial_index + j ** 2) % self.get_capacity()
+            entry = self._entry(index)
+
+        return False
 
     def remove(self, key: str) -> None:
         """
         removes given key and its associated value from the hash map. If the
         key is not in the hash map, does nothing.
         """
+        if self._trace is not None:
+            self._trace.record(REMOVE, key)
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
+            return
 
         # find index for key
         hash = self._hash_function(key)
@@ -217,27 +442,58 @@ class HashMap:
         index = initial_index
         j = 0
 
-        while self._buckets[index] is not None:
+        removed = False
+
+        entry = self._entry(index)
+        while entry is not None and j < self._capacity:
             # if key is found
-            if self._buckets[index].key == key and self._buckets[index].is_tombstone is False:
-                self._buckets[index].is_tombstone = True
+            if entry.key == key and entry.is_tombstone is False:
+                entry.is_tombstone = True
                 self._size -= 1
+                removed = True
+                if self._live is not None:
+                    self._live[index] = 0
+                if self._prefilter is not None:
+                    self._prefilter.remove(key)
+                if self._ordered_index is not None:
+                    self._unindex_key(key)
+                if self._memory_budget is not None:
+                    # under a budget the tombstone lets go of its value right away
+                    self._memory_used -= (payload_bytes(key, entry.value)[1] -
+                                          payload_bytes(key, None)[1])
+                    entry.value = None
             # use quadratic probing to find next possible index
             j += 1
             index = (initial_index + j ** 2) % self.get_capacity()
+            entry = self._entry(index)
 
-        # if reached an empty index or end of list without finding key
-        return
+        # shrink once the load factor drops under the shrink threshold
+        if removed and self.table_load() < self._shrink_threshold and \
+                self._capacity > self._min_capacity:
+            self.resize_table(max(self._min_capacity, int(self._capacity / self._growth_factor)))
 
     def clear(self) -> None:
         """
-        Clears contents of a hash map without changing underlying hash table capacity
+        Clears contents of a hash map without changing underlying hash table capacity.
+        Takes O(1): the epoch moves on and every slot written before reads as
+        empty, and is reused by later puts. The table is only rebuilt when the
+        epoch counter wraps, or under a memory budget, where the old entries
+        must be let go right away. A typed map also gets fresh, zeroed live
+        flags, one allocation rather than a pass over the slots.
         """
-
-        self._buckets = DynamicArray()
-        for index in range(self._capacity):
-            self._buckets.append(None)
+        if self._epoch < _MAX_EPOCH and self._memory_budget is None:
+            self._epoch += 1
+            if self._live is not None:
+                self._live = bytearray(self._capacity)
+        else:
+            self._reset_table()
         self._size = 0
+        if self._prefilter is not None:
+            self._prefilter.clear()
+        if self._ordered_index is not None:
+            self._ordered_index.clear()
+        if self._memory_budget is not None:
+            self._memory_used = self.memory_usage()['total']
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -247,11 +503,40 @@ class HashMap:
         keys_and_values = DynamicArray()
 
         for index in range(self._buckets.length()):
-            if self._buckets[index] is not None and self._buckets[index].is_tombstone is False:
-                keys_and_values.append((self._buckets[index].key, self._buckets[index].value))
+            entry = self._entry(index)
+            if entry is not None and entry.is_tombstone is False:
+                keys_and_values.append((entry.key, self._value(index)))
 
         return keys_and_values
 
+    def get_bucket_keys(self, index: int) -> DynamicArray:
+        """
+        Returns a dynamic array holding the key in the slot at index, empty if
+        the slot is empty or a tombstone
+        """
+        keys = DynamicArray()
+        entry = self._entry(index)
+        if entry is not None and entry.is_tombstone is False:
+            keys.append(entry.key)
+        return keys
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        slots a successful lookup of it examines (its probe sequence length)
+        """
+        lengths = DynamicArray()
+        for index in range(self._capacity):
+            entry = self._entry(index)
+            if entry is None or entry.is_tombstone:
+                continue
+            initial_index = self._hash_function(entry.key) % self._capacity
+            j = 0
+            while (initial_index + j ** 2) % self._capacity != index:
+                j += 1
+            lengths.append(j + 1)
+        return lengths
+
     def __iter__(self):
         """
         Create iterator for loop
@@ -268,9 +553,11 @@ class HashMap:
 
         while self._index < self._capacity:
 
-            if self._buckets[self._index] is not None and self._buckets[self._index].is_tombstone is False:
-                value = self._buckets[self._index]
+            value = self._entry(self._index)
+            if value is not None and value.is_tombstone is False:
                 self._index += 1
+                if self._values is not None:
+                    return HashEntry(value.key, self._values[self._index - 1])
                 return value
 
             self._index += 1
@@ -278,12 +565,327 @@ class HashMap:
         # If we've reached every bucket in dynamic array, raise StopIteration
         raise StopIteration
 
+    def freeze(self) -> "FrozenHashMap":
+        """
+        Returns an immutable FrozenHashMap with the current contents, built on a
+        minimal perfect hash so every lookup costs one slot and one key check
+        """
+        return FrozenHashMap(self.get_keys_and_values())
+
+    def memory_usage(self, deep: bool = True) -> dict:
+        """
+        Returns a dict of bytes used by the map, broken down into table (bucket
+        array and epoch stamps), entries (HashEntry objects), empty (unused
+        bucket slots), tombstones (removed entries, and entries from before the
+        last clear(), still in the table) and, when deep is True,
+        the keys and values themselves. A typed map's value column and live
+        flags always count as values. 'total' adds them all up.
+        """
+        report = empty_report()
+        empty = 0
+
+        for index in range(self._buckets.length()):
+            entry = self._buckets[index]
+            if entry is None:
+                empty += 1
+                continue
+
+            key_bytes, value_bytes = self._payload_bytes(entry) if deep else (0, 0)
+            if entry.is_tombstone or self._epochs[index] != self._epoch:
+                report['tombstones'] += object_bytes(entry) + key_bytes + value_bytes
+            else:
+                report['entries'] += object_bytes(entry)
+                report['keys'] += key_bytes
+                report['values'] += value_bytes
+
+        report['empty'] = empty * POINTER_BYTES
+        report['values'] += self._column_bytes(self._values, self._live)
+        report['table'] = dynamic_array_bytes(self._buckets) - report['empty'] + \
+            object_bytes(self._epochs)
+        if self._prefilter is not None:
+            report['prefilter'] = self._prefilter.memory_bytes()
+        if self._ordered_index is not None:
+            report['index'] = self._ordered_index.memory_bytes()
+        report['total'] = sum(report.values())
+        return report
+
+    def set_ordered_index(self, enabled: bool = True) -> None:
+        """
+        Keeps an ordered index (a skip list of the keys) next to the table, for
+        range(), prefix(), min_key() and max_key(); False removes it. The index
+        is updated by put, remove and clear. Point lookups don't use it. Its
+        nodes count against the memory budget; MemoryBudgetError is raised and
+        the map is left unchanged if they don't fit.
+        """
+        ordered_index = None
+        if enabled:
+            ordered_index = OrderedIndex()
+            key_value_pairs = self.get_keys_and_values()
+            for index in range(key_value_pairs.length()):
+                ordered_index.insert(key_value_pairs[index][0])
+
+        self._charge_structure(self._ordered_index, ordered_index)
+        self._ordered_index = ordered_index
+
+    def _index_key(self, key: str) -> None:
+        """
+        Adds a new key to the ordered index, charging its node to the budget
+        """
+        before = self._ordered_index.memory_bytes()
+        self._ordered_index.insert(key)
+        if self._memory_budget is not None:
+            self._memory_used += self._ordered_index.memory_bytes() - before
+
+    def _unindex_key(self, key: str) -> None:
+        """
+        Removes a key from the ordered index, crediting its node to the budget
+        """
+        before = self._ordered_index.memory_bytes()
+        self._ordered_index.remove(key)
+        if self._memory_budget is not None:
+            self._memory_used -= before - self._ordered_index.memory_bytes()
+
+    def _require_ordered_index(self) -> OrderedIndex:
+        """
+        Returns the ordered index, raising ValueError if there is none
+        """
+        if self._ordered_index is None:
+            raise ValueError("the map has no ordered index; call set_ordered_index() first")
+        return self._ordered_index
+
+    def range(self, lo: str = None, hi: str = None):
+        """
+        Lazily yields (key, value) for keys lo <= key < hi in key order; None
+        leaves that end open. Needs the ordered index.
+        """
+        for key in self._require_ordered_index().range(lo, hi):
+            yield key, self._value(self._find_index(key))
+
+    def prefix(self, prefix: str):
+        """
+        Lazily yields (key, value) for keys starting with prefix in key order.
+        Needs the ordered index.
+        """
+        for key in self._require_ordered_index().prefix(prefix):
+            yield key, self._value(self._find_index(key))
+
+    def min_key(self) -> str:
+        """
+        Returns the smallest key, or None if the map is empty. Needs the ordered
+        index.
+        """
+        return self._require_ordered_index().min_key()
+
+    def max_key(self) -> str:
+        """
+        Returns the largest key, or None if the map is empty. Needs the ordered
+        index.
+        """
+        return self._require_ordered_index().max_key()
+
+    def start_trace(self, path: str, sample_rate: float = 1.0) -> None:
+        """
+        Starts logging every put(), get(), remove() and resize_table() call to
+        a binary trace file at path, for replay with hash_map_trace.replay().
+        sample_rate keeps that share of keys, with all of their calls.
+        """
+        if self._trace is not None:
+            self.stop_trace()
+        self._trace = TraceRecorder(path, sample_rate)
+
+    def stop_trace(self) -> int:
+        """
+        Stops and closes the trace; returns the number of calls recorded
+        """
+        if self._trace is None:
+            return 0
+        trace, self._trace = self._trace, None
+        return trace.close()
+
+    def set_prefilter(self, false_positive_rate: float = 0.01) -> None:
+        """
+        Puts a counting Bloom filter in front of the map (None removes it). Keys
+        the filter rules out are reported missing by get(), contains_key() and
+        remove() without probing the buckets. The filter is kept in sync on
+        put, remove, clear and resize, and sized for the most keys the table
+        holds before it next grows. Its counters count against the memory
+        budget; MemoryBudgetError is raised and the map is left unchanged if
+        they don't fit.
+        """
+        prefilter = None
+        if false_positive_rate is not None:
+            prefilter = CountingBloomFilter(self._capacity * self._load_factor, false_positive_rate)
+            key_value_pairs = self.get_keys_and_values()
+            for index in range(key_value_pairs.length()):
+                prefilter.add(key_value_pairs[index][0])
+
+        self._charge_structure(self._prefilter, prefilter)
+        self._prefilter_rate = false_positive_rate
+        self._prefilter = prefilter
+
+    def prefilter_stats(self) -> dict:
+        """
+        Returns the pre-filter's stats (size, memory, expected false positive
+        rate, checks and rejections), or None if the map has no pre-filter
+        """
+        if self._prefilter is None:
+            return None
+        return self._prefilter.get_stats()
+
+    def _new_prefilter(self) -> CountingBloomFilter:
+        """
+        Returns an empty pre-filter sized for the current capacity
+        """
+        return CountingBloomFilter(self._capacity * self._load_factor, self._prefilter_rate)
+
+    def set_memory_budget(self, max_bytes: int, on_exceed: callable = None) -> None:
+        """
+        Caps the memory used by the map, including the pre-filter and ordered
+        index, at max_bytes (None removes the cap). A put
+        of a new key that would go over first calls on_exceed(map, bytes_needed),
+        which may remove entries to make room; if the map is still over budget,
+        MemoryBudgetError is raised and the map is left unchanged.
+        """
+        self._memory_budget = max_bytes
+        self._on_exceed = on_exceed
+        self._memory_used = self.memory_usage()['total'] if max_bytes is not None else 0
+
+    def _charge_memory(self, key: str, value: object) -> None:
+        """
+        Accounts for the memory a put will use, enforcing the budget for new keys
+        """
+        existing = self._find_entry(key)
+        key_bytes, value_bytes = payload_bytes(key, value)
+        if self._values is not None:
+            # typed values live in the value column
+            value_bytes = 0
+
+        # replacing a value only changes the value payload
+        if existing is not None:
+            if self._values is None:
+                self._memory_used += value_bytes - payload_bytes(key, existing.value)[1]
+            return
+
+        cost = _ENTRY_BYTES + key_bytes + value_bytes
+
+        # growing adds a pointer slot and an epoch stamp per new bucket, and a
+        # larger pre-filter; resize_table() accounts for the real growth once
+        # it happens
+        growth = 0
+        if self.table_load() >= self._load_factor:
+            slot_bytes = POINTER_BYTES + self._epochs.itemsize
+            if self._values is not None:
+                slot_bytes += self._values.itemsize + 1
+            growth = (self._grown_capacity() - self._capacity) * slot_bytes
+            if self._prefilter is not None:
+                growth += (filter_bytes(self._grown_capacity() * self._load_factor,
+                                        self._prefilter_rate) - self._prefilter.memory_bytes())
+
+        # the index node's height is only drawn when it is inserted, so leave
+        # room for the tallest one; _index_key() charges the real size
+        if self._ordered_index is not None:
+            growth += MAX_NODE_BYTES
+
+        needed = self._memory_used + cost + growth - self._memory_budget
+        if needed > 0 and self._on_exceed is not None:
+            self._on_exceed(self, needed)
+            needed = self._memory_used + cost + growth - self._memory_budget
+        if needed > 0:
+            raise MemoryBudgetError(
+                f"put of {key!r} needs {cost + growth} bytes, {self._memory_used} of "
+                f"{self._memory_budget} bytes already used")
+        self._memory_used += cost
+
+    def _charge_structure(self, old, new) -> None:
+        """
+        Accounts for replacing the pre-filter or ordered index old with new
+        (either may be None), raising MemoryBudgetError if new doesn't fit
+        """
+        if self._memory_budget is None:
+            return
+        change = ((0 if new is None else new.memory_bytes()) -
+                  (0 if old is None else old.memory_bytes()))
+        if change > 0 and self._memory_used + change > self._memory_budget:
+            raise MemoryBudgetError(
+                f"{type(new).__name__} needs {change} bytes, {self._memory_used} of "
+                f"{self._memory_budget} bytes already used")
+        self._memory_used += change
+
+    def _find_entry(self, key: str) -> HashEntry:
+        """
+        Returns the live entry for key, or None if key is not in the map
+        """
+        index = self._find_index(key)
+        if index == -1:
+            return None
+        return self._buckets[index]
+
+    def _find_index(self, key: str) -> int:
+        """
+        Returns the slot index of the live entry for key, or -1
+        """
+        hash = self._hash_function(key)
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+
+        entry = self._entry(index)
+        while entry is not None and j < self._capacity:
+            if entry.key == key and entry.is_tombstone is False:
+                return index
+            j += 1
+            index = (initial_index + j ** 2) % self.get_capacity()
+            entry = self._entry(index)
+
+        return -1
+
+    # --------------------- typed value columns ------------------------ #
+
+    def _typed_values(self) -> array:
+        """
+        Returns the value column, or raises if the map has no value type
+        """
+        if self._values is None:
+            raise TypeError("map was created without a value_type")
+        return self._values
+
+    def increment(self, key: str, delta=1):
+        """
+        Adds delta to the value of key, starting from 0 if the key is not in
+        the map, and returns the new value. Needs a value_type.
+        """
+        values = self._typed_values()
+        index = self._find_index(key)
+        if index == -1:
+            self.put(key, delta)
+            return delta
+
+        values[index] += delta
+        if self._trace is not None:
+            self._trace.record(PUT, key)
+        return values[index]
+
+    def sum_values(self):
+        """
+        Returns the sum of the live values, read straight from the column, see
+        hash_map_arena.column_sum(). Needs a value_type.
+        """
+        return column_sum(self._typed_values(), self._live)
+
+    def max_value(self):
+        """
+        Returns the largest live value, or None for an empty map, see
+        hash_map_arena.column_max(). Needs a value_type.
+        """
+        return column_max(self._typed_values(), self._live)
+
 
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 if __name__ == "__main__":
+    import time
 
     print("\nPDF - put example 1")
     print("-------------------")
@@ -489,3 +1091,67 @@ if __name__ == "__main__":
     print(m)
     for item in m:
         print('K:', item.key, 'V:', item.value)
+
+    print("\nmemory_usage / set_memory_budget example")
+    print("----------------------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(20):
+        m.put('key' + str(i), i * 1000)
+    m.remove('key0')
+    report = m.memory_usage()
+    print(report['total'] == sum(v for k, v in report.items() if k != 'total'),
+          report['tombstones'] > 0, m.memory_usage(deep=False)['values'])
+    m.set_memory_budget(report['total'] + 1000)
+    try:
+        for i in range(20, 40):
+            m.put('key' + str(i), i * 1000)
+    except MemoryBudgetError:
+        print('MemoryBudgetError', m.get_size())
+
+    print("\nset_prefilter example")
+    print("---------------------")
+    m = HashMap(11, hash_function_1)
+    m.put('key0', 0)
+    m.set_prefilter(0.01)
+    for i in range(1, 1000):
+        m.put('key' + str(i), i)
+    for i in range(0, 1000, 2):
+        m.remove('key' + str(i))
+    result = all(m.get('key' + str(i)) == i for i in range(1, 1000, 2))
+    result &= not any(m.contains_key('key' + str(i)) for i in range(0, 1000, 2))
+    result &= not any(m.contains_key('miss' + str(i)) for i in range(5000))
+    stats = m.prefilter_stats()
+    print(result, stats['items'], stats['rejected'] > 4500, m.memory_usage()['prefilter'] > 0)
+    m.clear()
+    print(m.get('key1'), m.prefilter_stats()['items'])
+
+    print("\nO(1) clear example")
+    print("------------------")
+    m = HashMap(100_003, hash_function_1)
+    start = time.perf_counter()
+    for i in range(70_000):
+        m.put('key' + str(i % 7), i)
+        m.clear()
+    elapsed = time.perf_counter() - start
+    m.put('key1', 1)
+    print(m.get_size(), m.get('key1'), m.get('key2'), m.contains_key('key3'),
+          m.get_keys_and_values().length(), m.empty_buckets() >= 100_002,
+          f"{elapsed / 70_000 * 1e6:.1f} us per put + clear")
+
+    print("\ntyped value column example")
+    print("--------------------------")
+    counts = HashMap(11, hash_function_2, value_type='int64')
+    for word in ['apple', 'grape', 'apple', 'melon', 'apple', 'grape', 'kiwi']:
+        counts.increment(word)
+    counts.remove('kiwi')
+    print(counts.get('apple'), counts.sum_values(), counts.max_value(), counts.get_keys_and_values())
+    try:
+        counts.put('pear', 'x')
+    except TypeError as error:
+        print('TypeError:', error, counts.get_size())
+    boxed = HashMap(11, hash_function_2)
+    for i in range(20_000):
+        counts.put('key' + str(i), i)
+        boxed.put('key' + str(i), i)
+    print(counts.memory_usage()['values'] < boxed.memory_usage()['values'],
+          counts.sum_values() == sum(range(20_000)) + 6)
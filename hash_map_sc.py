@@ -4,32 +4,95 @@
 # Description: Implementation of HashMap using Dynamic Array as underlying data
 # structure and singly linked list with each node storing a key/value pair to
 # chain for collision. Contains the following methods: put(), get(), remove(),
-# contains_key(), clear(), empty_buckets(), resize_table(), table_load(),
-# get_keys(), find_mode(). The average time complexity of all operations is O(1).
-
-from a6_include import (DynamicArray, LinkedList,
+# contains_key(), setdefault(), clear(), empty_buckets(), resize_table(),
+# table_load(), get_keys(), snapshot(), freeze(), memory_usage(), set_memory_budget(),
+# set_prefilter(), prefilter_stats(), start_trace(), stop_trace(),
+# set_ordered_index(), range(), prefix(), min_key(), max_key(), find_mode(),
+# find_mode_parallel(). The average time complexity of all operations is O(1)
+# (range and prefix scans are O(log n) plus the keys they return).
+
+import collections
+import concurrent.futures
+import itertools
+import os
+import weakref
+from array import array
+
+from a6_include import (DynamicArray, LinkedList, SLNode,
                         hash_function_1, hash_function_2)
+from bloom_filter import CountingBloomFilter, filter_bytes
+from hash_map_frozen import FrozenHashMap
+from hash_map_memory import (POINTER_BYTES, MemoryBudgetError, dynamic_array_bytes,
+                             empty_report, object_bytes, payload_bytes)
+from hash_map_trace import GET, PUT, REMOVE, TraceRecorder
+from ordered_index import MAX_NODE_BYTES, OrderedIndex
+
+# clear() bumps the epoch; the table is rebuilt once it reaches this value
+_MAX_EPOCH = 0xFFFF
+
+# read-only stand-in for a bucket written before the last clear()
+_EMPTY_CHAIN = LinkedList()
+
+# estimated sizes of one chain node and one empty chain, used to price a put
+_NODE_BYTES = object_bytes(SLNode('', None))
+_CHAIN_BYTES = object_bytes(LinkedList())
 
 
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 load_factor: float = 1.0,
+                 growth_factor: float = 2,
+                 shrink_threshold: float = 0.0,
+                 expected_size: int = None) -> None:
         """
         Initialize new HashMap that uses
-        separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        separate chaining for collision resolution.
+        The table grows by growth_factor once the load factor reaches
+        load_factor, and shrinks by the same factor (never below the initial
+        capacity) when a remove drops it under shrink_threshold.
+        expected_size presizes the table so that many keys fit without a
+        resize, e.g. hyperloglog.HyperLogLog.upper_bound() of the keys to load.
         """
-        self._buckets = DynamicArray()
+        if load_factor <= 0:
+            raise ValueError("load_factor must be greater than 0")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        if not 0 <= shrink_threshold < load_factor / growth_factor:
+            raise ValueError("shrink_threshold must be below load_factor / growth_factor")
+        self._load_factor = load_factor
+        self._growth_factor = growth_factor
+        self._shrink_threshold = shrink_threshold
 
         # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._min_capacity = self._next_prime(capacity)
+        self._capacity = self._min_capacity
+        if expected_size is not None:
+            self._capacity = self._next_prime(max(capacity, int(expected_size / load_factor) + 1))
+        self._reset_table()
 
         self._hash_function = function
         self._size = 0
 
+        # weak reference to the layer of the most recent snapshot, if any
+        self._snapshot_layer = None
+
+        # optional memory budget, see set_memory_budget()
+        self._memory_budget = None
+        self._on_exceed = None
+        self._memory_used = 0
+
+        # optional membership pre-filter, see set_prefilter()
+        self._prefilter = None
+        self._prefilter_rate = None
+
+        # optional operation trace, see start_trace()
+        self._trace = None
+
+        # optional ordered index of the keys, see set_ordered_index()
+        self._ordered_index = None
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
@@ -94,27 +157,68 @@ class HashMap:
         Updates the key/value pair in the hash map. If the given key already exists
         in the hash map, it's associated value is replaced with the new value.
         If the given key is not in the hash map, a new key/value pair is added.
-        Table is resized to double its current capacity when current load factor
-        is greater than or equal to 1.0.
+        Table is resized by the growth factor (double by default) when current
+        load factor is greater than or equal to the max load factor (1.0 by
+        default). Raises MemoryBudgetError if a memory budget is set and a new
+        key would exceed it.
         """
+        if self._memory_budget is not None:
+            self._charge_memory(key, value)
 
-        # resize when load factor is greater than or equal to one
-        if self.table_load() >= 1:
-            self.resize_table(2 * self._capacity)
+        # resize when load factor is greater than or equal to the max load factor
+        if self.table_load() >= self._load_factor:
+            self.resize_table(self._grown_capacity())
 
         # run key through hash function and calculate index:
         hash = self._hash_function(key)
         index = hash % self._capacity
 
+        bucket = self._writable_bucket(index)
+
         # if key is already in index, replace value:
-        if self._buckets[index].contains(key) is not None:
-            self._buckets[index].contains(key).value = value
+        node = bucket.contains(key)
+        if node is not None:
+            node.value = value
         else:
             # add key/value node to linked list, sets node as head, and updates SLL size
-            self._buckets[index].insert(key, value)
+            bucket.insert(key, value)
+            if self._prefilter is not None:
+                self._prefilter.add(key)
+            if self._ordered_index is not None:
+                self._index_key(key)
             # update size of dynamic array/buckets
             self._size += 1
 
+        # recorded once the write has happened: a rejected put is not replayed
+        if self._trace is not None:
+            self._trace.record(PUT, key)
+
+    def _grown_capacity(self) -> int:
+        """
+        Returns the capacity to grow to, per the growth factor
+        """
+        return max(self._capacity + 1, int(self._capacity * self._growth_factor))
+
+    def _reset_table(self) -> None:
+        """
+        Builds a bucket list of empty chains for the current capacity, with all
+        epoch stamps back at zero
+        """
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity):
+            self._buckets.append(LinkedList())
+        self._epochs = array('H', bytes(2 * self._capacity))
+        self._epoch = 0
+
+    def _bucket(self, index: int) -> LinkedList:
+        """
+        Returns the bucket at index for reading; a bucket written before the
+        last clear() reads as an empty chain
+        """
+        if self._epochs[index] != self._epoch:
+            return _EMPTY_CHAIN
+        return self._buckets[index]
+
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the hash table
@@ -122,7 +226,7 @@ class HashMap:
         count = 0
 
         for index in range(self._buckets.length()):
-            if self._buckets[index].length() == 0:
+            if self._bucket(index).length() == 0:
                 count += 1
 
         return count
@@ -135,12 +239,25 @@ class HashMap:
 
     def clear(self) -> None:
         """
-        Clears the contents of Hash map without changing underlying hash table capacity
+        Clears the contents of Hash map without changing underlying hash table capacity.
+        Takes O(1): the epoch moves on and every bucket written before reads as
+        empty until a later write replaces its chain. Snapshots keep the epoch
+        they were taken in, so they still see the old chains. The table is
+        rebuilt when the epoch counter wraps, or under a memory budget, where
+        the old chains must be let go right away.
         """
-        # iterate through bucket List and replace each index with empty linked list
-        for index in range(self._buckets.length()):
-            self._buckets[index] = LinkedList()
+        if self._epoch < _MAX_EPOCH and self._memory_budget is None:
+            self._epoch += 1
+        else:
+            self._snapshot_layer = None
+            self._reset_table()
         self._size = 0
+        if self._prefilter is not None:
+            self._prefilter.clear()
+        if self._ordered_index is not None:
+            self._ordered_index.clear()
+        if self._memory_budget is not None:
+            self._memory_used = self.memory_usage()['total']
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -152,44 +269,102 @@ class HashMap:
         if new_capacity < 1:
             return
 
+        if self._trace is not None:
+            self._trace.record_resize(new_capacity)
+
         # Set new capacity to the next prime number if it isn't already prime
         if self._is_prime(new_capacity) is True:
             self._capacity = new_capacity
         else:
             self._capacity = self._next_prime(new_capacity)
 
-        # store current data so you can rehash
-        temp = self._buckets
+        # store current data so you can rehash; snapshots keep reading it as is,
+        # and chains written before the last clear() are skipped
+        temp, temp_epochs, temp_epoch = self._buckets, self._epochs, self._epoch
+        self._snapshot_layer = None
 
         # reset bucket list and size so info can be updated during rehash
-        self._buckets = DynamicArray()
+        self._reset_table()
         self._size = 0
 
-        # fill new, resized bucket list with empty linked lists
-        for index in range(self._capacity):
-            self._buckets.append(LinkedList())
+        # the pre-filter is resized with the table and refilled by the puts below
+        temp_prefilter = self._prefilter
+        if self._prefilter is not None:
+            self._prefilter = self._new_prefilter()
 
-        # rehash key/value pairs into new bucket list
+        # rehash key/value pairs into new bucket list, outside of the budget,
+        # the trace and the ordered index (its keys don't change)
+        budget, self._memory_budget = self._memory_budget, None
+        trace, self._trace = self._trace, None
+        ordered_index, self._ordered_index = self._ordered_index, None
         for index in range(temp.length()):
-            if temp[index].length() != 0:
+            if temp[index].length() != 0 and temp_epochs[index] == temp_epoch:
                 for node in temp[index]:
                     self.put(node.key, node.value)
+        self._memory_budget = budget
+        self._trace = trace
+        self._ordered_index = ordered_index
+
+        # the new bucket list, chains, epoch stamps and pre-filter replace the old ones
+        if budget is not None:
+            self._memory_used += (self._table_bytes(self._buckets) + object_bytes(self._epochs) -
+                                  self._table_bytes(temp) - object_bytes(temp_epochs))
+            if temp_prefilter is not None:
+                self._memory_used += self._prefilter.memory_bytes() - temp_prefilter.memory_bytes()
+
+    def setdefault(self, key: str, default: object) -> object:
+        """
+        Returns the value associated with key. If key is not in the hash map,
+        default is inserted for it and returned. Finds or inserts the node with
+        a single walk of the chain. A trace records it as a get when the key is
+        found and as a put when it is inserted. Only an insert is charged to the
+        memory budget.
+        """
+        hash = self._hash_function(key)
+        node = self._bucket(hash % self._capacity).contains(key)
+        if node is not None:
+            if self._trace is not None:
+                self._trace.record(GET, key)
+            return node.value
+
+        if self._memory_budget is not None:
+            self._charge_memory(key, default)
+
+        if self.table_load() >= self._load_factor:
+            self.resize_table(self._grown_capacity())
+
+        self._writable_bucket(hash % self._capacity).insert(key, default)
+        self._size += 1
+        if self._prefilter is not None:
+            self._prefilter.add(key)
+        if self._ordered_index is not None:
+            self._index_key(key)
+        if self._trace is not None:
+            self._trace.record(PUT, key)
+        return default
 
     def get(self, key: str):
         """
         returns the value associated with a given key.
         If key is not in the hash map returns None
         """
+        if self._trace is not None:
+            self._trace.record(GET, key)
+
+        # a key ruled out by the pre-filter is not in the map
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
+            return None
+
         # find index for key
         hash = self._hash_function(key)
         index = hash % self._capacity
 
         # if key is not in linked list:
-        if self._buckets[index].contains(key) is None:
+        if self._bucket(index).contains(key) is None:
             return None
 
         # else return the value
-        return self._buckets[index].contains(key).value
+        return self._bucket(index).contains(key).value
 
     def contains_key(self, key: str) -> bool:
         """
@@ -199,21 +374,49 @@ class HashMap:
         if self._size == 0:
             return False
 
-        if self.get(key) is None:
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
             return False
 
-        return True
+        # look for the node itself: get() can't tell a missing key from a None value
+        hash = self._hash_function(key)
+        index = hash % self._capacity
+        return self._bucket(index).contains(key) is not None
 
     def remove(self, key: str) -> None:
         """
         Removes a given key and its associated value from the hash map.
         """
+        if self._trace is not None:
+            self._trace.record(REMOVE, key)
+        if self._prefilter is not None and not self._prefilter.might_contain(key):
+            return
+
         # find index for key
         hash = self._hash_function(key)
         index = hash % self._capacity
 
-        if self._buckets[index].remove(key):
+        bucket = self._bucket(index)
+        if self._live_snapshot_layer() is not None:
+            # only copy a bucket shared with a snapshot when the key is really there
+            if bucket.contains(key) is None:
+                return
+            bucket = self._writable_bucket(index)
+
+        if self._memory_budget is not None:
+            node = bucket.contains(key)
+            if node is not None:
+                self._memory_used -= _NODE_BYTES + sum(payload_bytes(node.key, node.value))
+
+        if bucket.remove(key):
             self._size -= 1
+            if self._prefilter is not None:
+                self._prefilter.remove(key)
+            if self._ordered_index is not None:
+                self._unindex_key(key)
+
+            # shrink once the load factor drops under the shrink threshold
+            if self.table_load() < self._shrink_threshold and self._capacity > self._min_capacity:
+                self.resize_table(max(self._min_capacity, int(self._capacity / self._growth_factor)))
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -224,14 +427,439 @@ class HashMap:
         keys_and_values = DynamicArray()
 
         for index in range(self._buckets.length()):
-            if self._buckets[index].length() != 0:
-                for node in self._buckets[index]:
+            if self._bucket(index).length() != 0:
+                for node in self._bucket(index):
                     key = node.key
                     value = node.value
                     keys_and_values.append((key, value))
 
         return keys_and_values
 
+    def get_bucket_keys(self, index: int) -> DynamicArray:
+        """
+        Returns a dynamic array of the keys in the bucket at index
+        """
+        keys = DynamicArray()
+        for node in self._bucket(index):
+            keys.append(node.key)
+        return keys
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        chain nodes a successful lookup of it examines
+        """
+        lengths = DynamicArray()
+        for index in range(self._capacity):
+            for position in range(1, self._bucket(index).length() + 1):
+                lengths.append(position)
+        return lengths
+
+    def freeze(self) -> "FrozenHashMap":
+        """
+        Returns an immutable FrozenHashMap with the current contents, built on a
+        minimal perfect hash so every lookup costs one slot and one key check
+        """
+        return FrozenHashMap(self.get_keys_and_values())
+
+    def memory_usage(self, deep: bool = True) -> dict:
+        """
+        Returns a dict of bytes used by the map, broken down into table (bucket
+        list, epoch stamps and non-empty chains), entries (SLNode objects), empty
+        (chains of empty buckets), tombstones (nodes from before the last
+        clear() still held by the table) and, when deep is True, the keys and
+        values themselves. 'total' adds them all up. Chains copied for snapshots
+        are not counted.
+        """
+        report = empty_report()
+        report['table'] = dynamic_array_bytes(self._buckets) + object_bytes(self._epochs)
+
+        for index in range(self._buckets.length()):
+            bucket = self._buckets[index]
+            if bucket.length() == 0:
+                report['empty'] += object_bytes(bucket)
+                continue
+
+            report['table'] += object_bytes(bucket)
+            stale = self._epochs[index] != self._epoch
+            for node in bucket:
+                key_bytes, value_bytes = payload_bytes(node.key, node.value) if deep else (0, 0)
+                if stale:
+                    report['tombstones'] += object_bytes(node) + key_bytes + value_bytes
+                else:
+                    report['entries'] += object_bytes(node)
+                    report['keys'] += key_bytes
+                    report['values'] += value_bytes
+
+        if self._prefilter is not None:
+            report['prefilter'] = self._prefilter.memory_bytes()
+        if self._ordered_index is not None:
+            report['index'] = self._ordered_index.memory_bytes()
+        report['total'] = sum(report.values())
+        return report
+
+    def set_ordered_index(self, enabled: bool = True) -> None:
+        """
+        Keeps an ordered index (a skip list of the keys) next to the table, for
+        range(), prefix(), min_key() and max_key(); False removes it. The index
+        is updated by put, remove and clear. Point lookups don't use it. Its
+        nodes count against the memory budget; MemoryBudgetError is raised and
+        the map is left unchanged if they don't fit.
+        """
+        ordered_index = None
+        if enabled:
+            ordered_index = OrderedIndex()
+            key_value_pairs = self.get_keys_and_values()
+            for index in range(key_value_pairs.length()):
+                ordered_index.insert(key_value_pairs[index][0])
+
+        self._charge_structure(self._ordered_index, ordered_index)
+        self._ordered_index = ordered_index
+
+    def _index_key(self, key: str) -> None:
+        """
+        Adds a new key to the ordered index, charging its node to the budget
+        """
+        before = self._ordered_index.memory_bytes()
+        self._ordered_index.insert(key)
+        if self._memory_budget is not None:
+            self._memory_used += self._ordered_index.memory_bytes() - before
+
+    def _unindex_key(self, key: str) -> None:
+        """
+        Removes a key from the ordered index, crediting its node to the budget
+        """
+        before = self._ordered_index.memory_bytes()
+        self._ordered_index.remove(key)
+        if self._memory_budget is not None:
+            self._memory_used -= before - self._ordered_index.memory_bytes()
+
+    def _require_ordered_index(self) -> OrderedIndex:
+        """
+        Returns the ordered index, raising ValueError if there is none
+        """
+        if self._ordered_index is None:
+            raise ValueError("the map has no ordered index; call set_ordered_index() first")
+        return self._ordered_index
+
+    def range(self, lo: str = None, hi: str = None):
+        """
+        Lazily yields (key, value) for keys lo <= key < hi in key order; None
+        leaves that end open. Needs the ordered index.
+        """
+        for key in self._require_ordered_index().range(lo, hi):
+            yield key, self._bucket(self._hash_function(key) % self._capacity).contains(key).value
+
+    def prefix(self, prefix: str):
+        """
+        Lazily yields (key, value) for keys starting with prefix in key order.
+        Needs the ordered index.
+        """
+        for key in self._require_ordered_index().prefix(prefix):
+            yield key, self._bucket(self._hash_function(key) % self._capacity).contains(key).value
+
+    def min_key(self) -> str:
+        """
+        Returns the smallest key, or None if the map is empty. Needs the ordered
+        index.
+        """
+        return self._require_ordered_index().min_key()
+
+    def max_key(self) -> str:
+        """
+        Returns the largest key, or None if the map is empty. Needs the ordered
+        index.
+        """
+        return self._require_ordered_index().max_key()
+
+    def start_trace(self, path: str, sample_rate: float = 1.0) -> None:
+        """
+        Starts logging every put(), get(), remove() and resize_table() call to
+        a binary trace file at path, for replay with hash_map_trace.replay().
+        sample_rate keeps that share of keys, with all of their calls.
+        """
+        if self._trace is not None:
+            self.stop_trace()
+        self._trace = TraceRecorder(path, sample_rate)
+
+    def stop_trace(self) -> int:
+        """
+        Stops and closes the trace; returns the number of calls recorded
+        """
+        if self._trace is None:
+            return 0
+        trace, self._trace = self._trace, None
+        return trace.close()
+
+    def set_prefilter(self, false_positive_rate: float = 0.01) -> None:
+        """
+        Puts a counting Bloom filter in front of the map (None removes it). Keys
+        the filter rules out are reported missing by get(), contains_key() and
+        remove() without probing the buckets. The filter is kept in sync on
+        put, remove, clear and resize, and sized for the most keys the table
+        holds before it next grows. Its counters count against the memory
+        budget; MemoryBudgetError is raised and the map is left unchanged if
+        they don't fit.
+        """
+        prefilter = None
+        if false_positive_rate is not None:
+            prefilter = CountingBloomFilter(self._capacity * self._load_factor, false_positive_rate)
+            key_value_pairs = self.get_keys_and_values()
+            for index in range(key_value_pairs.length()):
+                prefilter.add(key_value_pairs[index][0])
+
+        self._charge_structure(self._prefilter, prefilter)
+        self._prefilter_rate = false_positive_rate
+        self._prefilter = prefilter
+
+    def prefilter_stats(self) -> dict:
+        """
+        Returns the pre-filter's stats (size, memory, expected false positive
+        rate, checks and rejections), or None if the map has no pre-filter
+        """
+        if self._prefilter is None:
+            return None
+        return self._prefilter.get_stats()
+
+    def _new_prefilter(self) -> CountingBloomFilter:
+        """
+        Returns an empty pre-filter sized for the current capacity
+        """
+        return CountingBloomFilter(self._capacity * self._load_factor, self._prefilter_rate)
+
+    def set_memory_budget(self, max_bytes: int, on_exceed: callable = None) -> None:
+        """
+        Caps the memory used by the map, including the pre-filter and ordered
+        index, at max_bytes (None removes the cap). A put
+        of a new key that would go over first calls on_exceed(map, bytes_needed),
+        which may remove entries to make room; if the map is still over budget,
+        MemoryBudgetError is raised and the map is left unchanged.
+        """
+        self._memory_budget = max_bytes
+        self._on_exceed = on_exceed
+        self._memory_used = self.memory_usage()['total'] if max_bytes is not None else 0
+
+    def _charge_memory(self, key: str, value: object) -> None:
+        """
+        Accounts for the memory a put will use, enforcing the budget for new keys
+        """
+        index = self._hash_function(key) % self._capacity
+        existing = self._bucket(index).contains(key)
+        key_bytes, value_bytes = payload_bytes(key, value)
+
+        # replacing a value only changes the value payload
+        if existing is not None:
+            self._memory_used += value_bytes - payload_bytes(key, existing.value)[1]
+            return
+
+        cost = _NODE_BYTES + key_bytes + value_bytes
+
+        # growing adds a slot, an empty chain and an epoch stamp per new bucket,
+        # and a larger pre-filter; resize_table() accounts for the real growth
+        # once it happens
+        growth = 0
+        if self.table_load() >= self._load_factor:
+            growth = (self._grown_capacity() - self._capacity) * (POINTER_BYTES + _CHAIN_BYTES +
+                                                                  self._epochs.itemsize)
+            if self._prefilter is not None:
+                growth += (filter_bytes(self._grown_capacity() * self._load_factor,
+                                        self._prefilter_rate) - self._prefilter.memory_bytes())
+
+        # the index node's height is only drawn when it is inserted, so leave
+        # room for the tallest one; _index_key() charges the real size
+        if self._ordered_index is not None:
+            growth += MAX_NODE_BYTES
+
+        needed = self._memory_used + cost + growth - self._memory_budget
+        if needed > 0 and self._on_exceed is not None:
+            self._on_exceed(self, needed)
+            needed = self._memory_used + cost + growth - self._memory_budget
+        if needed > 0:
+            raise MemoryBudgetError(
+                f"put of {key!r} needs {cost + growth} bytes, {self._memory_used} of "
+                f"{self._memory_budget} bytes already used")
+        self._memory_used += cost
+
+    def _charge_structure(self, old, new) -> None:
+        """
+        Accounts for replacing the pre-filter or ordered index old with new
+        (either may be None), raising MemoryBudgetError if new doesn't fit
+        """
+        if self._memory_budget is None:
+            return
+        change = ((0 if new is None else new.memory_bytes()) -
+                  (0 if old is None else old.memory_bytes()))
+        if change > 0 and self._memory_used + change > self._memory_budget:
+            raise MemoryBudgetError(
+                f"{type(new).__name__} needs {change} bytes, {self._memory_used} of "
+                f"{self._memory_budget} bytes already used")
+        self._memory_used += change
+
+    @staticmethod
+    def _table_bytes(buckets: DynamicArray) -> int:
+        """
+        Returns bytes of a bucket list and its chain objects, without the nodes
+        """
+        total = dynamic_array_bytes(buckets)
+        for index in range(buckets.length()):
+            total += object_bytes(buckets[index])
+        return total
+
+    def snapshot(self) -> "HashMapSnapshot":
+        """
+        Returns a read-only view of the map as it is now, in O(1). Buckets are
+        shared with the view and copied lazily the first time a later write
+        touches them, so the cost depends on the buckets written afterwards.
+        """
+        layer = self._live_snapshot_layer()
+
+        # reuse the latest layer if nothing was written or cleared since it was taken
+        if layer is None or len(layer.preserved) != 0 or layer.epoch != self._epoch:
+            new_layer = _SnapshotLayer(self._buckets, self._epochs, self._epoch)
+            if layer is not None:
+                layer.next = new_layer
+            layer = new_layer
+            self._snapshot_layer = weakref.ref(layer)
+
+        return HashMapSnapshot(layer, self._size, self._capacity, self._hash_function)
+
+    def _live_snapshot_layer(self) -> "_SnapshotLayer":
+        """
+        Returns the layer of the most recent snapshot still in use, or None
+        """
+        if self._snapshot_layer is None:
+            return None
+        return self._snapshot_layer()
+
+    def _writable_bucket(self, index: int) -> LinkedList:
+        """
+        Returns the bucket at index, first copying it if a snapshot still shares
+        it, or replacing it if it was written before the last clear()
+        """
+        layer = self._live_snapshot_layer()
+        shared = layer is not None and index not in layer.preserved
+        if shared:
+            # hand the current chain and its stamp to the snapshot first
+            layer.preserved[index] = (self._buckets[index], self._epochs[index])
+
+        if self._epochs[index] != self._epoch:
+            bucket = LinkedList()
+            self._buckets[index] = bucket
+            self._epochs[index] = self._epoch
+            return bucket
+
+        if not shared:
+            return self._buckets[index]
+
+        # keep a private copy of the chain the snapshot now holds
+        bucket = self._buckets[index]
+        copy = LinkedList()
+        for node in bucket:
+            copy.insert(node.key, node.value)
+        self._buckets[index] = copy
+        return copy
+
+
+class _SnapshotLayer:
+    """
+    Buckets a snapshot shares with its map. preserved holds the original chain
+    and epoch stamp of every bucket written since the snapshot was taken;
+    buckets not in it are read from the next layer or, at the end of the
+    chain, the bucket list. A chain stamped with another epoch than the
+    layer's was cleared before the snapshot and reads as empty.
+    """
+
+    def __init__(self, buckets: DynamicArray, epochs: array, epoch: int) -> None:
+        """Initialize a layer over the map's current bucket list and epoch."""
+        self.buckets = buckets
+        self.epochs = epochs
+        self.epoch = epoch
+        self.preserved = {}
+        self.next = None
+
+    def bucket(self, index: int) -> LinkedList:
+        """Return bucket at index as it was when this layer was taken."""
+        layer = self
+        while True:
+            if index in layer.preserved:
+                bucket, stamp = layer.preserved[index]
+                break
+            if layer.next is None:
+                # a writer preserves a chain before swapping in its copy, so
+                # checking again catches a swap made while we were reading
+                bucket, stamp = layer.buckets[index], layer.epochs[index]
+                bucket, stamp = layer.preserved.get(index, (bucket, stamp))
+                break
+            layer = layer.next
+        return bucket if stamp == self.epoch else _EMPTY_CHAIN
+
+
+class HashMapSnapshot:
+    """
+    Immutable, consistent view of a separate chaining HashMap, created by
+    HashMap.snapshot(). Writes to the map after the snapshot are not visible.
+    """
+
+    def __init__(self, layer: _SnapshotLayer, size: int, capacity: int,
+                 function: callable) -> None:
+        """Initialize a view over the given layer."""
+        self._layer = layer
+        self._size = size
+        self._capacity = capacity
+        self._hash_function = function
+
+    def get_size(self) -> int:
+        """
+        Return size of map when the snapshot was taken
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map when the snapshot was taken
+        """
+        return self._capacity
+
+    def table_load(self) -> float:
+        """
+        Returns the hash table load factor when the snapshot was taken
+        """
+        return self._size/self._capacity
+
+    def get(self, key: str):
+        """
+        returns the value associated with a given key.
+        If key is not in the snapshot returns None
+        """
+        index = self._hash_function(key) % self._capacity
+        node = self._layer.bucket(index).contains(key)
+        if node is None:
+            return None
+        return node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the snapshot. Otherwise, returns False
+        """
+        if self._size == 0:
+            return False
+
+        index = self._hash_function(key) % self._capacity
+        return self._layer.bucket(index).contains(key) is not None
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple of a key/value
+        pair stored in the snapshot.
+        """
+        keys_and_values = DynamicArray()
+
+        for index in range(self._capacity):
+            for node in self._layer.bucket(index):
+                keys_and_values.append((node.key, node.value))
+
+        return keys_and_values
+
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
@@ -251,16 +879,20 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
             # if the element is not a key in the hashmap, add it with a frequency of 1
             map.put(da[index], 1)
 
+    return _modes(map.get_keys_and_values())
+
+
+def _modes(key_value_pairs: DynamicArray) -> tuple[DynamicArray, int]:
+    """
+    parameter: DynamicArray of (element, frequency) pairs
+    returns: tuple (most occurring value(s), highest frequency of occurrence)
+    """
     mode = DynamicArray()
     mode_frequency = 0
-      
-    # iterate through the HashMap list of keys and values to find mode
-    
-    key_value_pairs = map.get_keys_and_values()
-    
-    for index in range(map.get_keys_and_values().length()):
-        tuple = key_value_pairs[index]
-        element, frequency = tuple
+
+    # iterate through the list of keys and values to find mode
+    for index in range(key_value_pairs.length()):
+        element, frequency = key_value_pairs[index]
         if frequency == mode_frequency:
             mode.append(element)
         elif frequency > mode_frequency:
@@ -270,10 +902,117 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
 
     return mode, mode_frequency
 
+
+def _count_chunk(chunk: list) -> list:
+    """
+    Worker task: counts the elements of one chunk and returns them as a list of
+    (element, frequency) pairs. The local HashMap grows with the distinct
+    elements, and only the pairs are sent back to the parent.
+    """
+    counts = HashMap()
+    for element in chunk:
+        frequency = counts.get(element)
+        counts.put(element, 1 if frequency is None else frequency + 1)
+    key_value_pairs = counts.get_keys_and_values()
+    return [key_value_pairs[index] for index in range(key_value_pairs.length())]
+
+
+def _merge_counts(left: list, right: list) -> list:
+    """
+    Worker task: merges the (element, frequency) pairs of two neighbouring
+    partial counts, left covering the earlier chunks, and returns the merged
+    pairs. Elements keep their first-seen order, so the result only depends on
+    the chunk order, never on which worker finished first.
+    """
+    counts = HashMap(expected_size=max(len(left), len(right)))
+    for element, frequency in left:
+        counts.put(element, frequency)
+    for element, frequency in right:
+        current = counts.get(element)
+        counts.put(element, frequency if current is None else current + frequency)
+    key_value_pairs = counts.get_keys_and_values()
+    return [key_value_pairs[index] for index in range(key_value_pairs.length())]
+
+
+def _push_partial(pool, partials: list, level: int, future) -> None:
+    """
+    Pushes the partial counts of the next chunk (level 0) onto the stack of
+    partials and, like a binary counter, hands each pair of neighbours on the
+    same level to a worker to merge into one partial on the next level
+    """
+    while partials and partials[-1][0] == level:
+        _, left = partials.pop()
+        future = pool.submit(_merge_counts, left.result(), future.result())
+        level += 1
+    partials.append((level, future))
+
+
+def _chunks(data, chunk_size: int):
+    """
+    Yields lists of at most chunk_size elements from a DynamicArray or any iterable
+    """
+    if isinstance(data, DynamicArray):
+        for start in range(0, data.length(), chunk_size):
+            end = min(start + chunk_size, data.length())
+            yield [data[index] for index in range(start, end)]
+        return
+
+    iterator = iter(data)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def find_mode_parallel(data, chunk_size: int = 100_000,
+                       processes: int = None) -> tuple[DynamicArray, int]:
+    """
+    parameter: DynamicArray or iterable of string elements
+    returns: tuple (most occurring value(s), highest frequency of occurrence)
+    Counts chunks in a process pool and merges the counts pairwise in the
+    workers as a tree: chunk results are taken in chunk order and neighbours on
+    the same level are merged as soon as both exist, so at most log2(chunks)
+    partials are held and ties always come out in the same order. Iterables
+    are read lazily and at most two chunks per worker are in flight.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        in_flight_limit = 2 * processes
+        in_flight = collections.deque()
+        partials = []
+
+        # keep a bounded number of chunks queued at the workers and reduce
+        # their counts in the order the chunks were read
+        for chunk in _chunks(data, chunk_size):
+            if len(in_flight) >= in_flight_limit:
+                _push_partial(pool, partials, 0, in_flight.popleft())
+            in_flight.append(pool.submit(_count_chunk, chunk))
+
+        while in_flight:
+            _push_partial(pool, partials, 0, in_flight.popleft())
+
+        if not partials:
+            return DynamicArray(), 0
+
+        # merge what is left of the tree, newest partials first
+        while len(partials) > 1:
+            _, right = partials.pop()
+            level, left = partials.pop()
+            partials.append((level, pool.submit(_merge_counts, left.result(), right.result())))
+
+        pairs = partials[0][1].result()
+
+    return _modes(DynamicArray(pairs))
+
+
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 
 if __name__ == "__main__":
+    import time
 
     print("\nPDF - put example 1")
     print("-------------------")
@@ -473,3 +1212,101 @@ if __name__ == "__main__":
         da = DynamicArray(case)
         mode, frequency = find_mode(da)
         print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}\n")
+
+    print("\nsnapshot example")
+    print("----------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(100):
+        m.put('key' + str(i), i)
+    first = m.snapshot()
+    m.put('key0', 'changed')
+    m.remove('key1')
+    second = m.snapshot()
+    m.put('new key', 1)
+    m.resize_table(200)
+    m.remove('key2')
+    print(first.get('key0'), first.get('key1'), first.get('key2'), first.get_size())
+    print(second.get('key0'), second.get('key1'), second.contains_key('new key'), second.get_size())
+    print(m.get('key0'), m.get('key1'), m.get('key2'), m.get('new key'), m.get_size())
+    print(first.get_keys_and_values().length(), second.get_keys_and_values().length())
+
+    print("\nfind_mode_parallel example")
+    print("--------------------------")
+    for case in test_cases:
+        mode, frequency = find_mode_parallel(DynamicArray(case), chunk_size=2)
+        print(f"Input: {case}\nMode : {mode}, Frequency: {frequency}\n")
+    stream = (str(i % 997) for i in range(200_000))
+    mode, frequency = find_mode_parallel(stream, chunk_size=10_000)
+    print(mode.length(), frequency)
+
+    print("\nmemory_usage / set_memory_budget example")
+    print("----------------------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(100):
+        m.put('key' + str(i), i * 1000)
+    report = m.memory_usage()
+    print(report['total'] == sum(v for k, v in report.items() if k != 'total'),
+          m.memory_usage(deep=False)['keys'], report['entries'] > 0)
+
+    def evict(hash_map, needed):
+        # drop the oldest keys until the map is small enough again
+        for i in range(hash_map.get_size()):
+            hash_map.remove('key' + str(i))
+
+    m.set_memory_budget(report['total'] + 1000)
+    try:
+        for i in range(100, 200):
+            m.put('key' + str(i), i * 1000)
+    except MemoryBudgetError as error:
+        print('MemoryBudgetError', m.get_size())
+    m.set_memory_budget(m.memory_usage()['total'] + 10, evict)
+    m.put('key999', 1)
+    print(m.get_size(), m.contains_key('key999'), m.contains_key('key0'))
+
+    print("\nset_prefilter example")
+    print("---------------------")
+    m = HashMap(11, hash_function_1)
+    m.put('key0', 0)
+    m.set_prefilter(0.01)
+    for i in range(1, 1000):
+        m.put('key' + str(i), i)
+    for i in range(0, 1000, 2):
+        m.remove('key' + str(i))
+    result = all(m.get('key' + str(i)) == i for i in range(1, 1000, 2))
+    result &= not any(m.contains_key('key' + str(i)) for i in range(0, 1000, 2))
+    result &= not any(m.contains_key('miss' + str(i)) for i in range(5000))
+    stats = m.prefilter_stats()
+    print(result, stats['items'], stats['rejected'] > 4500, m.memory_usage()['prefilter'] > 0)
+    m.clear()
+    print(m.get('key1'), m.prefilter_stats()['items'])
+
+    print("\nO(1) clear example")
+    print("------------------")
+    m = HashMap(100_003, hash_function_1)
+    start = time.perf_counter()
+    for i in range(70_000):
+        m.put('key' + str(i % 7), i)
+        m.clear()
+    elapsed = time.perf_counter() - start
+    m.put('key1', 1)
+    print(m.get_size(), m.get('key1'), m.get('key2'), m.contains_key('key3'),
+          m.get_keys_and_values().length(), m.empty_buckets() >= 100_002,
+          f"{elapsed / 70_000 * 1e6:.1f} us per put + clear")
+
+    print("\nsnapshot across clear example")
+    print("-----------------------------")
+    m = HashMap(100_003, hash_function_2)
+    for i in range(20):
+        m.put('key' + str(i), i)
+    before = m.snapshot()
+    start = time.perf_counter()
+    for i in range(10_000):
+        m.clear()
+        m.put('key' + str(i % 7), i)
+        during = m.snapshot()
+    elapsed = time.perf_counter() - start
+    m.put('key1', 'after')
+    print(before.get('key1'), before.get('key19'), before.get_size(), before.get_keys_and_values().length())
+    print(during.get('key1'), during.get('key19'), during.get_size(), during.get_keys_and_values().length())
+    print(m.get('key1'), m.get('key19'), m.get_size(), m.get_capacity(),
+          f"{elapsed / 10_000 * 1e6:.1f} us per clear + put + snapshot")
@@ -0,0 +1,356 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of HashMap using a Swiss-table style layout. Keys
+# and values live in parallel arrays and a separate control-byte array holds one
+# byte per slot: EMPTY, DELETED, or the low 7 bits of the key's hash. Probing
+# visits groups of 16 control bytes at a time and uses bytes search to find
+# fingerprint matches, so full key comparisons only happen on likely hits.
+# Methods include put(), get(), remove(), contains_key(), clear(),
+# empty_buckets(), resize_table(), table_load(), get_keys_and_values(),
+# __iter__(), __next__()
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from hash_functions import hash_64, mix_64
+
+# slots scanned together by one probe step
+GROUP_SIZE = 16
+
+# control byte values; full slots hold a 7-bit fingerprint (0 - 127)
+EMPTY = 0x80
+DELETED = 0xFE
+
+# used + deleted slots allowed before the table is rebuilt (7/8)
+MAX_LOAD = 0.875
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 16,
+                 function: callable = hash_64) -> None:
+        """
+        Initialize new HashMap that uses group probing over control bytes.
+        Capacity is rounded up to a power-of-two number of 16-slot groups.
+        The group and fingerprint can only split the entropy the hash function
+        has, so the default is hash_64; the sample hash functions give a few
+        hundred distinct values and suit small maps only.
+        """
+        self._hash_function = function
+        self._size = 0
+        self._deleted = 0
+        self._allocate(capacity)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._ctrl[i] < EMPTY:
+                out += str(i) + ': ' + str(self._keys[i]) + ' -> ' + str(self._values[i]) + '\n'
+            else:
+                out += str(i) + ': ' + ('None' if self._ctrl[i] == EMPTY else 'DELETED') + '\n'
+        return out
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replace the slot arrays with empty ones of at least the given capacity
+        """
+        groups = 1
+        while groups * GROUP_SIZE < capacity:
+            groups *= 2
+
+        self._groups = groups
+        self._capacity = groups * GROUP_SIZE
+        self._ctrl = bytearray([EMPTY]) * self._capacity
+        self._keys = DynamicArray()
+        self._values = DynamicArray()
+        for _ in range(self._capacity):
+            self._keys.append(None)
+            self._values.append(None)
+        self._deleted = 0
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _hash(self, key: str) -> tuple[int, int]:
+        """
+        Returns (starting group, 7-bit fingerprint) for key. The raw hash is
+        scrambled first so both parts depend on every bit of it.
+        """
+        hash = mix_64(self._hash_function(key))
+        return (hash >> 7) & (self._groups - 1), hash & 0x7F
+
+    def _find(self, key: str, group: int, fingerprint: int) -> int:
+        """
+        Returns the slot index holding key, or -1 if key is not in the map
+        """
+        ctrl = self._ctrl
+        # triangular probing visits every group when the group count is a power of two
+        for step in range(self._groups):
+            start = group * GROUP_SIZE
+            end = start + GROUP_SIZE
+
+            slot = ctrl.find(fingerprint, start, end)
+            while slot != -1:
+                if self._keys[slot] == key:
+                    return slot
+                slot = ctrl.find(fingerprint, slot + 1, end)
+
+            # an EMPTY byte ends the probe sequence: the key was never pushed further
+            if ctrl.find(EMPTY, start, end) != -1:
+                return -1
+
+            group = (group + step + 1) & (self._groups - 1)
+        return -1
+
+    def _find_insert_slot(self, group: int) -> int:
+        """
+        Returns the first EMPTY or DELETED slot on the probe sequence
+        """
+        ctrl = self._ctrl
+        for step in range(self._groups):
+            start = group * GROUP_SIZE
+            for slot in range(start, start + GROUP_SIZE):
+                if ctrl[slot] >= EMPTY:
+                    return slot
+            group = (group + step + 1) & (self._groups - 1)
+        return -1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates key/value pair in hash map. If the given key already exists in
+        the hash map, it's associated value is replaced with a new value. When
+        used plus deleted slots reach 7/8 of capacity the table is rebuilt:
+        in place if tombstones dominate, otherwise at double capacity.
+        """
+        group, fingerprint = self._hash(key)
+        slot = self._find(key, group, fingerprint)
+        if slot != -1:
+            self._values[slot] = value
+            return
+
+        if self._size + self._deleted + 1 > self._capacity * MAX_LOAD:
+            if self._deleted > self._size // 2:
+                self.resize_table(self._capacity)
+            else:
+                self.resize_table(2 * self._capacity)
+            group, fingerprint = self._hash(key)
+
+        slot = self._find_insert_slot(group)
+        if self._ctrl[slot] == DELETED:
+            self._deleted -= 1
+        self._ctrl[slot] = fingerprint
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._size += 1
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        returns number of empty buckets in hash table
+        """
+        return self._capacity - self._size
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Change the capacity of the internal hash table. All existing key/value pairs
+        remain in the new hash map and are rehashed. Deleted markers are dropped.
+        """
+        if new_capacity < self._size:
+            return
+
+        old_ctrl = self._ctrl
+        old_keys = self._keys
+        old_values = self._values
+
+        self._allocate(new_capacity)
+        # keep the table under MAX_LOAD after the rebuild
+        while self._size > self._capacity * MAX_LOAD:
+            self._allocate(2 * self._capacity)
+
+        for index in range(len(old_ctrl)):
+            if old_ctrl[index] < EMPTY:
+                group, fingerprint = self._hash(old_keys[index])
+                slot = self._find_insert_slot(group)
+                self._ctrl[slot] = fingerprint
+                self._keys[slot] = old_keys[index]
+                self._values[slot] = old_values[index]
+
+    def get(self, key: str) -> object:
+        """
+        returns value associated with a given key. If the key is not in the Hashmap
+        returns None.
+        """
+        group, fingerprint = self._hash(key)
+        slot = self._find(key, group, fingerprint)
+        if slot == -1:
+            return None
+        return self._values[slot]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if given key is in the hash map. Otherwise, returns False.
+        """
+        if self._size == 0:
+            return False
+
+        group, fingerprint = self._hash(key)
+        return self._find(key, group, fingerprint) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        removes given key and its associated value from the hash map. If the
+        key is not in the hash map, does nothing.
+        """
+        group, fingerprint = self._hash(key)
+        slot = self._find(key, group, fingerprint)
+        if slot == -1:
+            return
+
+        # a group that still has an EMPTY byte never had a probe pass through it,
+        # so the slot can go straight back to EMPTY instead of leaving a marker
+        start = slot - slot % GROUP_SIZE
+        if self._ctrl.find(EMPTY, start, start + GROUP_SIZE) != -1:
+            self._ctrl[slot] = EMPTY
+        else:
+            self._ctrl[slot] = DELETED
+            self._deleted += 1
+        self._keys[slot] = None
+        self._values[slot] = None
+        self._size -= 1
+
+    def clear(self) -> None:
+        """
+        Clears contents of a hash map without changing underlying hash table capacity
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        returns a dynamic array where each index contains a tuple key/value pair
+        stored in the hash map.
+        """
+        keys_and_values = DynamicArray()
+
+        for index in range(self._capacity):
+            if self._ctrl[index] < EMPTY:
+                keys_and_values.append((self._keys[index], self._values[index]))
+
+        return keys_and_values
+
+    def probe_lengths(self) -> DynamicArray:
+        """
+        Returns a dynamic array with, for every key in the map, the number of
+        groups a successful lookup of it examines
+        """
+        lengths = DynamicArray()
+        for slot in range(self._capacity):
+            if self._ctrl[slot] < EMPTY:
+                group, _ = self._hash(self._keys[slot])
+                step = 0
+                while group != slot // GROUP_SIZE:
+                    step += 1
+                    group = (group + step) & (self._groups - 1)
+                lengths.append(step + 1)
+        return lengths
+
+    def __iter__(self):
+        """
+        Create iterator for loop
+        """
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next value and advance iterator
+        """
+        while self._index < self._capacity:
+            index = self._index
+            self._index += 1
+            if self._ctrl[index] < EMPTY:
+                return HashEntry(self._keys[index], self._values[index])
+
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    print("\nput example 1")
+    print("-------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nput example 2")
+    print("-------------")
+    m = HashMap(41, hash_function_2)
+    for i in range(50):
+        m.put('str' + str(i // 3), i * 100)
+        if i % 10 == 9:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nget / contains_key / remove example")
+    print("-----------------------------------")
+    m = HashMap(16, hash_function_2)
+    keys = [str(i) for i in range(1, 3000, 7)]
+    for key in keys:
+        m.put(key, int(key) * 42)
+    result = True
+    for key in keys:
+        result &= m.get(key) == int(key) * 42
+        result &= not m.contains_key(key + 'x')
+    print(result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+    for key in keys[::2]:
+        m.remove(key)
+    result = all(m.contains_key(key) != (index % 2 == 0) for index, key in enumerate(keys))
+    print(result, m.get_size(), m.get_capacity())
+
+    print("\nchurn example (deleted markers do not build up)")
+    print("-----------------------------------------------")
+    m = HashMap(64, hash_function_2)
+    for i in range(5000):
+        m.put('key' + str(i), i)
+        if i >= 40:
+            m.remove('key' + str(i - 40))
+    print(m.get_size(), m.get_capacity(), m.get('key4999'), m.get('key0'))
+
+    print("\nscaling example")
+    print("---------------")
+    for size in (50_000, 200_000):
+        m = HashMap()
+        start = time.perf_counter()
+        for i in range(size):
+            m.put('user:' + str(i), i)
+        elapsed = time.perf_counter() - start
+        print(size, m.get('user:' + str(size - 1)), f"{elapsed / size * 1e6:.1f} us per put")
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    m = HashMap(10, hash_function_1)
+    for i in range(5):
+        m.put(str(i), str(i * 10))
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
@@ -0,0 +1,246 @@
+# Course: CS261 - Data Structures
+# Description: Recording and replay of hash map operation traces. A map started
+# with start_trace() logs every put(), get(), remove() and resize_table() call
+# to a compact binary file: one fixed-size record per call holding the
+# operation, nanoseconds since the trace started and a 64-bit hash of the key
+# (the new capacity for resizes). Keys are never written, only their hashes,
+# and sampling keeps or drops a key for the whole trace so its operations stay
+# together. replay() runs a trace against any engine and configuration and
+# reports throughput, per-operation latency percentiles and probe lengths.
+
+import struct
+import time
+
+from a6_include import hash_function_1
+
+# operation codes
+PUT = 1
+GET = 2
+REMOVE = 3
+RESIZE = 4
+
+OPERATION_NAMES = {PUT: 'put', GET: 'get', REMOVE: 'remove', RESIZE: 'resize'}
+
+_MAGIC = b'HMT1'
+# magic, sample rate
+_HEADER = struct.Struct('<4sd')
+# operation, nanoseconds since start, key hash or new capacity
+_RECORD = struct.Struct('<BQQ')
+
+_MASK_64 = (1 << 64) - 1
+
+# bytes buffered before a write to the trace file
+_FLUSH_BYTES = 1 << 16
+
+
+class TraceRecorder:
+    """
+    Writes trace records for one map
+    Supported methods are: record, record_resize, close
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0) -> None:
+        """Open path and write the trace header."""
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, sample_rate))
+        self._threshold = int(sample_rate * (1 << 32))
+        self._buffer = bytearray()
+        self._start = time.perf_counter_ns()
+        self._records = 0
+
+    def record(self, operation: int, key: str) -> None:
+        """Log one call on key, if key is sampled."""
+        hash = hash_key(key)
+        if hash & 0xFFFFFFFF >= self._threshold:
+            return
+        self._buffer += _RECORD.pack(operation, time.perf_counter_ns() - self._start, hash)
+        self._records += 1
+        if len(self._buffer) >= _FLUSH_BYTES:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def record_resize(self, new_capacity: int) -> None:
+        """Log a resize_table() call."""
+        self._buffer += _RECORD.pack(RESIZE, time.perf_counter_ns() - self._start, new_capacity)
+        self._records += 1
+        if len(self._buffer) >= _FLUSH_BYTES:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def close(self) -> int:
+        """Flush and close the trace; returns the number of records written."""
+        self._file.write(self._buffer)
+        self._file.close()
+        return self._records
+
+
+def hash_key(key: str) -> int:
+    """
+    Returns the 64-bit hash a trace stores for key. hash() is cached on str
+    objects, and it only has to agree within one trace, where equal keys
+    need equal hashes.
+    """
+    return hash(key) & _MASK_64
+
+
+def read_trace(path: str) -> tuple[float, list]:
+    """
+    Returns (sample rate, [(operation, nanoseconds, key hash or capacity), ...])
+    for a trace file
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, sample_rate = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError(f"{path} is not a hash map trace")
+    return sample_rate, list(_RECORD.iter_unpack(memoryview(data)[_HEADER.size:]))
+
+
+def probe_stats(hash_map) -> dict:
+    """
+    Returns mean and max number of entries a successful lookup examines, over
+    every stored key, from the map's probe_lengths()
+    """
+    lengths = hash_map.probe_lengths()
+    if lengths.length() == 0:
+        return {'mean_probes': 0.0, 'max_probes': 0}
+    total = 0
+    longest = 0
+    for index in range(lengths.length()):
+        total += lengths[index]
+        longest = max(longest, lengths[index])
+    return {'mean_probes': total / lengths.length(), 'max_probes': longest}
+
+
+def replay(path: str, engine='sc', capacity: int = 11,
+           function: callable = hash_function_1, latency: bool = True, **options) -> dict:
+    """
+    Replays a trace against a new map of the given engine and configuration.
+    engine is 'sc' or 'oa', or any map class or factory with probe_lengths(),
+    called as engine(capacity, function, **options). Keys are rebuilt from the
+    hashes, so repeated keys stay repeated; traced resizes are skipped since
+    the engine makes its own. Returns a dict with:
+    operations, seconds, ops_per_second: full speed run, no per-call timing
+    p50_us, p95_us, p99_us, max_us: per-call latency, from a second run
+    (only if latency is True)
+    trace_resizes, capacity: resizes in the trace, final capacity of the replay
+    mean_probes, max_probes: see probe_stats()
+    """
+    if isinstance(engine, str):
+        # imported here: the maps import this module for their recorder
+        from hash_map_tuner import ENGINES
+        engine = ENGINES[engine]
+
+    _, records = read_trace(path)
+    calls = []
+    resizes = 0
+    for operation, _, hash in records:
+        if operation == RESIZE:
+            resizes += 1
+        else:
+            calls.append((operation, format(hash, 'x')))
+
+    def run(timed: bool):
+        hash_map = engine(capacity, function, **options)
+        put, get, remove = hash_map.put, hash_map.get, hash_map.remove
+        latencies = []
+        clock = time.perf_counter_ns
+        start = time.perf_counter()
+        for index, (operation, key) in enumerate(calls):
+            if timed:
+                begin = clock()
+            if operation == GET:
+                get(key)
+            elif operation == PUT:
+                put(key, index)
+            else:
+                remove(key)
+            if timed:
+                latencies.append(clock() - begin)
+        return hash_map, time.perf_counter() - start, latencies
+
+    hash_map, elapsed, _ = run(timed=False)
+    result = {'operations': len(calls), 'seconds': elapsed,
+              'ops_per_second': len(calls) / elapsed if elapsed > 0 else float('inf'),
+              'trace_resizes': resizes, 'capacity': hash_map.get_capacity()}
+
+    if latency and calls:
+        _, _, latencies = run(timed=True)
+        latencies.sort()
+        for name, fraction in (('p50_us', 0.50), ('p95_us', 0.95), ('p99_us', 0.99)):
+            result[name] = latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] / 1000
+        result['max_us'] = latencies[-1] / 1000
+
+    result.update(probe_stats(hash_map))
+    return result
+
+
+def report(results: dict) -> str:
+    """
+    Returns replay() results for several configurations, {name: result}, as a
+    table
+    """
+    lines = [f"{'config':<24}{'ops/s':>12}{'p50 us':>9}{'p99 us':>9}{'probes':>8}{'max':>5}"]
+    for name, result in results.items():
+        lines.append(f"{name:<24}{result['ops_per_second']:>12,.0f}{result.get('p50_us', 0):>9.2f}"
+                     f"{result.get('p99_us', 0):>9.2f}{result['mean_probes']:>8.2f}"
+                     f"{result['max_probes']:>5}")
+    return '\n'.join(lines)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    from a6_include import hash_function_2
+    import hash_map_linear
+    import hash_map_oa
+    import hash_map_sc
+    import hash_map_swiss
+    from hash_map_tuner import sample_workload, replay as replay_workload
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'trace.hmt')
+
+    print("\nrecord example")
+    print("--------------")
+    workload = sample_workload(50_000, 5_000, read_ratio=0.7, miss_ratio=0.2,
+                               remove_ratio=0.3, skew=1.0)
+    m = hash_map_sc.HashMap()
+    m.start_trace(path)
+    replay_workload(m, workload)
+    records = m.stop_trace()
+    sample_rate, trace = read_trace(path)
+    counts = {}
+    for operation, _, _ in trace:
+        counts[OPERATION_NAMES[operation]] = counts.get(OPERATION_NAMES[operation], 0) + 1
+    print(records, sorted(counts.items()), os.path.getsize(path))
+
+    m = hash_map_oa.HashMap(11, hash_function_1)
+    m.start_trace(os.path.join(directory, 'sampled.hmt'), sample_rate=0.1)
+    replay_workload(m, workload)
+    print(m.stop_trace() < records // 5)
+
+    print("\nreplay example")
+    print("--------------")
+    results = {}
+    for engine, function, load_factor in (('sc', hash_function_1, 1.0), ('sc', hash_function_2, 1.0),
+                                          ('oa', hash_function_2, 0.5), ('oa', hash_function_2, 0.25)):
+        name = f"{engine} {function.__name__[-1]} load={load_factor}"
+        results[name] = replay(path, engine, function=function, load_factor=load_factor)
+    print(report(results))
+    print(results[name]['operations'], results[name]['trace_resizes'])
+
+    print("\nreplay other engines example")
+    print("----------------------------")
+    results = {'linear 2 load=1.0': replay(path, hash_map_linear.HashMap, function=hash_function_2),
+               'swiss hash_64': replay(path, lambda capacity, function: hash_map_swiss.HashMap(capacity))}
+    print(report(results))
+
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
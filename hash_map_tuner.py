@@ -0,0 +1,152 @@
+# Course: CS261 - Data Structures
+# Description: Workload-driven tuning of the hash maps. A sample of operations
+# (put / get / remove) is replayed against candidate configurations: engine
+# (separate chaining or open addressing), max load factor and growth factor.
+# Each run is timed and its final memory use measured, and the configurations
+# are ranked by a throughput / memory score. sample_workload() builds synthetic
+# samples with a chosen read/write mix, miss rate and key skew.
+
+import math
+import random
+import time
+
+from a6_include import hash_function_1, hash_function_2
+import hash_map_oa
+import hash_map_sc
+
+ENGINES = {'sc': hash_map_sc.HashMap, 'oa': hash_map_oa.HashMap}
+
+# load factors tried for each engine when no candidates are given
+LOAD_FACTORS = {'sc': (0.75, 1.0, 2.0, 4.0), 'oa': (0.25, 0.5, 0.7)}
+GROWTH_FACTORS = (1.5, 2, 4)
+
+
+def sample_workload(operations: int, key_space: int, read_ratio: float = 0.8,
+                    miss_ratio: float = 0.1, remove_ratio: float = 0.0,
+                    skew: float = 0.0, seed: int = 0) -> list:
+    """
+    Returns a list of operations as tuples ('put', key, value), ('get', key) or
+    ('remove', key).
+    read_ratio: share of gets among all operations
+    miss_ratio: share of gets for keys that are never put
+    remove_ratio: share of removes among the writes
+    skew: 0 picks keys uniformly; larger values follow a Zipf-like law with
+        that exponent, so a few hot keys take most of the traffic
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(key_space)]
+    ranks = rng.choices(range(key_space), weights=weights, k=operations)
+
+    workload = []
+    for index in range(operations):
+        key = 'key' + str(ranks[index])
+        if rng.random() < read_ratio:
+            if rng.random() < miss_ratio:
+                key = 'miss' + str(ranks[index])
+            workload.append(('get', key))
+        elif rng.random() < remove_ratio:
+            workload.append(('remove', key))
+        else:
+            workload.append(('put', key, index))
+    return workload
+
+
+def replay(hash_map, workload: list) -> float:
+    """
+    Runs every operation of the workload against hash_map and returns the
+    elapsed time in seconds
+    """
+    put = hash_map.put
+    get = hash_map.get
+    remove = hash_map.remove
+
+    start = time.perf_counter()
+    for operation in workload:
+        if operation[0] == 'get':
+            get(operation[1])
+        elif operation[0] == 'put':
+            put(operation[1], operation[2])
+        else:
+            remove(operation[1])
+    return time.perf_counter() - start
+
+
+def candidate_configs(engines: tuple = ('sc', 'oa')) -> list:
+    """
+    Returns the default grid of configurations as dicts with engine,
+    load_factor and growth_factor
+    """
+    configs = []
+    for engine in engines:
+        for load_factor in LOAD_FACTORS[engine]:
+            for growth_factor in GROWTH_FACTORS:
+                configs.append({'engine': engine, 'load_factor': load_factor,
+                                'growth_factor': growth_factor})
+    return configs
+
+
+def tune(workload: list, candidates: list = None, memory_weight: float = 0.5,
+         capacity: int = 11, function: callable = hash_function_1,
+         repeat: int = 3) -> list:
+    """
+    Replays the workload against every candidate configuration (see
+    candidate_configs()) and returns the results, best first. Each result is
+    the candidate dict plus:
+    ops_per_second: best throughput over repeat runs
+    bytes: memory_usage(deep=False) total after the run (payload is excluded
+        since it is the same for every configuration)
+    score: log(ops_per_second) - memory_weight * log(bytes); memory_weight 0
+        ranks by speed alone, larger values favour compact tables
+    """
+    if candidates is None:
+        candidates = candidate_configs()
+
+    results = []
+    for config in candidates:
+        best = None
+        memory = 0
+        for _ in range(repeat):
+            hash_map = ENGINES[config['engine']](capacity, function,
+                                                 load_factor=config['load_factor'],
+                                                 growth_factor=config['growth_factor'])
+            elapsed = replay(hash_map, workload)
+            best = elapsed if best is None else min(best, elapsed)
+            memory = hash_map.memory_usage(deep=False)['total']
+
+        ops_per_second = len(workload) / best if best > 0 else float('inf')
+        result = dict(config)
+        result['ops_per_second'] = ops_per_second
+        result['bytes'] = memory
+        result['score'] = math.log(ops_per_second) - memory_weight * math.log(memory)
+        results.append(result)
+
+    results.sort(key=lambda result: result['score'], reverse=True)
+    return results
+
+
+def report(results: list) -> str:
+    """
+    Returns the results of tune() as a table, best first
+    """
+    lines = [f"{'engine':<7}{'load':>6}{'growth':>8}{'ops/s':>12}{'bytes':>10}{'score':>9}"]
+    for result in results:
+        lines.append(f"{result['engine']:<7}{result['load_factor']:>6}{result['growth_factor']:>8}"
+                     f"{result['ops_per_second']:>12,.0f}{result['bytes']:>10}{result['score']:>9.2f}")
+    return '\n'.join(lines)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nread-heavy workload")
+    print("-------------------")
+    workload = sample_workload(20_000, 2_000, read_ratio=0.9, miss_ratio=0.5, skew=1.0)
+    results = tune(workload, repeat=1)
+    print(report(results[:5]))
+
+    print("\nwrite-heavy workload, memory first")
+    print("----------------------------------")
+    workload = sample_workload(20_000, 5_000, read_ratio=0.2, remove_ratio=0.2)
+    results = tune(workload, memory_weight=2.0, function=hash_function_2, repeat=1)
+    print(report(results[:5]))
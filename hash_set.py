@@ -0,0 +1,337 @@
+# Course: CS261 - Data Structures
+# Description: Implementation of HashSet using Open Addressing with Quadratic
+# Probing, storing keys only (no values). Each slot also keeps the key's hash so
+# resizes and set algebra never recompute it. Methods include add(), remove(),
+# contains(), clear(), resize_table(), table_load(), get_keys(), union(),
+# intersection(), difference(), issubset(), __iter__(), __next__()
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_functions import hash_64, next_prime
+
+# marks a slot whose key was removed; probing continues past it
+_TOMBSTONE = object()
+
+
+class HashSet:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_64) -> None:
+        """
+        Initialize new HashSet that uses quadratic probing for collision resolution.
+        The default hash_64 keeps adds and set algebra O(1) per key at millions
+        of keys; the sample hash functions suit small sets only.
+        """
+        self._capacity = next_prime(capacity)
+        self._keys = DynamicArray()
+        self._hashes = DynamicArray()
+        for _ in range(self._capacity):
+            self._keys.append(None)
+            self._hashes.append(0)
+
+        self._hash_function = function
+        self._size = 0
+        self._tombstones = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return 'HashSet ' + str(self.get_keys())
+
+    def get_size(self) -> int:
+        """
+        Return number of keys in the set
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of set
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Returns the slot index holding key, or -1 if key is not in the set
+        """
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+
+        while self._keys[index] is not None:
+            if self._hashes[index] == hash and self._keys[index] == key:
+                return index
+            j += 1
+            index = (initial_index + j ** 2) % self._capacity
+
+        return -1
+
+    def _add_hashed(self, key: str, hash: int) -> None:
+        """
+        Adds key whose hash is already known
+        """
+        if (self._size + self._tombstones + 1) / self._capacity > 0.5:
+            self.resize_table(2 * self._capacity)
+
+        initial_index = hash % self._capacity
+        index = initial_index
+        j = 0
+        first_tombstone = -1
+
+        while self._keys[index] is not None:
+            if self._keys[index] is _TOMBSTONE:
+                if first_tombstone == -1:
+                    first_tombstone = index
+            elif self._hashes[index] == hash and self._keys[index] == key:
+                return
+            j += 1
+            index = (initial_index + j ** 2) % self._capacity
+
+        # reuse the first tombstone on the probe sequence, if there was one
+        if first_tombstone != -1:
+            index = first_tombstone
+            self._tombstones -= 1
+
+        self._keys[index] = key
+        self._hashes[index] = hash
+        self._size += 1
+
+    def _hash_for(self, other: "HashSet", index: int) -> int:
+        """
+        Returns the hash this set uses for the key in other's slot, reusing the
+        stored hash when both sets hash the same way
+        """
+        if other._hash_function is self._hash_function:
+            return other._hashes[index]
+        return self._hash_function(other._keys[index])
+
+    def add(self, key: str) -> None:
+        """
+        Adds key to the set. Adding a key that is already present does nothing.
+        Table is resized to double its current capacity when used slots,
+        tombstones included, would exceed half of it.
+        """
+        self._add_hashed(key, self._hash_function(key))
+
+    def contains(self, key: str) -> bool:
+        """
+        Returns True if key is in the set. Otherwise, returns False.
+        """
+        if self._size == 0:
+            return False
+        return self._find(key, self._hash_function(key)) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes key from the set. If the key is not in the set, does nothing.
+        """
+        index = self._find(key, self._hash_function(key))
+        if index == -1:
+            return
+
+        self._keys[index] = _TOMBSTONE
+        self._size -= 1
+        self._tombstones += 1
+
+    def table_load(self) -> float:
+        """
+        Returns current hash table load factor
+        """
+        return self._size / self._capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Change the capacity of the internal hash table. All keys remain in the
+        set and are placed again using their stored hashes.
+        """
+        if new_capacity < self._size:
+            return
+
+        temp_keys = self._keys
+        temp_hashes = self._hashes
+
+        self._capacity = next_prime(new_capacity)
+        self._keys = DynamicArray()
+        self._hashes = DynamicArray()
+        for _ in range(self._capacity):
+            self._keys.append(None)
+            self._hashes.append(0)
+        self._size = 0
+        self._tombstones = 0
+
+        for index in range(temp_keys.length()):
+            key = temp_keys[index]
+            if key is not None and key is not _TOMBSTONE:
+                self._add_hashed(key, temp_hashes[index])
+
+    def clear(self) -> None:
+        """
+        Clears contents of the set without changing underlying hash table capacity
+        """
+        self._keys = DynamicArray()
+        self._hashes = DynamicArray()
+        for _ in range(self._capacity):
+            self._keys.append(None)
+            self._hashes.append(0)
+        self._size = 0
+        self._tombstones = 0
+
+    def get_keys(self) -> DynamicArray:
+        """
+        returns a dynamic array of every key in the set
+        """
+        keys = DynamicArray()
+        for index in range(self._capacity):
+            key = self._keys[index]
+            if key is not None and key is not _TOMBSTONE:
+                keys.append(key)
+        return keys
+
+    # ------------------------- set algebra ---------------------------- #
+
+    def union(self, other: "HashSet") -> "HashSet":
+        """
+        Returns a new set with the keys of both sets. The result is sized up
+        front for both operands, so it never resizes while being filled.
+        """
+        larger, smaller = (self, other) if self._size >= other._size else (other, self)
+        result = HashSet(2 * (self._size + other._size) + 1, self._hash_function)
+
+        for source in (larger, smaller):
+            for index in range(source._capacity):
+                key = source._keys[index]
+                if key is not None and key is not _TOMBSTONE:
+                    result._add_hashed(key, result._hash_for(source, index))
+
+        return result
+
+    def intersection(self, other: "HashSet") -> "HashSet":
+        """
+        Returns a new set with the keys found in both sets. Iterates the smaller
+        operand and probes the larger one.
+        """
+        smaller, larger = (self, other) if self._size <= other._size else (other, self)
+        result = HashSet(2 * smaller._size + 1, self._hash_function)
+
+        for index in range(smaller._capacity):
+            key = smaller._keys[index]
+            if key is not None and key is not _TOMBSTONE:
+                if larger._find(key, larger._hash_for(smaller, index)) != -1:
+                    result._add_hashed(key, result._hash_for(smaller, index))
+
+        return result
+
+    def difference(self, other: "HashSet") -> "HashSet":
+        """
+        Returns a new set with the keys of this set that are not in other
+        """
+        result = HashSet(2 * self._size + 1, self._hash_function)
+
+        if other._size == 0:
+            for index in range(self._capacity):
+                key = self._keys[index]
+                if key is not None and key is not _TOMBSTONE:
+                    result._add_hashed(key, self._hashes[index])
+            return result
+
+        for index in range(self._capacity):
+            key = self._keys[index]
+            if key is not None and key is not _TOMBSTONE:
+                if other._find(key, other._hash_for(self, index)) == -1:
+                    result._add_hashed(key, self._hashes[index])
+
+        return result
+
+    def issubset(self, other: "HashSet") -> bool:
+        """
+        Returns True if every key of this set is also in other
+        """
+        if self._size > other._size:
+            return False
+
+        for index in range(self._capacity):
+            key = self._keys[index]
+            if key is not None and key is not _TOMBSTONE:
+                if other._find(key, other._hash_for(self, index)) == -1:
+                    return False
+
+        return True
+
+    def __iter__(self):
+        """
+        Create iterator for loop
+        """
+        self._index = 0
+        return self
+
+    def __next__(self):
+        """
+        Obtain next key and advance iterator
+        """
+        while self._index < self._capacity:
+            key = self._keys[self._index]
+            self._index += 1
+            if key is not None and key is not _TOMBSTONE:
+                return key
+
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    print("\nadd / contains / remove example")
+    print("-------------------------------")
+    s = HashSet(53, hash_function_1)
+    for i in range(150):
+        s.add('str' + str(i // 2))
+        if i % 25 == 24:
+            print(round(s.table_load(), 2), s.get_size(), s.get_capacity())
+    print(s.contains('str0'), s.contains('str75'))
+    s.remove('str0')
+    s.remove('str0')
+    print(s.contains('str0'), s.get_size())
+
+    print("\nset algebra example")
+    print("-------------------")
+    a = HashSet(11, hash_function_2)
+    b = HashSet(11, hash_function_2)
+    for i in range(0, 30, 2):
+        a.add(str(i))
+    for i in range(0, 30, 3):
+        b.add(str(i))
+    print(a.union(b).get_size(), a.intersection(b), a.difference(b).get_size())
+    print(a.intersection(b).issubset(a), a.issubset(b))
+
+    print("\nmixed hash functions example")
+    print("----------------------------")
+    c = HashSet(11, hash_function_1)
+    for i in range(0, 30, 6):
+        c.add(str(i))
+    print(c.issubset(a), c.intersection(b).get_size(), b.difference(c).get_size())
+
+    print("\nscaling example")
+    print("---------------")
+    for size in (20_000, 80_000):
+        start = time.perf_counter()
+        a = HashSet()
+        b = HashSet()
+        for i in range(size):
+            a.add('id' + str(i))
+            b.add('id' + str(2 * i))
+        common = a.intersection(b)
+        elapsed = time.perf_counter() - start
+        print(size, common.get_size(), f"{elapsed / size * 1e6:.1f} us per id")
+
+    print("\n__iter__(), __next__() example")
+    print("------------------------------")
+    s = HashSet(10, hash_function_1)
+    for i in range(5):
+        s.add(str(i))
+    s.remove('2')
+    for key in s:
+        print('K:', key)
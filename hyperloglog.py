@@ -0,0 +1,149 @@
+# Course: CS261 - Data Structures
+# Description: HyperLogLog cardinality estimator, used to presize the hash maps
+# before a bulk load. Each key's 64-bit hash picks one of 2^precision one-byte
+# registers with its top bits, and the register keeps the longest run of
+# leading zeros seen in the remaining bits. The harmonic mean of the registers
+# estimates the number of distinct keys with a relative error of about
+# 1.04 / sqrt(2^precision) (1.6% at the default precision), in 2^precision
+# bytes. Sketches with the same precision and hash function merge by taking
+# the larger of each pair of registers.
+
+import math
+
+from hash_functions import hash_64, mix_64
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch
+    Supported methods are: add, update, estimate, upper_bound, merge, clear,
+    memory_bytes
+    """
+
+    def __init__(self, precision: int = 12, function: callable = hash_64) -> None:
+        """Initialize an empty sketch with 2^precision registers."""
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self._precision = precision
+        self._hash_function = function
+        self._registers_count = 1 << precision
+        self._registers = bytearray(self._registers_count)
+        self._rank_bits = 64 - precision
+
+        # bias correction constant for the harmonic mean
+        if precision == 4:
+            self._alpha = 0.673
+        elif precision == 5:
+            self._alpha = 0.697
+        elif precision == 6:
+            self._alpha = 0.709
+        else:
+            self._alpha = 0.7213 / (1 + 1.079 / self._registers_count)
+
+    def add(self, key: str) -> None:
+        """Count key."""
+        hash = mix_64(self._hash_function(key))
+        index = hash >> self._rank_bits
+        rank = self._rank_bits - (hash & ((1 << self._rank_bits) - 1)).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def update(self, keys) -> None:
+        """Count every key of an iterable."""
+        add = self.add
+        for key in keys:
+            add(key)
+
+    def estimate(self) -> int:
+        """Return the estimated number of distinct keys counted."""
+        m = self._registers_count
+        total = 0.0
+        zeros = 0
+        for register in self._registers:
+            total += 2.0 ** -register
+            if register == 0:
+                zeros += 1
+        raw = self._alpha * m * m / total
+
+        # linear counting is more accurate while many registers are still empty
+        if raw <= 2.5 * m and zeros != 0:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def upper_bound(self, sigmas: float = 3.0) -> int:
+        """
+        Return the estimate raised by sigmas standard errors, a size that the
+        true count stays under with high probability
+        """
+        return math.ceil(self.estimate() * (1 + sigmas * 1.04 / math.sqrt(self._registers_count)))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch into this one, as if its keys were added here."""
+        if other._precision != self._precision or other._hash_function is not self._hash_function:
+            raise ValueError("only sketches with the same precision and hash function merge")
+        registers = self._registers
+        for index, register in enumerate(other._registers):
+            if register > registers[index]:
+                registers[index] = register
+
+    def clear(self) -> None:
+        """Forget every key."""
+        self._registers = bytearray(self._registers_count)
+
+    def memory_bytes(self) -> int:
+        """Return bytes used by the registers."""
+        return len(self._registers)
+
+
+def estimate_distinct(keys, precision: int = 12, function: callable = hash_64) -> int:
+    """
+    Returns the estimated number of distinct keys in an iterable, in one pass
+    """
+    sketch = HyperLogLog(precision, function)
+    sketch.update(keys)
+    return sketch.estimate()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import random
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\nestimate_distinct example")
+    print("-------------------------")
+    for distinct in (10, 1000, 100_000):
+        keys = ['key' + str(random.randrange(distinct)) for _ in range(3 * distinct)]
+        actual = len(set(keys))
+        estimate = estimate_distinct(keys)
+        print(actual, estimate, abs(estimate - actual) / actual < 0.05)
+
+    print("\nmerge example")
+    print("-------------")
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update('key' + str(i) for i in range(0, 60_000))
+    right.update('key' + str(i) for i in range(40_000, 100_000))
+    left.merge(right)
+    print(left.estimate(), abs(left.estimate() - 100_000) < 5000, left.memory_bytes())
+
+    print("\npresized bulk load example")
+    print("--------------------------")
+    stream = ['key' + str(random.randrange(20_000)) for _ in range(30_000)]
+    for engine in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = engine(11, hash_map_sc.hash_function_2)
+        resizes = 0
+        for key in stream:
+            capacity = m.get_capacity()
+            m.put(key, 1)
+            resizes += m.get_capacity() != capacity
+
+        sketch = HyperLogLog()
+        sketch.update(stream)
+        m = engine(11, hash_map_sc.hash_function_2, expected_size=sketch.upper_bound())
+        capacity = m.get_capacity()
+        for key in stream:
+            m.put(key, 1)
+        print(engine.__module__, m.get_size(), f"{resizes} resizes growing,",
+              m.get_capacity() == capacity, "no resize when presized")
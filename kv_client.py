@@ -0,0 +1,288 @@
+# Course: CS261 - Data Structures
+# Description: Asyncio client for kv_server with a connection pool, request
+# pipelining and a load generator. Connections are opened lazily up to the pool
+# size and shared by concurrent tasks; pipeline() sends a list of commands in
+# one write and reads all of their replies. load_test() replays a synthetic
+# workload (see hash_map_tuner.sample_workload) over several concurrent
+# pipelined connections and reports throughput and latency percentiles.
+
+import asyncio
+import time
+
+from hash_map_tuner import sample_workload
+from kv_server import ProtocolError
+
+
+def encode_command(*arguments) -> bytes:
+    """
+    Returns a command as a RESP array of bulk strings; arguments may be bytes,
+    str or int
+    """
+    out = [b'*%d\r\n' % len(arguments)]
+    for argument in arguments:
+        if not isinstance(argument, bytes):
+            argument = str(argument).encode()
+        out.append(b'$%d\r\n%s\r\n' % (len(argument), argument))
+    return b''.join(out)
+
+
+class _ClientConnection:
+    """
+    One connection to the server
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Initialize a connection over an open stream pair."""
+        self._reader = reader
+        self._writer = writer
+
+    async def pipeline(self, commands: list) -> list:
+        """Send encoded commands in one write and return their replies."""
+        self._writer.write(b''.join(commands))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in range(len(commands))]
+
+    async def _read_reply(self):
+        """Read one reply; errors are returned as ProtocolError instances."""
+        line = await self._reader.readuntil(b'\r\n')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            return ProtocolError(body.decode().removeprefix('ERR '))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b'*':
+            return [await self._read_reply() for _ in range(int(body))]
+        raise ProtocolError("unexpected reply " + repr(line))
+
+    def close_soon(self) -> None:
+        """Close the connection without waiting for it to finish closing."""
+        self._writer.close()
+
+    async def close(self) -> None:
+        """Close the connection."""
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class KVClient:
+    def __init__(self, host: str = '127.0.0.1', port: int = 6380, pool_size: int = 8) -> None:
+        """
+        Client for one server. Up to pool_size connections are opened, as
+        concurrent tasks need them.
+        """
+        self._host = host
+        self._port = port
+        self._pool_size = pool_size
+        self._idle = []
+        self._opened = 0
+        self._available = None
+
+    async def _acquire(self) -> _ClientConnection:
+        """
+        Returns an idle connection, opening one if the pool isn't full yet
+        """
+        if self._available is None:
+            self._available = asyncio.Condition()
+        async with self._available:
+            while not self._idle and self._opened >= self._pool_size:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+
+        try:
+            reader, writer = await asyncio.open_connection(self._host, self._port)
+        except OSError:
+            async with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+        return _ClientConnection(reader, writer)
+
+    async def _release(self, connection: _ClientConnection) -> None:
+        """
+        Returns a connection to the pool
+        """
+        async with self._available:
+            self._idle.append(connection)
+            self._available.notify()
+
+    async def pipeline(self, commands: list) -> list:
+        """
+        Sends commands (each a tuple of arguments) over one connection in a
+        single write and returns their replies in order. Error replies are
+        returned as ProtocolError instances rather than raised.
+        """
+        connection = await self._acquire()
+        try:
+            replies = await connection.pipeline([encode_command(*command) for command in commands])
+        except BaseException:
+            # the connection's state is unknown; drop it
+            connection.close_soon()
+            async with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+        await self._release(connection)
+        return replies
+
+    async def execute(self, *arguments):
+        """
+        Sends one command and returns its reply; raises ProtocolError on an
+        error reply
+        """
+        reply = (await self.pipeline([arguments]))[0]
+        if isinstance(reply, ProtocolError):
+            raise reply
+        return reply
+
+    async def get(self, key: str) -> bytes:
+        """Returns the value of key, or None."""
+        return await self.execute('GET', key)
+
+    async def put(self, key: str, value) -> None:
+        """Stores value (bytes, str or int) under key."""
+        await self.execute('SET', key, value)
+
+    async def remove(self, *keys) -> int:
+        """Removes keys and returns how many existed."""
+        return await self.execute('DEL', *keys)
+
+    async def mget(self, keys: list) -> list:
+        """Returns the values of keys, None for missing ones."""
+        return await self.execute('MGET', *keys)
+
+    async def mset(self, pairs: list) -> None:
+        """Stores every (key, value) pair."""
+        arguments = []
+        for key, value in pairs:
+            arguments.append(key)
+            arguments.append(value)
+        await self.execute('MSET', *arguments)
+
+    async def scan_keys(self, count: int = 100):
+        """Yields every key on the server, count keys per SCAN call."""
+        cursor = 0
+        while True:
+            cursor, keys = await self.execute('SCAN', cursor, 'COUNT', count)
+            for key in keys:
+                yield key.decode()
+            cursor = int(cursor)
+            if cursor == 0:
+                return
+
+    async def close(self) -> None:
+        """Closes every idle connection."""
+        while self._idle:
+            self._opened -= 1
+            await self._idle.pop().close()
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """
+    Returns the value at a fraction of an ordered list
+    """
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def load_test(host: str = '127.0.0.1', port: int = 6380, operations: int = 100_000,
+                    concurrency: int = 16, pipeline: int = 16, key_space: int = 10_000,
+                    read_ratio: float = 0.8, value_size: int = 32, seed: int = 0) -> dict:
+    """
+    Replays a synthetic workload against a server from concurrency tasks, each
+    sending pipeline commands per round trip. Returns a dict with operations,
+    seconds, ops_per_second and p50/p95/p99/max round trip latency in
+    milliseconds.
+    """
+    workload = sample_workload(operations, key_space, read_ratio=read_ratio, seed=seed)
+    commands = []
+    for operation in workload:
+        if operation[0] == 'get':
+            commands.append(('GET', operation[1]))
+        elif operation[0] == 'put':
+            commands.append(('SET', operation[1], str(operation[2]).rjust(value_size, '0')))
+        else:
+            commands.append(('DEL', operation[1]))
+    batches = iter([commands[index:index + pipeline]
+                    for index in range(0, len(commands), pipeline)])
+
+    client = KVClient(host, port, pool_size=concurrency)
+    latencies = []
+
+    async def worker():
+        for batch in batches:
+            start = time.perf_counter()
+            await client.pipeline(batch)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+
+    latencies.sort()
+    return {'operations': operations, 'seconds': elapsed,
+            'ops_per_second': operations / elapsed,
+            'p50_ms': _percentile(latencies, 0.50) * 1000,
+            'p95_ms': _percentile(latencies, 0.95) * 1000,
+            'p99_ms': _percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000}
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import multiprocessing
+    import socket
+
+    import kv_server
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = multiprocessing.Process(target=kv_server.run, args=('127.0.0.1', port, 'sc'),
+                                     daemon=True)
+    server.start()
+
+    async def main():
+        client = KVClient(port=port, pool_size=4)
+        for _ in range(100):
+            try:
+                await client.execute('PING')
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+
+        print("\nclient example")
+        print("--------------")
+        await client.put('key1', 'hello')
+        await client.mset([('a', 1), ('b', 2)])
+        print(await client.get('key1'), await client.mget(['a', 'b', 'c']),
+              await client.remove('a', 'c'))
+        print(sorted([key async for key in client.scan_keys(count=2)]))
+        print(await client.pipeline([('GET', 'b'), ('NOPE',), ('DBSIZE',)]))
+        try:
+            await client.execute('GET')
+        except ProtocolError as error:
+            print('ProtocolError:', error)
+        await client.close()
+
+        print("\nload test example")
+        print("-----------------")
+        for concurrency, pipeline in ((1, 1), (8, 1), (8, 32)):
+            result = await load_test(port=port, operations=20_000, concurrency=concurrency,
+                                     pipeline=pipeline)
+            print(f"concurrency={concurrency}, pipeline={pipeline}: "
+                  f"{result['ops_per_second']:,.0f} ops/s, p50 {result['p50_ms']:.2f} ms, "
+                  f"p99 {result['p99_ms']:.2f} ms")
+
+    asyncio.run(main())
+    server.terminate()
+    server.join()
@@ -0,0 +1,320 @@
+# Course: CS261 - Data Structures
+# Description: Asyncio TCP key-value server that shares one hash map between
+# processes. Clients speak a subset of RESP (the Redis protocol): commands are
+# arrays of bulk strings and replies are simple strings, errors, integers, bulk
+# strings or arrays. Requests may be pipelined; every complete command that has
+# arrived when the event loop hands the connection its data is executed in one
+# batch and all of their replies are written back together. Supported commands
+# are PING, GET, SET (alias PUT), DEL, MGET, MSET, DBSIZE and SCAN.
+
+import asyncio
+
+from a6_include import hash_function_1
+import hash_map_linear
+import hash_map_oa
+import hash_map_sc
+
+ENGINES = {'sc': hash_map_sc.HashMap, 'oa': hash_map_oa.HashMap,
+           'linear': hash_map_linear.HashMap}
+
+# keys returned by one SCAN call unless COUNT is given
+SCAN_COUNT = 100
+
+_NULL = b'$-1\r\n'
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def parse_commands(buffer: bytearray) -> tuple[list, int]:
+    """
+    Returns (commands, bytes consumed) for the complete commands at the start
+    of buffer; each command is a list of bytes arguments. A partial command at
+    the end is left for the next call. Inline commands (plain words separated
+    by spaces, as typed in telnet) are accepted too.
+    """
+    commands = []
+    position = 0
+    while position < len(buffer):
+        line_end = buffer.find(b'\r\n', position)
+        if line_end == -1:
+            break
+
+        if buffer[position] != ord('*'):
+            commands.append(bytes(buffer[position:line_end]).split())
+            position = line_end + 2
+            continue
+
+        count = int(buffer[position + 1:line_end])
+        cursor = line_end + 2
+        arguments = []
+        for _ in range(count):
+            line_end = buffer.find(b'\r\n', cursor)
+            if line_end == -1:
+                break
+            if buffer[cursor] != ord('$'):
+                raise ProtocolError("expected '$', got " + repr(chr(buffer[cursor])))
+            length = int(buffer[cursor + 1:line_end])
+            start = line_end + 2
+            if start + length + 2 > len(buffer):
+                break
+            arguments.append(bytes(buffer[start:start + length]))
+            cursor = start + length + 2
+        if len(arguments) < count:
+            break
+
+        commands.append(arguments)
+        position = cursor
+    return commands, position
+
+
+def encode_reply(reply) -> bytes:
+    """
+    Returns the RESP encoding of a reply: None is a null bulk string, bytes a
+    bulk string, int an integer, list an array, and ProtocolError an error
+    """
+    if reply is None:
+        return _NULL
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(encode_reply(item) for item in reply)
+    if isinstance(reply, ProtocolError):
+        return b'-ERR ' + str(reply).encode() + b'\r\n'
+    return b'+' + reply.encode() + b'\r\n'
+
+
+class KVServer:
+    def __init__(self, engine: str = 'sc', capacity: int = 11,
+                 function: callable = hash_function_1, **options) -> None:
+        """
+        Serve one map of the chosen engine ('sc', 'oa' or 'linear'); options
+        are passed to the map's constructor. Keys are stored as str and values
+        as bytes.
+        """
+        self._map = ENGINES[engine](capacity, function, **options)
+        self._commands = {b'PING': self._ping, b'GET': self._get, b'SET': self._set,
+                          b'PUT': self._set, b'DEL': self._delete, b'MGET': self._mget,
+                          b'MSET': self._mset, b'DBSIZE': self._dbsize, b'SCAN': self._scan}
+        self._server = None
+
+    def execute(self, command: list):
+        """
+        Runs one parsed command against the map and returns its reply
+        """
+        if not command:
+            return ProtocolError("empty command")
+        handler = self._commands.get(command[0].upper())
+        if handler is None:
+            return ProtocolError(f"unknown command '{command[0].decode(errors='replace')}'")
+        try:
+            return handler(command[1:])
+        except (IndexError, ValueError):
+            return ProtocolError(f"wrong arguments for '{command[0].decode().lower()}' command")
+
+    def _ping(self, arguments: list):
+        """PING [message]: returns PONG, or the message"""
+        return arguments[0] if arguments else 'PONG'
+
+    def _get(self, arguments: list):
+        """GET key: returns the value, or null"""
+        (key,) = arguments
+        return self._map.get(key.decode())
+
+    def _set(self, arguments: list):
+        """SET key value: stores the value"""
+        key, value = arguments
+        self._map.put(key.decode(), value)
+        return 'OK'
+
+    def _delete(self, arguments: list):
+        """DEL key [key ...]: returns the number of keys removed"""
+        if not arguments:
+            raise ValueError
+        removed = 0
+        for key in arguments:
+            key = key.decode()
+            if self._map.contains_key(key):
+                self._map.remove(key)
+                removed += 1
+        return removed
+
+    def _mget(self, arguments: list):
+        """MGET key [key ...]: returns the values, null for missing keys"""
+        if not arguments:
+            raise ValueError
+        return [self._map.get(key.decode()) for key in arguments]
+
+    def _mset(self, arguments: list):
+        """MSET key value [key value ...]: stores every pair"""
+        if not arguments or len(arguments) % 2:
+            raise ValueError
+        for index in range(0, len(arguments), 2):
+            self._map.put(arguments[index].decode(), arguments[index + 1])
+        return 'OK'
+
+    def _dbsize(self, arguments: list):
+        """DBSIZE: returns the number of keys"""
+        return self._map.get_size()
+
+    def _scan(self, arguments: list):
+        """
+        SCAN cursor [COUNT n]: returns [next cursor, keys]; the cursor is 0
+        once every key has been returned. The cursor is a bucket index and a
+        call reads whole buckets until it has at least n keys, so writes
+        between calls don't shift it: a key present for the whole scan is
+        returned once, unless the table resizes during the scan, which may
+        repeat or skip keys.
+        """
+        cursor = int(arguments[0])
+        count = SCAN_COUNT
+        if len(arguments) == 3 and arguments[1].upper() == b'COUNT':
+            count = int(arguments[2])
+        elif len(arguments) != 1:
+            raise ValueError
+
+        capacity = self._map.get_capacity()
+        keys = []
+        index = cursor
+        while index < capacity and len(keys) < count:
+            bucket_keys = self._map.get_bucket_keys(index)
+            for position in range(bucket_keys.length()):
+                keys.append(bucket_keys[position].encode())
+            index += 1
+        next_cursor = 0 if index >= capacity else index
+        return [str(next_cursor).encode(), keys]
+
+    # ------------------------------------------------------------------ #
+
+    async def start(self, host: str = '127.0.0.1', port: int = 6380) -> asyncio.AbstractServer:
+        """
+        Starts listening and returns the asyncio server; port 0 picks a free port
+        """
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: _Connection(self), host, port)
+        return self._server
+
+    def port(self) -> int:
+        """
+        Returns the port the server listens on
+        """
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = '127.0.0.1', port: int = 6380) -> None:
+        """
+        Starts the server and serves until cancelled
+        """
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class _Connection(asyncio.Protocol):
+    """
+    One client connection. All complete commands received in one read are
+    executed together and answered with one write.
+    """
+
+    def __init__(self, server: KVServer) -> None:
+        """Initialize a connection served by server."""
+        self._server = server
+        self._buffer = bytearray()
+        self._transport = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        """Keep the transport replies are written to."""
+        self._transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        """Execute every complete command received so far as one batch."""
+        self._buffer += data
+        try:
+            commands, consumed = parse_commands(self._buffer)
+        except (ProtocolError, ValueError) as error:
+            self._transport.write(encode_reply(ProtocolError(str(error))))
+            self._transport.close()
+            return
+        del self._buffer[:consumed]
+
+        if commands:
+            execute = self._server.execute
+            self._transport.write(b''.join(encode_reply(execute(command))
+                                           for command in commands))
+
+
+def run(host: str = '127.0.0.1', port: int = 6380, engine: str = 'sc', **options) -> None:
+    """
+    Serves a map of the chosen engine on host:port until interrupted; usable as
+    a process target to run servers in the background
+    """
+    try:
+        asyncio.run(KVServer(engine, **options).serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    from a6_include import hash_function_2
+
+    async def main():
+        server = KVServer('oa')
+        await server.start(port=0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port())
+
+        print("\npipelined commands example")
+        print("--------------------------")
+        writer.write(b'*3\r\n$3\r\nSET\r\n$4\r\nkey1\r\n$5\r\nhello\r\n'
+                     b'*2\r\n$3\r\nGET\r\n$4\r\nkey1\r\n'
+                     b'*5\r\n$4\r\nMSET\r\n$1\r\na\r\n$1\r\n1\r\n$1\r\nb\r\n$1\r\n2\r\n'
+                     b'*4\r\n$4\r\nMGET\r\n$1\r\na\r\n$1\r\nb\r\n$1\r\nc\r\n'
+                     b'*3\r\n$3\r\nDEL\r\n$1\r\na\r\n$1\r\nc\r\n'
+                     b'DBSIZE\r\n'
+                     b'*2\r\n$4\r\nSCAN\r\n$1\r\n0\r\n'
+                     b'*1\r\n$4\r\nNOPE\r\n'
+                     b'*1\r\n$3\r\nGET\r\n'
+                     b'PING\r\n')
+        await writer.drain()
+        await asyncio.sleep(0.1)
+        print(await reader.read(4096))
+
+        print("\npartial command example")
+        print("-----------------------")
+        writer.write(b'*2\r\n$3\r\nGET\r\n$4\r\nke')
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        writer.write(b'y1\r\n')
+        await writer.drain()
+        print(await reader.readuntil(b'hello\r\n'))
+
+        writer.close()
+        await writer.wait_closed()
+
+    asyncio.run(main())
+
+    print("\nscan example")
+    print("------------")
+    for engine in ENGINES:
+        server = KVServer(engine, 20_011, hash_function_2)
+        for i in range(20_000):
+            server.execute([b'SET', b'key' + str(i).encode(), b'x'])
+        start = time.perf_counter()
+        cursor, seen, pages = b'0', [], 0
+        while True:
+            cursor, keys = server.execute([b'SCAN', cursor, b'COUNT', b'500'])
+            seen.extend(keys)
+            pages += 1
+            # writes between pages don't move the cursor
+            server.execute([b'SET', b'new' + str(pages).encode(), b'y'])
+            server.execute([b'DEL', keys[0]] if keys else [b'PING'])
+            if cursor == b'0':
+                break
+        elapsed = time.perf_counter() - start
+        original = [key for key in seen if key.startswith(b'key')]
+        print(engine, len(original), len(set(original)), pages, f"{elapsed:.2f} s")
@@ -0,0 +1,209 @@
+# Course: CS261 - Data Structures
+# Description: Ordered index of string keys, kept next to a hash map to answer
+# range and prefix queries without sorting the whole map. Keys are held in a
+# skip list: every node is on level 0, a sorted linked list, and on each higher
+# level with probability 1/4, so searches skip ahead through the upper levels
+# in O(log n) expected time. Range and prefix scans find their first key that
+# way and then walk level 0 lazily, yielding keys in order.
+
+import random
+import sys
+
+# highest level a node can reach; enough for 4^16 keys
+MAX_LEVEL = 16
+
+# chance a node on one level is also on the next
+_PROMOTE = 0.25
+
+
+class _SkipNode:
+    """
+    Skip list node: a key and its successor on each level it is on
+    """
+    __slots__ = ('key', 'forward')
+
+    def __init__(self, key: str, level: int) -> None:
+        """Initialize a node on levels 0 through level - 1."""
+        self.key = key
+        self.forward = [None] * level
+
+
+def _node_bytes(level: int) -> int:
+    """
+    Returns bytes of a node on level levels and its forward list, not the key
+    """
+    return sys.getsizeof(_SkipNode(None, 0)) + sys.getsizeof([None] * level)
+
+
+# most bytes one insert can add, for checking a memory budget before it
+MAX_NODE_BYTES = _node_bytes(MAX_LEVEL)
+
+
+class OrderedIndex:
+    """
+    Sorted set of string keys
+    Supported methods are: insert, remove, contains, clear, range, prefix,
+    min_key, max_key, length, memory_bytes
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        self._head = _SkipNode(None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._bytes = _node_bytes(MAX_LEVEL)
+        self._random = random.Random()
+
+    def length(self) -> int:
+        """Return number of keys in the index."""
+        return self._size
+
+    def _predecessors(self, key: str) -> list:
+        """
+        Return, for each level, the last node with a key smaller than key
+        """
+        update = [self._head] * MAX_LEVEL
+        node = self._head
+        for level in range(self._level - 1, -1, -1):
+            while node.forward[level] is not None and node.forward[level].key < key:
+                node = node.forward[level]
+            update[level] = node
+        return update
+
+    def _first_at_least(self, key: str) -> _SkipNode:
+        """
+        Return the first node with a key greater than or equal to key
+        """
+        node = self._head
+        for level in range(self._level - 1, -1, -1):
+            while node.forward[level] is not None and node.forward[level].key < key:
+                node = node.forward[level]
+        return node.forward[0]
+
+    def insert(self, key: str) -> None:
+        """Add key; does nothing if it is already in the index."""
+        update = self._predecessors(key)
+        following = update[0].forward[0]
+        if following is not None and following.key == key:
+            return
+
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < _PROMOTE:
+            level += 1
+        self._level = max(self._level, level)
+
+        node = _SkipNode(key, level)
+        for index in range(level):
+            node.forward[index] = update[index].forward[index]
+            update[index].forward[index] = node
+        self._size += 1
+        self._bytes += _node_bytes(level)
+
+    def remove(self, key: str) -> None:
+        """Remove key; does nothing if it is not in the index."""
+        update = self._predecessors(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return
+
+        for index in range(len(node.forward)):
+            update[index].forward[index] = node.forward[index]
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        self._bytes -= _node_bytes(len(node.forward))
+
+    def contains(self, key: str) -> bool:
+        """Return True if key is in the index."""
+        node = self._first_at_least(key)
+        return node is not None and node.key == key
+
+    def clear(self) -> None:
+        """Remove every key."""
+        self._head = _SkipNode(None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._bytes = _node_bytes(MAX_LEVEL)
+
+    def range(self, lo: str = None, hi: str = None):
+        """
+        Yield keys k with lo <= k < hi in order; None leaves that end open
+        """
+        node = self._head.forward[0] if lo is None else self._first_at_least(lo)
+        while node is not None and (hi is None or node.key < hi):
+            yield node.key
+            node = node.forward[0]
+
+    def prefix(self, prefix: str):
+        """
+        Yield keys starting with prefix in order
+        """
+        node = self._first_at_least(prefix)
+        while node is not None and node.key.startswith(prefix):
+            yield node.key
+            node = node.forward[0]
+
+    def min_key(self) -> str:
+        """Return the smallest key, or None if the index is empty."""
+        node = self._head.forward[0]
+        return None if node is None else node.key
+
+    def max_key(self) -> str:
+        """Return the largest key, or None if the index is empty."""
+        node = self._head
+        for level in range(self._level - 1, -1, -1):
+            while node.forward[level] is not None:
+                node = node.forward[level]
+        return node.key
+
+    def memory_bytes(self) -> int:
+        """
+        Return bytes used by the nodes and their forward lists, not the keys.
+        Kept as a running count, so maps can charge every insert to a budget.
+        """
+        return self._bytes
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\ninsert / remove / range example")
+    print("-------------------------------")
+    index = OrderedIndex()
+    for word in ['pear', 'apple', 'fig', 'banana', 'apricot', 'cherry', 'fig']:
+        index.insert(word)
+    index.remove('cherry')
+    index.remove('kiwi')
+    print(index.length(), list(index.range()), list(index.range('b', 'g')),
+          list(index.prefix('ap')), index.min_key(), index.max_key(), index.contains('fig'))
+    print(OrderedIndex().max_key(), list(OrderedIndex().prefix('a')))
+
+    print("\nmap range / prefix example")
+    print("--------------------------")
+    for engine in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = engine(11, hash_map_sc.hash_function_2)
+        m.put('user:0', 0)
+        m.set_ordered_index()
+        for i in range(1, 20_000):
+            m.put('user:' + str(i), i)
+        for i in range(0, 20_000, 2):
+            m.remove('user:' + str(i))
+        print(engine.__module__, list(m.prefix('user:1999')), list(m.range('user:5', 'user:50001')),
+              m.min_key(), m.max_key())
+
+        start = time.perf_counter()
+        keys = list(m.range('user:123', 'user:124'))
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        pairs = m.get_keys_and_values()
+        scanned = sorted(pairs[i] for i in range(pairs.length())
+                         if 'user:123' <= pairs[i][0] < 'user:124')
+        full = time.perf_counter() - start
+        print(keys == scanned, len(keys), indexed < full, "range faster than filter and sort")
+        m.clear()
+        print(m.min_key(), list(m.prefix('user')))